@@ -0,0 +1,259 @@
+"""
+Instrumentation par requête : SQL, sérialisation, temps applicatif.
+
+Un ``execute_wrapper`` est posé sur chaque connexion (toutes les bases
+configurées) ; pendant une requête HTTP, ``InstrumentationMiddleware`` relève le
+nombre de requêtes SQL, leur durée cumulée et leurs empreintes (SQL
+normalisé) : une même empreinte répétée ``SEUIL_N_PLUS_UN`` fois signale un
+N+1. Les mesures sortent :
+
+* dans l'en-tête ``Server-Timing`` (onglet réseau du navigateur) ;
+* dans un journal JSONL des requêtes lentes, échantillonné ;
+* dans des agrégats par endpoint, propres au processus, exposés aux admins
+  par ``StatistiquesView`` (``/api/instrumentation/``).
+
+Réglages : dictionnaire ``INSTRUMENTATION`` des settings (voir ``REGLAGES``).
+Ne dépend pas de ``DEBUG`` : ``connection.queries`` n'est pas utilisé.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+REGLAGES = {
+    'ACTIF': True,
+    'SERVER_TIMING': True,
+    'SEUIL_LENT_MS': 500,
+    'ECHANTILLON': 1.0,       # part des requêtes lentes écrites au journal
+    'JOURNAL': None,          # chemin du JSONL, None pour ne rien écrire
+    'SEUIL_N_PLUS_UN': 3,
+    'HISTORIQUE': 500,        # durées conservées par endpoint pour p50/p95
+}
+
+
+def reglage(nom):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(nom, REGLAGES[nom])
+
+
+_mesure = contextvars.ContextVar('instrumentation_mesure', default=None)
+
+_LITTERAUX = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTES = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def empreinte(sql):
+    """SQL normalisé : littéraux et listes ``IN (%s, %s…)`` réduits."""
+    return _LISTES.sub('(…)', _LITTERAUX.sub('?', sql))
+
+
+class Mesure:
+    """Mesures d'une requête HTTP en cours."""
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.nb_sql = 0
+        self.duree_sql = 0.0
+        self.empreintes = Counter()
+        self.segments = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree_sql += time.perf_counter() - debut
+            self.nb_sql += 1
+            self.empreintes[empreinte(sql)] += 1
+
+    def doublons(self):
+        return [(sql, n) for sql, n in self.empreintes.most_common(5) if n > 1]
+
+    def n_plus_un(self):
+        return any(n >= reglage('SEUIL_N_PLUS_UN') for _, n in self.doublons())
+
+
+def enregistrer(execute, sql, params, many, context):
+    # installé une fois par connexion ; la mesure de la requête HTTP en cours
+    # suit le contexte, y compris dans les threads de l'ORM asynchrone
+    mesure = _mesure.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    return mesure(execute, sql, params, many, context)
+
+
+def installer(connection, **kwargs):
+    if enregistrer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(enregistrer)
+
+
+connection_created.connect(installer, dispatch_uid='instrumentation')
+
+
+@contextlib.contextmanager
+def segment(nom):
+    """Chronomètre une étape (ex. ``'serialisation'``) de la requête en cours."""
+    mesure = _mesure.get()
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        if mesure is not None:
+            mesure.segments[nom] += time.perf_counter() - debut
+
+
+class Statistiques:
+    """Agrégats par endpoint (méthode + nom de route) pour ce processus."""
+
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.endpoints = {}
+
+    def ajouter(self, cle, total_ms, sql_ms, nb_sql, n_plus_un):
+        with self.verrou:
+            stats = self.endpoints.get(cle)
+            if stats is None:
+                stats = self.endpoints[cle] = {
+                    'appels': 0, 'total_ms': 0.0, 'sql_ms': 0.0, 'requetes_sql': 0, 'n_plus_un': 0,
+                    'max_ms': 0.0, 'durees': deque(maxlen=reglage('HISTORIQUE')),
+                }
+            stats['appels'] += 1
+            stats['total_ms'] += total_ms
+            stats['sql_ms'] += sql_ms
+            stats['requetes_sql'] += nb_sql
+            stats['n_plus_un'] += int(n_plus_un)
+            stats['max_ms'] = max(stats['max_ms'], total_ms)
+            stats['durees'].append(total_ms)
+
+    def resume(self):
+        with self.verrou:
+            endpoints = {cle: dict(s, durees=list(s['durees'])) for cle, s in self.endpoints.items()}
+        resultat = {}
+        for cle, s in sorted(endpoints.items()):
+            durees = sorted(s['durees'])
+            appels = s['appels']
+            resultat[cle] = {
+                'appels': appels,
+                'moyenne_ms': round(s['total_ms'] / appels, 2),
+                'p50_ms': round(statistics.median(durees), 2),
+                'p95_ms': round(durees[int(0.95 * (len(durees) - 1))], 2),
+                'max_ms': round(s['max_ms'], 2),
+                'sql_ms_moyen': round(s['sql_ms'] / appels, 2),
+                'requetes_sql_moyen': round(s['requetes_sql'] / appels, 2),
+                'n_plus_un': s['n_plus_un'],
+            }
+        return resultat
+
+    def reinitialiser(self):
+        with self.verrou:
+            self.endpoints.clear()
+
+
+statistiques = Statistiques()
+_verrou_journal = threading.Lock()
+
+
+def journaliser(ligne):
+    chemin = reglage('JOURNAL')
+    if not chemin or random.random() >= reglage('ECHANTILLON'):
+        return
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with _verrou_journal, open(chemin, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(ligne, ensure_ascii=False) + '\n')
+
+
+class InstrumentationMiddleware:
+    # synchrone et asynchrone : sous ASGI, les vues async ne repassent pas par un thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all():
+            installer(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not reglage('ACTIF'):
+            return self.get_response(request)
+        mesure = Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            response = self.get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        self.terminer(request, response, mesure)
+        return response
+
+    async def __acall__(self, request):
+        if not reglage('ACTIF'):
+            return await self.get_response(request)
+        mesure = Mesure()
+        jeton = _mesure.set(mesure)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _mesure.reset(jeton)
+        self.terminer(request, response, mesure)
+        return response
+
+    def terminer(self, request, response, mesure):
+        total = time.perf_counter() - mesure.debut
+        match = request.resolver_match
+        cle = f"{request.method} {match.view_name if match else '<non résolu>'}"
+        total_ms, sql_ms = total * 1000, mesure.duree_sql * 1000
+        n_plus_un = mesure.n_plus_un()
+        statistiques.ajouter(cle, total_ms, sql_ms, mesure.nb_sql, n_plus_un)
+
+        if reglage('SERVER_TIMING'):
+            entrees = [f'sql;dur={sql_ms:.2f};desc="{mesure.nb_sql} requetes"']
+            entrees += [f'{nom};dur={duree * 1000:.2f}' for nom, duree in mesure.segments.items()]
+            entrees.append(f'app;dur={total_ms - sql_ms:.2f}')
+            if n_plus_un:
+                entrees.append(f'n-plus-un;desc="{mesure.doublons()[0][1]}x"')
+            entrees.append(f'total;dur={total_ms:.2f}')
+            response['Server-Timing'] = ', '.join(entrees)
+
+        if total_ms >= reglage('SEUIL_LENT_MS'):
+            journaliser({
+                'date': timezone.now().isoformat(),
+                'endpoint': cle,
+                'chemin': request.get_full_path(),
+                'statut': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'sql_ms': round(sql_ms, 2),
+                'requetes_sql': mesure.nb_sql,
+                'segments_ms': {nom: round(d * 1000, 2) for nom, d in mesure.segments.items()},
+                'doublons': [{'sql': sql, 'nombre': n} for sql, n in mesure.doublons()],
+            })
+
+
+class StatistiquesView(APIView):
+    """Agrégats par endpoint du processus courant (admin) ; DELETE les remet à zéro."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'endpoints': statistiques.resume()})
+
+    def delete(self, request):
+        statistiques.reinitialiser()
+        return Response(status=204)
@@ -0,0 +1,101 @@
+"""
+Répartition lectures / écritures entre la base principale et ses répliques.
+
+Les lectures des applications ``blog`` et ``skills`` faites pendant une
+requête HTTP de lecture (GET, HEAD, OPTIONS) partent sur une réplique de
+``BLOG_REPLIQUES`` ; tout le reste (écritures, requêtes POST…, commandes,
+workers, transactions ouvertes) reste sur ``default``.
+
+Lire ses propres écritures : une requête qui écrit est épinglée à la base
+principale jusqu'à sa fin, et le client reçoit un cookie ``primaire`` qui
+épingle ses requêtes suivantes pendant ``BLOG_EPINGLAGE_SECONDES`` (le retard
+de réplication toléré).
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+APPS_REPLIQUEES = {'blog', 'skills'}
+COOKIE = 'primaire'
+
+# None hors requête HTTP ; sinon {'epingle', 'a_ecrit', 'replique'}
+_etat = contextvars.ContextVar('routeur_etat', default=None)
+
+
+def repliques():
+    return getattr(settings, 'BLOG_REPLIQUES', [])
+
+
+class RepliqueRouter:
+
+    def db_for_read(self, model, **hints):
+        etat = _etat.get()
+        if (etat is None or etat['epingle'] or model._meta.app_label not in APPS_REPLIQUEES
+                or not repliques() or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        # une seule réplique par requête : COUNT et page lus sur la même copie
+        if etat['replique'] is None:
+            etat['replique'] = random.choice(repliques())
+        return etat['replique']
+
+    def db_for_write(self, model, **hints):
+        etat = _etat.get()
+        if etat is not None and model._meta.app_label in APPS_REPLIQUEES:
+            etat['epingle'] = etat['a_ecrit'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # mêmes données partout : les relations entre alias sont permises
+        bases = {DEFAULT_DB_ALIAS, *repliques()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # les répliques sont des copies de la principale, jamais migrées directement
+        return db not in repliques()
+
+
+class EpinglagePrimaireMiddleware:
+    """Active le routage vers les répliques pour les requêtes de lecture."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        jeton = self.debut(request)
+        try:
+            response = self.get_response(request)
+            etat = _etat.get()
+        finally:
+            _etat.reset(jeton)
+        return self.epingler(response) if etat['a_ecrit'] else response
+
+    async def __acall__(self, request):
+        # l'état suit le contexte jusque dans les threads de l'ORM asynchrone
+        jeton = self.debut(request)
+        try:
+            response = await self.get_response(request)
+            etat = _etat.get()
+        finally:
+            _etat.reset(jeton)
+        return self.epingler(response) if etat['a_ecrit'] else response
+
+    def debut(self, request):
+        epingle = request.method not in ('GET', 'HEAD', 'OPTIONS') or COOKIE in request.COOKIES
+        return _etat.set({'epingle': epingle, 'a_ecrit': False, 'replique': None})
+
+    def epingler(self, response):
+        if repliques():
+            response.set_cookie(COOKIE, '1', max_age=getattr(settings, 'BLOG_EPINGLAGE_SECONDES', 5),
+                                httponly=True, samesite='Lax')
+        return response
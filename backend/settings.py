@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.instrumentation.InstrumentationMiddleware',
+    'backend.routeurs.EpinglagePrimaireMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,13 +82,88 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Profil SQLite de production, appliqué à chaque nouvelle connexion : journal WAL
+# (lectures concurrentes d'une écriture), synchronous=NORMAL (sûr en WAL), cache
+# et mmap plus grands, attente sur verrou plutôt qu'erreur immédiate. IMMEDIATE :
+# une transaction prend le verrou d'écriture dès BEGIN, ce qui évite les
+# « database is locked » sans attente lors du passage lecture -> écriture.
+# journal_mode=WAL est persistant : il réécrit l'en-tête du fichier à la
+# première connexion, d'où db.sqlite3 hors du dépôt (créé par ``migrate``).
+SQLITE_PROFIL_PRODUCTION = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA busy_timeout=5000;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_PROFIL_PRODUCTION,
+        # connexions persistantes, vérifiées avant réutilisation
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Répliques en lecture (backend/routeurs.py) : chemins de fichiers SQLite séparés
+# par des virgules dans BLOG_REPLIQUES, copiés depuis la principale par
+# « manage.py synchroniser_repliques ». Avec PostgreSQL, déclarer ici les alias
+# des serveurs répliqués.
+BLOG_REPLIQUES = []
+for numero, chemin in enumerate(filter(None, os.environ.get('BLOG_REPLIQUES', '').split(',')), start=1):
+    alias = f'replique_{numero}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': chemin.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    BLOG_REPLIQUES.append(alias)
+
+DATABASE_ROUTERS = ['backend.routeurs.RepliqueRouter']
+# durée pendant laquelle un client qui vient d'écrire lit sur la principale
+BLOG_EPINGLAGE_SECONDES = 5
+
+# adresse publique du site : URL absolues des réponses rendues hors requête
+# (préchauffage des publications programmées, blog.publication)
+BLOG_URL_PUBLIQUE = os.environ.get('BLOG_URL_PUBLIQUE', 'http://localhost:8000')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# fichiers en local, mémoire pendant les tests (isolés et sans écriture disque)
+
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Instrumentation par requête (backend/instrumentation.py)
+INSTRUMENTATION = {
+    'SERVER_TIMING': True,
+    'SEUIL_LENT_MS': 500,
+    'ECHANTILLON': 0.2,
+    'JOURNAL': None if TESTING else BASE_DIR / 'logs' / 'requetes_lentes.jsonl',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,4 +229,36 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # seaux à jetons des écritures du blog (blog/throttling.py) : capacité/période
+    'DEFAULT_THROTTLE_RATES': {
+        'commentaires_ip': '5/min',
+        'commentaires_utilisateur': '10/min',
+        'commentaires_article': '60/min',
+        'articles_ip': '30/min',
+        'articles_utilisateur': '30/min',
+        'articles_article': '20/min',
+        'likes_ip': '60/min',
+        'likes_utilisateur': '30/min',
+    },
 }
+# 'cache' : seaux partagés entre processus dans un cache à incr atomique (Redis,
+# Memcached). Le cache fichier ci-dessus ne l'est pas : les seaux restent alors
+# propres à chaque processus ('local'), sans jamais toucher la base. 'base' :
+# seaux en base, partagés mais au prix de requêtes SQL à chaque écriture.
+BLOG_THROTTLE_MODE = 'cache'
+
+# vues / likes tamponnés par processus et écrits par lots toutes les N secondes
+# (blog/popularite.py) ; en test, vidage explicite seulement
+BLOG_POPULARITE_INTERVALLE = None if TESTING else 10
+BLOG_POPULARITE_DEMI_VIE = 24 * 3600  # tendance : poids divisé par deux chaque jour
+BLOG_POPULARITE_FENETRE_LIKE = 24 * 3600  # un like par votant et par article sur cette durée
+
+# Courriels (newsletter, blog/newsletter.py) : console en développement,
+# SMTP en production via EMAIL_BACKEND / EMAIL_HOST... ; locmem pendant les tests
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'newsletter@localhost')
@@ -2,13 +2,17 @@ from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
 
+from .instrumentation import StatistiquesView
+
 def home(request):
     return HttpResponse("<h1>Bienvenue sur le site Soft Skills</h1>")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", home),  # 👈 page d'accueil
-    path('skills/', include('skills.urls')),
+    path('', include('skills.urls')),
+    path('', include('blog.urls')),
+    path('api/instrumentation/', StatistiquesView.as_view(), name='instrumentation'),
 ]
 
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Categorie, Article, Commentaire
+from .models import AbonnementNewsletter, Categorie, Article, ArticleTag, Commentaire, EnvoiNewsletter, Tag
+from .compteurs import rejeter_commentaires, valider_commentaires
 
 @admin.register(Categorie)
 class CategorieAdmin(admin.ModelAdmin):
@@ -8,15 +9,29 @@ class CategorieAdmin(admin.ModelAdmin):
     search_fields = ('nom',)
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'slug')
+    prepopulated_fields = {"slug": ("nom",)}
+    search_fields = ('nom',)
+
+
+class ArticleTagInline(admin.TabularInline):
+    model = ArticleTag
+    autocomplete_fields = ('tag',)
+    extra = 1
+
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ('titre', 'categorie', 'auteur', 'statut', 'date_creation')
-    list_filter = ('statut', 'categorie', 'date_creation')
+    inlines = [ArticleTagInline]
+    list_display = ('titre', 'categorie', 'auteur', 'statut', 'date_publication', 'date_creation')
+    list_filter = ('statut', 'categorie', 'date_publication', 'date_creation')
     search_fields = ('titre', 'contenu', 'meta_description', 'mots_cles')
     prepopulated_fields = {"slug": ("titre",)}
     readonly_fields = ('date_creation', 'date_modification')
     fieldsets = (
-        (None, {'fields': ('titre', 'slug', 'categorie', 'auteur', 'statut')}),
+        (None, {'fields': ('titre', 'slug', 'categorie', 'auteur', 'statut', 'date_publication')}),
         ('Contenu', {'fields': ('contenu', 'image')}),
         ('SEO', {'fields': ('meta_description', 'mots_cles')}),
         ('Dates', {'fields': ('date_creation', 'date_modification')}),
@@ -25,12 +40,33 @@ class ArticleAdmin(admin.ModelAdmin):
 
 @admin.register(Commentaire)
 class CommentaireAdmin(admin.ModelAdmin):
-    list_display = ('auteur', 'article', 'valide', 'date_creation')
-    list_filter = ('valide', 'date_creation')
+    list_display = ('auteur', 'article', 'valide', 'statut_moderation', 'score_spam', 'date_creation')
+    list_filter = ('statut_moderation', 'valide', 'date_creation')
     search_fields = ('auteur', 'contenu', 'article__titre')
-    actions = ['valider_commentaires']
+    actions = ['valider_commentaires', 'rejeter_commentaires']
 
     def valider_commentaires(self, request, queryset):
-        updated = queryset.update(valide=True)
+        # validation en masse : compteurs dénormalisés et cache de l'arbre mis à jour
+        updated = valider_commentaires(queryset)
         self.message_user(request, f"{updated} commentaire(s) validé(s).")
     valider_commentaires.short_description = "Valider les commentaires sélectionnés"
+
+    def rejeter_commentaires(self, request, queryset):
+        updated = rejeter_commentaires(queryset)
+        self.message_user(request, f"{updated} commentaire(s) marqué(s) comme spam.")
+    rejeter_commentaires.short_description = "Marquer les commentaires sélectionnés comme spam"
+
+
+@admin.register(AbonnementNewsletter)
+class AbonnementNewsletterAdmin(admin.ModelAdmin):
+    list_display = ('email', 'nom', 'actif', 'date_inscription')
+    list_filter = ('actif',)
+    search_fields = ('email', 'nom')
+
+
+@admin.register(EnvoiNewsletter)
+class EnvoiNewsletterAdmin(admin.ModelAdmin):
+    # envoi par la commande envoyer_newsletter ; l'admin ne montre que l'avancement
+    list_display = ('sujet', 'date_debut', 'date_fin', 'nb_envoyes', 'nb_echecs', 'dernier_abonne')
+    readonly_fields = ('date_debut', 'date_fin', 'nb_envoyes', 'nb_echecs', 'dernier_abonne')
+
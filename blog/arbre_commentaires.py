@@ -0,0 +1,76 @@
+"""
+Arbre des commentaires validés d'un article.
+
+L'arbre complet (commentaires racines + réponses imbriquées) est chargé en une
+seule requête, imbriqué en mémoire puis mis en cache par article. Le cache est
+invalidé par les signaux de ``blog.signals`` et par les actions de modération.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Commentaire
+from .versions import invalider
+
+CACHE_PREFIX = 'blog:arbre-commentaires'
+
+
+def cle_arbre(article_id):
+    return f"{CACHE_PREFIX}:{article_id}"
+
+
+def commentaires_valides(article_id):
+    return Commentaire.objects.filter(article_id=article_id, valide=True).order_by('-date_creation', '-id')
+
+
+def construire_arbre(article_id):
+    return imbriquer(list(commentaires_valides(article_id)))
+
+
+def imbriquer(commentaires):
+    # import local : serializers.py dépend de ce module
+    from .serializers import CommentaireSerializer
+
+    donnees = CommentaireSerializer(commentaires, many=True).data
+
+    noeuds = {}
+    for data in donnees:
+        noeud = dict(data)
+        noeud['reponses'] = []
+        noeuds[noeud['id']] = noeud
+
+    racines = []
+    for noeud in noeuds.values():
+        parent_id = noeud['parent']
+        if parent_id is None:
+            racines.append(noeud)
+        elif parent_id in noeuds:
+            noeuds[parent_id]['reponses'].append(noeud)
+        # une réponse dont le parent n'est pas validé n'est pas visible
+    return racines
+
+
+def get_arbre(article_id):
+    cle = cle_arbre(article_id)
+    arbre = cache.get(cle)
+    if arbre is None:
+        arbre = construire_arbre(article_id)
+        timeout = getattr(settings, 'BLOG_ARBRE_COMMENTAIRES_TIMEOUT', 60 * 60 * 24)
+        cache.set(cle, arbre, timeout)
+    return arbre
+
+
+async def aget_arbre(article_id):
+    """Version asynchrone de ``get_arbre`` (vues ASGI de ``blog.views_async``)."""
+    cle = cle_arbre(article_id)
+    arbre = await cache.aget(cle)
+    if arbre is None:
+        arbre = imbriquer([c async for c in commentaires_valides(article_id)])
+        timeout = getattr(settings, 'BLOG_ARBRE_COMMENTAIRES_TIMEOUT', 60 * 60 * 24)
+        await cache.aset(cle, arbre, timeout)
+    return arbre
+
+
+def invalider_arbre(*article_ids):
+    article_ids = set(article_ids)
+    cache.delete_many([cle_arbre(article_id) for article_id in article_ids])
+    invalider('commentaires', *[f'commentaires:{article_id}' for article_id in article_ids])
@@ -0,0 +1,329 @@
+"""
+Banc de mesure des endpoints de l'API (blog + skills).
+
+``generer_donnees`` remplit la base avec un jeu synthétique (utilisateurs,
+catégories, articles, commentaires en fils) et ``mesurer`` appelle chaque
+endpoint (routeurs, actions, routes asynchrones, export, sitemaps et flux)
+avec le client de test en relevant nombre de requêtes SQL, latences
+p50/p95 et pic mémoire (tracemalloc). ``comparer`` confronte deux tailles de
+jeu et la référence versionnée ``blog/benchmarks/baseline.json`` : le nombre
+de requêtes d'un endpoint ne doit ni croître avec N ni dépasser la référence.
+
+``stress_ecritures`` lance des écrivains concurrents (threads, une connexion
+chacun) pour comparer les profils SQLite (commande ``stress_sqlite``).
+
+``charge_asgi`` compare le débit des vues synchrones et de leurs versions
+asynchrones (``blog.views_async``) en appelant directement l'application
+ASGI, comme le ferait un serveur type uvicorn (commande ``charge_asgi``).
+
+Utilisé par les commandes ``benchmark_api`` / ``stress_sqlite`` / ``charge_asgi``
+et par ``blog/tests.py``.
+"""
+import asyncio
+import itertools
+import json
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from skills.models import Skill
+from . import diffusion, flux, similarite
+from .compteurs import recalculer
+from .models import Article, Categorie, Commentaire
+
+User = get_user_model()
+
+BASELINE = Path(__file__).resolve().parent / 'benchmarks' / 'baseline.json'
+
+
+def generer_donnees(articles=100, categories=5, commentaires=5, reponses=2, utilisateurs=10, skills=20):
+    """Jeu synthétique : ``commentaires`` racines par article, ``reponses`` réponses par racine."""
+    prefixe = f"bench-{Article.objects.count()}"
+    users = User.objects.bulk_create([
+        User(username=f"{prefixe}-user-{i}", first_name=f"Prénom {i}") for i in range(utilisateurs)
+    ])
+    cats = Categorie.objects.bulk_create([
+        Categorie(nom=f"{prefixe} catégorie {i}", slug=f"{prefixe}-categorie-{i}") for i in range(categories)
+    ])
+    arts = Article.objects.bulk_create([
+        Article(
+            titre=f"Article {i}", slug=f"{prefixe}-article-{i}", statut='published',
+            contenu=f"Savoir-être et communication, leçon {i}. " * 30,
+            categorie=cats[i % len(cats)] if cats else None,
+            auteur=users[i % len(users)] if users else None,
+        )
+        for i in range(articles)
+    ])
+    racines = Commentaire.objects.bulk_create([
+        Commentaire(article=article, auteur=f"Lecteur {j}", contenu="Très utile, merci !", valide=True,
+                    statut_moderation='valide')
+        for article in arts for j in range(commentaires)
+    ])
+    Commentaire.objects.bulk_create([
+        Commentaire(article_id=racine.article_id, parent=racine, auteur="Auteur", contenu="Merci à vous.",
+                    valide=True, statut_moderation='valide')
+        for racine in racines for _ in range(reponses)
+    ])
+    Skill.objects.bulk_create([
+        Skill(name=f"{prefixe} skill {i}", description="Compétence comportementale") for i in range(skills)
+    ])
+    recalculer(article_ids=[a.pk for a in arts])
+    flux.rafraichir(*[a.pk for a in arts])
+    similarite.recalculer()  # bulk_create ne passe pas par les signaux
+    return arts
+
+
+def endpoints():
+    """
+    (nom, méthode, url, compte) de chaque route de l'API, pour un objet existant :
+    routeurs blog et skills, actions, lectures asynchrones, export, sitemaps et
+    flux pré-rendus. ``compte`` : anonyme (None), ``'lecteur'`` (un nouvel
+    utilisateur par appel) ou ``'admin'``.
+    """
+    article = Article.objects.filter(statut='published').order_by('id').first()
+    categorie = Categorie.objects.order_by('id').first()
+    commentaire = Commentaire.objects.filter(valide=True).order_by('id').first()
+    return [
+        ('api-root', 'get', reverse('api-root'), None),
+        ('categorie-list', 'get', reverse('categorie-list'), None),
+        ('categorie-detail', 'get', reverse('categorie-detail', args=[categorie.pk]), None),
+        ('article-list', 'get', reverse('article-list'), None),
+        ('article-list-curseur', 'get', reverse('article-list') + '?cursor=', None),
+        ('article-list-recherche', 'get', reverse('article-list') + '?search=communication', None),
+        ('article-detail', 'get', reverse('article-detail', args=[article.pk]), None),
+        ('article-by-slug', 'get', reverse('article-by-slug', args=[article.slug]), None),
+        ('article-related', 'get', reverse('article-related', args=[article.pk]), None),
+        ('article-like', 'post', reverse('article-like', args=[article.pk]), 'lecteur'),
+        ('commentaire-list', 'get', reverse('commentaire-list'), None),
+        ('commentaire-detail', 'get', reverse('commentaire-detail', args=[commentaire.pk]), None),
+        ('skill-list', 'get', reverse('skill-list'), None),
+        ('skills_list', 'get', reverse('skills_list'), None),
+        ('async-article-list', 'get', reverse('async-article-list'), None),
+        ('async-article-detail', 'get', reverse('async-article-detail', args=[article.pk]), None),
+        ('async-article-by-slug', 'get', reverse('async-article-by-slug', args=[article.slug]), None),
+        ('async-categorie-list', 'get', reverse('async-categorie-list'), None),
+        ('skills_list_async', 'get', reverse('skills_list_async'), None),
+        ('export', 'get', reverse('export'), 'admin'),
+        ('sitemap', 'get', reverse('sitemap'), None),
+        ('sitemap-tranche', 'get', reverse('sitemap-tranche', args=[f'articles-{article.pk // diffusion.taille_tranche()}.xml']), None),
+        ('flux-syndication', 'get', reverse('flux-syndication', args=[diffusion.FLUX_GLOBAL, 'rss']), None),
+    ]
+
+
+def centile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(round(p / 100 * (len(valeurs) - 1))))]
+
+
+def mesurer(repetitions=10, client=None):
+    """
+    Mesure chaque endpoint, cache vidé avant chaque appel (chemin base de données).
+    Sitemaps et flux sont générés dans un dossier temporaire ; chaque like vient
+    d'un lecteur et d'une IP neufs, pour n'être ni limité ni dédoublonné.
+    """
+    client = client or Client()
+    admin, _ = User.objects.get_or_create(username='bench-admin', defaults={'is_staff': True})
+    clients = {None: client, 'lecteur': Client(), 'admin': Client()}
+    clients['admin'].force_login(admin)
+    resultats = {}
+    with tempfile.TemporaryDirectory() as dossier, override_settings(BLOG_DIFFUSION_RACINE=dossier):
+        diffusion.generer(forcer=True)
+        for nom, methode, url, compte in endpoints():
+            appeler = getattr(clients[compte], methode)
+            latences = []
+            for _ in range(repetitions):
+                if compte == 'lecteur':
+                    clients[compte].force_login(User.objects.create(username=f'bench-lecteur-{adresse()}'))
+                cache.clear()
+                reset_queries()  # queries_log est borné : un journal plein fausserait le compte
+                debut = time.perf_counter()
+                with CaptureQueriesContext(connection) as requetes:
+                    reponse = appeler(url, REMOTE_ADDR=adresse())
+                    reponse.getvalue()  # export, sitemaps, flux : réponses en flux, lues jusqu'au bout
+                    reponse.close()
+                # compté tout de suite : la requête suivante vide le journal (reset_queries)
+                nb_requetes = len(requetes)
+                latences.append((time.perf_counter() - debut) * 1000)
+                assert reponse.status_code in (200, 202), f"{nom}: HTTP {reponse.status_code}"
+
+            if compte == 'lecteur':
+                clients[compte].force_login(User.objects.create(username=f'bench-lecteur-{adresse()}'))
+            cache.clear()
+            tracemalloc.start()
+            appeler(url, REMOTE_ADDR=adresse()).close()
+            _, pic = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            resultats[nom] = {
+                'requetes': nb_requetes,
+                'p50_ms': round(statistics.median(latences), 2),
+                'p95_ms': round(centile(latences, 95), 2),
+                'memoire_pic_ko': round(pic / 1024, 1),
+            }
+    return resultats
+
+
+_adresses = itertools.count(1)
+
+
+def adresse():
+    n = next(_adresses)
+    return f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'
+
+
+def charger_baseline(chemin=BASELINE):
+    with open(chemin, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ecrire_baseline(resultats, chemin=BASELINE):
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def comparer(petit, grand, baseline=None):
+    """Liste des régressions de nombre de requêtes (vide si tout va bien)."""
+    erreurs = []
+    for nom, mesure in grand.items():
+        if nom in petit and mesure['requetes'] > petit[nom]['requetes']:
+            erreurs.append(
+                f"{nom}: {petit[nom]['requetes']} -> {mesure['requetes']} requêtes quand N augmente"
+            )
+        if baseline and nom in baseline and mesure['requetes'] > baseline[nom]['requetes']:
+            erreurs.append(
+                f"{nom}: {mesure['requetes']} requêtes, référence {baseline[nom]['requetes']}"
+            )
+    return erreurs
+
+
+def stress_ecritures(fils=8, ecritures=50):
+    """
+    ``fils`` threads écrivent chacun ``ecritures`` commentaires (un article tous
+    les dix) ; retourne débit, latences et erreurs restées après réessais.
+    """
+    article = Article.objects.create(titre="Stress", contenu="...", statut='published')
+    latences, erreurs = [], []
+    verrou = threading.Lock()
+
+    def ecrivain(numero):
+        try:
+            for i in range(ecritures):
+                debut = time.perf_counter()
+                try:
+                    if i % 10 == 0:
+                        Article.objects.create(titre=f"Stress {numero}", contenu="...")
+                    else:
+                        Commentaire.objects.create(article_id=article.pk, auteur=f"Fil {numero}",
+                                                   contenu=f"Commentaire {i}")
+                except OperationalError as exc:
+                    with verrou:
+                        erreurs.append(str(exc))
+                else:
+                    with verrou:
+                        latences.append((time.perf_counter() - debut) * 1000)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=ecrivain, args=(n,)) for n in range(fils)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+    return {
+        'ecritures_s': round(len(latences) / duree, 1),
+        'p50_ms': round(statistics.median(latences), 2) if latences else None,
+        'p95_ms': round(centile(latences, 95), 2) if latences else None,
+        'erreurs': len(erreurs),
+    }
+
+
+def paires_async():
+    """(nom, url synchrone, url asynchrone) pour chaque lecture doublée en ASGI."""
+    article = Article.objects.filter(statut='published').order_by('id').first()
+    return [
+        ('article-list', reverse('article-list'), reverse('async-article-list')),
+        ('article-list-page-2', reverse('article-list') + '?page=2', reverse('async-article-list') + '?page=2'),
+        ('article-detail', reverse('article-detail', args=[article.pk]),
+         reverse('async-article-detail', args=[article.pk])),
+        ('article-by-slug', reverse('article-by-slug', args=[article.slug]),
+         reverse('async-article-by-slug', args=[article.slug])),
+        ('categorie-list', reverse('categorie-list'), reverse('async-categorie-list')),
+        ('skills_list', reverse('skills_list'), reverse('skills_list_async')),
+    ]
+
+
+async def appel_asgi(application, url):
+    """Une requête GET HTTP/1.1 passée à l'application ASGI ; retourne le statut."""
+    chemin, _, requete = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': chemin, 'raw_path': chemin.encode(), 'query_string': requete.encode(),
+        'root_path': '', 'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    messages, corps_envoye, fini = [], False, asyncio.Event()
+
+    async def receive():
+        nonlocal corps_envoye
+        if not corps_envoye:
+            corps_envoye = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await fini.wait()  # le client reste connecté jusqu'à la fin de la réponse
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body'):
+            fini.set()
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+async def charge(application, url, concurrence, requetes):
+    """``requetes`` GET répartis sur ``concurrence`` clients simultanés."""
+    latences, statuts = [], set()
+    restantes = iter(range(requetes))
+
+    async def client():
+        for _ in restantes:
+            debut = time.perf_counter()
+            statuts.add(await appel_asgi(application, url))
+            latences.append((time.perf_counter() - debut) * 1000)
+
+    debut = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrence)])
+    duree = time.perf_counter() - debut
+    return {
+        'requetes_s': round(requetes / duree, 1),
+        'p50_ms': round(statistics.median(latences), 2),
+        'p95_ms': round(centile(latences, 95), 2),
+        'statuts': sorted(statuts),
+    }
+
+
+async def charge_asgi(paires, concurrence=50, requetes=500, application=None):
+    """{nom: {'sync': mesures, 'async': mesures}} pour chaque paire de ``paires_async``."""
+    if application is None:
+        from backend.asgi import application
+    resultats = {}
+    for nom, url_sync, url_async in paires:
+        resultats[nom] = {
+            'sync': await charge(application, url_sync, concurrence, requetes),
+            'async': await charge(application, url_async, concurrence, requetes),
+        }
+    return resultats
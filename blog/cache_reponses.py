@@ -0,0 +1,107 @@
+"""
+Cache des réponses de lecture d'``ArticleViewSet`` (liste, détail, by-slug).
+
+La clé combine la classe de visibilité (``staff`` ou ``public``, puisque
+``get_queryset`` filtre les brouillons pour le public), le schéma et l'hôte
+(les liens ``next`` / ``previous`` et les URL d'images sont absolus), le
+chemin complet avec ses paramètres, et les versions des étiquettes dont dépend la réponse
+(``blog.versions``). Invalider une étiquette rend donc caduques toutes les
+réponses qui en dépendent, sans avoir à les énumérer. Un hit est servi sans
+aucune requête SQL, y compris le 304 des requêtes conditionnelles.
+
+by-slug passe par une correspondance slug -> id (``cle_slug``), gardée
+``BLOG_CACHE_SLUG_TIMEOUT`` secondes et effacée à chaque enregistrement ou
+suppression d'un article portant ce slug : un slug libéré puis repris par un
+autre article ne pointe jamais vers l'ancien.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .popularite import tri_populaire
+from .versions import versions
+
+CACHE_PREFIX = 'blog:reponse'
+
+
+def cle_slug(slug):
+    return f"blog:slug:{slug}"
+
+
+def retenir_slug(slug, article_id):
+    cache.set(cle_slug(slug), article_id, getattr(settings, 'BLOG_CACHE_SLUG_TIMEOUT', 24 * 3600))
+
+
+def oublier_slugs(*slugs):
+    cache.delete_many([cle_slug(slug) for slug in slugs])
+
+
+def etiquettes_liste(request, **kwargs):
+    # un tri par vues / likes / tendance change à chaque vidage des compteurs
+    return ['articles', 'categories', 'tags', 'commentaires'] + (['popularite'] if tri_populaire(request) else [])
+
+
+def etiquettes_article(request, pk=None, **kwargs):
+    return [f'article:{pk}', f'commentaires:{pk}', 'categories', 'tags']
+
+
+def etiquettes_slug(request, pk=None, **kwargs):
+    # by-slug : l'id vient de la correspondance slug -> id posée au premier passage
+    article_id = cache.get(cle_slug(pk))
+    return etiquettes_article(request, pk=article_id) if article_id else None
+
+
+def visibilite(request):
+    user = getattr(request, 'user', None)
+    return 'staff' if user and user.is_staff else 'public'
+
+
+def cle_reponse(request, etiquettes):
+    v = versions(*etiquettes)
+    adresse = (request.scheme, request.get_host(), request.get_full_path())
+    empreinte = hashlib.md5(repr((adresse, sorted(v.items()))).encode()).hexdigest()
+    return f"{CACHE_PREFIX}:{visibilite(request)}:{empreinte}"
+
+
+def servir(request, entree):
+    reponse = get_conditional_response(request, etag=entree['etag'], last_modified=entree['last_modified'])
+    if reponse is None:
+        reponse = Response(entree['data'])
+        reponse['ETag'] = entree['etag']
+        if entree['last_modified'] is not None:
+            reponse['Last-Modified'] = http_date(entree['last_modified'])
+    patch_vary_headers(reponse, ('Authorization', 'Cookie'))
+    return reponse
+
+
+def reponse_en_cache(etiquettes):
+    """
+    Décorateur d'action de lecture : ``etiquettes(request, **kwargs)`` donne les
+    étiquettes dont dépend la réponse (ou None pour ne pas utiliser le cache).
+    """
+    def decorateur(methode):
+        @wraps(methode)
+        def wrapper(self, request, *args, **kwargs):
+            liste = etiquettes(request, **kwargs)
+            if liste is None:
+                return methode(self, request, *args, **kwargs)
+            cle = cle_reponse(request, liste)
+            entree = cache.get(cle)
+            if entree is not None:
+                return servir(request, entree)
+
+            reponse = methode(self, request, *args, **kwargs)
+            if reponse.status_code == 200 and 'ETag' in reponse:
+                cache.set(cle, {
+                    'data': reponse.data,
+                    'etag': reponse['ETag'],
+                    'last_modified': parse_http_date_safe(reponse.get('Last-Modified')),
+                }, getattr(settings, 'BLOG_CACHE_REPONSES_TIMEOUT', 60 * 10))
+            return reponse
+        return wrapper
+    return decorateur
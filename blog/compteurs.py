@@ -0,0 +1,155 @@
+"""
+Compteurs dénormalisés : ``Article.nb_commentaires_valides`` et
+``Commentaire.nb_reponses`` (réponses validées).
+
+Un commentaire validé « contribue » +1 à son article et +1 à son parent. À
+chaque enregistrement, l'ancienne contribution (mémorisée au chargement) est
+retirée et la nouvelle ajoutée, par des UPDATE en ``F()`` dans la transaction
+de l'écriture (sur ``Article`` et sur sa copie du flux public,
+``ArticlePublie``). ``valider_commentaires`` et ``rejeter_commentaires`` font de
+même pour la modération en masse, qui passe par ``queryset.update()`` et ne
+déclenche aucun signal.
+"""
+from collections import Counter
+
+from django.db import router, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .arbre_commentaires import invalider_arbre
+from .models import Article, ArticlePublie, Commentaire
+
+
+def contribution(commentaire):
+    """(article_id, parent_id) comptés pour ce commentaire, ou None si non validé / inconnu."""
+    if {'valide', 'article_id', 'parent_id'} & commentaire.get_deferred_fields():
+        return None
+    if not commentaire.valide:
+        return (None, None)
+    return (commentaire.article_id, commentaire.parent_id)
+
+
+def appliquer(model, champ, deltas, using=None):
+    # un seul UPDATE pour toutes les lignes : champ = champ + CASE pk WHEN ... END
+    deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+    if not deltas:
+        return
+    increment = Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0), output_field=IntegerField(),
+    )
+    model.objects.using(using).filter(pk__in=deltas).update(**{champ: F(champ) + increment})
+
+
+def appliquer_contributions(avant, apres, using=None):
+    articles, parents = Counter(), Counter()
+    for article_id, parent_id in avant:
+        articles[article_id] -= 1
+        parents[parent_id] -= 1
+    for article_id, parent_id in apres:
+        articles[article_id] += 1
+        parents[parent_id] += 1
+    appliquer(Article, 'nb_commentaires_valides', articles, using)
+    appliquer(ArticlePublie, 'nb_commentaires_valides', articles, using)
+    appliquer(Commentaire, 'nb_reponses', parents, using)
+
+
+def commentaire_enregistre(commentaire, created):
+    avant = (None, None) if created else commentaire._contribution_compteurs
+    if avant is None:
+        # état d'origine inconnu (champs différés) : recalcul ciblé
+        recalculer(article_ids=[commentaire.article_id])
+    else:
+        appliquer_contributions([avant], [contribution(commentaire)])
+    commentaire._contribution_compteurs = contribution(commentaire)
+
+
+def commentaire_supprime(commentaire):
+    avant = commentaire._contribution_compteurs
+    if avant is None:
+        recalculer(article_ids=[commentaire.article_id])
+    else:
+        appliquer_contributions([avant], [])
+
+
+def valider_commentaires(queryset, auto=False):
+    """
+    Valide en masse les commentaires du queryset ; retourne le nombre validé.
+    ``auto`` : décision du modèle (``blog.moderation``), pas d'un modérateur.
+    """
+    alias = queryset._db or router.db_for_write(Commentaire)
+    with transaction.atomic(using=alias):
+        lignes = list(
+            Commentaire.objects.using(alias).filter(pk__in=queryset.values('pk'), valide=False)
+            .select_for_update().order_by().values_list('id', 'article_id', 'parent_id')
+        )
+        if not lignes:
+            return 0
+        ids = [id_ for id_, _, _ in lignes]
+        Commentaire.objects.using(alias).filter(id__in=ids).update(
+            valide=True, statut_moderation='valide', moderation_auto=auto,
+        )
+        appliquer_contributions([], [(article_id, parent_id) for _, article_id, parent_id in lignes], alias)
+    invalider_arbre(*{article_id for _, article_id, _ in lignes})
+    return len(lignes)
+
+
+def rejeter_commentaires(queryset):
+    """Marque en masse les commentaires du queryset comme spam (dé-validés) ; retourne leur nombre."""
+    alias = queryset._db or router.db_for_write(Commentaire)
+    with transaction.atomic(using=alias):
+        lignes = list(
+            Commentaire.objects.using(alias).filter(pk__in=queryset.values('pk')).select_for_update()
+            .order_by().values_list('id', 'article_id', 'parent_id', 'valide')
+        )
+        if not lignes:
+            return 0
+        Commentaire.objects.using(alias).filter(id__in=[l[0] for l in lignes]).update(
+            valide=False, statut_moderation='spam', moderation_auto=False,
+        )
+        appliquer_contributions(
+            [(article_id, parent_id) for _, article_id, parent_id, valide in lignes if valide], [], alias,
+        )
+    invalider_arbre(*{article_id for _, article_id, _, valide in lignes if valide})
+    return len(lignes)
+
+
+def nb_commentaires_reel():
+    return Coalesce(Subquery(
+        Commentaire.objects.filter(article=OuterRef('pk'), valide=True)
+        .order_by().values('article').annotate(n=Count('id')).values('n')
+    ), 0)
+
+
+def nb_reponses_reel():
+    return Coalesce(Subquery(
+        Commentaire.objects.filter(parent=OuterRef('pk'), valide=True)
+        .order_by().values('parent').annotate(n=Count('id')).values('n')
+    ), 0)
+
+
+def recalculer(article_ids=None):
+    """Recalcule les compteurs depuis les commentaires (tous, ou ceux des articles donnés)."""
+    articles = Article.objects.all()
+    commentaires = Commentaire.objects.all()
+    if article_ids is not None:
+        articles = articles.filter(pk__in=article_ids)
+        commentaires = commentaires.filter(article_id__in=article_ids)
+    with transaction.atomic():
+        nb_articles = articles.update(nb_commentaires_valides=nb_commentaires_reel())
+        ArticlePublie.objects.filter(pk__in=articles.values('pk')).update(nb_commentaires_valides=Subquery(
+            Article.objects.filter(pk=OuterRef('pk')).values('nb_commentaires_valides')
+        ))
+        nb_commentaires = commentaires.update(nb_reponses=nb_reponses_reel())
+    return nb_articles, nb_commentaires
+
+
+def verifier():
+    """Retourne les écarts : (articles, commentaires) dont le compteur est faux."""
+    articles = Article.objects.annotate(reel=nb_commentaires_reel()).exclude(
+        nb_commentaires_valides=F('reel')
+    ).values_list('pk', 'nb_commentaires_valides', 'reel')
+    commentaires = Commentaire.objects.annotate(reel=nb_reponses_reel()).exclude(
+        nb_reponses=F('reel')
+    ).values_list('pk', 'nb_reponses', 'reel')
+    return list(articles), list(commentaires)
@@ -0,0 +1,64 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les endpoints d'articles.
+
+Les validateurs sont calculés avant toute sérialisation : une requête
+d'agrégat légère (``date_modification`` de l'article, ou max + nombre pour une
+liste filtrée) complétée par les versions d'invalidation du cache
+(``blog.versions``) pour ce que ``date_modification`` ne couvre pas :
+catégories renommées et commentaires. Un client à jour reçoit un 304.
+"""
+import datetime
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .popularite import tri_populaire
+from .versions import versions
+
+
+class Validateurs:
+    def __init__(self, request, *parties, dates=()):
+        user = getattr(request, 'user', None)
+        parties = (bool(user and user.is_staff),) + parties
+        self.etag = quote_etag(hashlib.md5(repr(parties).encode()).hexdigest())
+        horodatages = [d.timestamp() if isinstance(d, datetime.datetime) else d for d in dates if d]
+        self.last_modified = int(max(horodatages)) if horodatages else None
+
+    def reponse_304(self, request):
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def annoter(self, response):
+        if response.status_code == 200:
+            response['ETag'] = self.etag
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified)
+        # le contenu dépend du profil (staff ou non)
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+def validateurs_article(request, queryset, **lookup):
+    try:
+        ligne = queryset.filter(**lookup).values_list('pk', 'date_modification').first()
+    except (TypeError, ValueError, ValidationError):
+        ligne = None
+    if ligne is None:
+        return None  # la vue répondra 404
+    article_id, date_modification = ligne
+    v = versions('categories', 'tags', f'commentaires:{article_id}')
+    return Validateurs(
+        request, 'article', article_id, date_modification, *v.values(),
+        dates=[date_modification, *v.values()],
+    )
+
+
+def validateurs_liste(request, queryset):
+    stats = queryset.order_by().aggregate(maj=Max('date_modification'), nb=Count('pk'))
+    v = versions('categories', 'tags', 'commentaires', *(['popularite'] if tri_populaire(request) else []))
+    return Validateurs(
+        request, 'liste', request.get_full_path(), stats['maj'], stats['nb'], *v.values(),
+        dates=[stats['maj'], *v.values()],
+    )
@@ -0,0 +1,246 @@
+"""
+Sitemaps et flux RSS / Atom, pré-rendus en fichiers statiques.
+
+Tout est lu dans le flux public dénormalisé (``ArticlePublie``, cf.
+``blog.flux``) et écrit sous ``BLOG_DIFFUSION_RACINE`` :
+
+* ``sitemap.xml`` : index des tranches ;
+* ``sitemaps/articles-<n>.xml`` : tranche ``n`` = articles publiés dont l'id
+  est dans ``[n * T, (n + 1) * T)`` (``T`` = ``BLOG_SITEMAP_TAILLE``). Une
+  tranche garde ainsi les mêmes articles quand d'autres sont ajoutés ou
+  retirés ;
+* ``flux/<slug>.rss`` / ``flux/<slug>.atom`` : derniers articles d'une
+  catégorie, et ``flux/_tous.*`` pour tout le blog (``slugify`` ne produit
+  jamais de slug commençant par ``_`` : pas de collision avec une catégorie).
+
+La commande ``generer_diffusion`` ne réécrit que ce qui a changé : pour chaque
+tranche et chaque catégorie, une signature (max ``date_modification``, nombre
+et somme des ids, plus le nom de la catégorie) est calculée par requêtes
+agrégées (GROUP BY tranche, GROUP BY catégorie) et comparée à celle du manifeste du passage précédent. Les
+tranches sont écrites en flux depuis ``.iterator()`` dans un fichier
+temporaire, puis mises en place par ``os.replace`` (jamais de fichier à
+moitié écrit). ``servir`` les sert avec ETag / Last-Modified.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, F, Max, Sum
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date, quote_etag
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .models import ArticlePublie
+
+NS_SITEMAP = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+FORMATS_FLUX = {
+    # extension -> (générateur, type MIME)
+    'rss': (Rss201rev2Feed, 'application/rss+xml; charset=utf-8'),
+    'atom': (Atom1Feed, 'application/atom+xml; charset=utf-8'),
+}
+FLUX_GLOBAL = '_tous'
+
+
+def racine():
+    return Path(getattr(settings, 'BLOG_DIFFUSION_RACINE', settings.BASE_DIR / 'diffusion'))
+
+
+def taille_tranche():
+    return getattr(settings, 'BLOG_SITEMAP_TAILLE', 5000)
+
+
+def url_publique(chemin):
+    return getattr(settings, 'BLOG_URL_PUBLIQUE', 'http://localhost:8000').rstrip('/') + chemin
+
+
+def url_article(slug):
+    return url_publique(getattr(settings, 'BLOG_CHEMIN_ARTICLE', '/api/articles/{slug}/by-slug/').format(slug=slug))
+
+
+def ecrire(chemin, rendu):
+    """Écrit ``rendu(fichier)`` dans un temporaire puis le met en place atomiquement."""
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=chemin.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descripteur, 'w', encoding='utf-8') as fichier:
+            rendu(fichier)
+        os.chmod(temporaire, 0o644)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+
+
+def signature(ligne):
+    return [ligne['maj'].isoformat(), ligne['nb'], ligne['somme']]
+
+
+# --- sitemaps ------------------------------------------------------------------
+
+def signatures_tranches(taille):
+    lignes = (
+        ArticlePublie.objects.order_by().annotate(tranche=F('id') / taille).values('tranche')
+        .annotate(maj=Max('date_modification'), nb=Count('id'), somme=Sum('id'))
+    )
+    return {str(ligne['tranche']): signature(ligne) for ligne in lignes}
+
+
+def nom_tranche(tranche):
+    return f'sitemaps/articles-{tranche}.xml'
+
+
+def ecrire_tranche(tranche, taille):
+    debut = int(tranche) * taille
+    articles = (
+        ArticlePublie.objects.filter(id__gte=debut, id__lt=debut + taille).order_by('id')
+        .values_list('slug', 'date_modification').iterator(chunk_size=1000)
+    )
+
+    def rendu(fichier):
+        xml = SimplerXMLGenerator(fichier, 'utf-8')
+        xml.startDocument()
+        xml.startElement('urlset', {'xmlns': NS_SITEMAP})
+        for slug, date_modification in articles:
+            xml.startElement('url', {})
+            xml.addQuickElement('loc', url_article(slug))
+            xml.addQuickElement('lastmod', date_modification.isoformat(timespec='seconds'))
+            xml.endElement('url')
+        xml.endElement('urlset')
+        xml.endDocument()
+
+    ecrire(racine() / nom_tranche(tranche), rendu)
+
+
+def ecrire_index(tranches):
+    def rendu(fichier):
+        xml = SimplerXMLGenerator(fichier, 'utf-8')
+        xml.startDocument()
+        xml.startElement('sitemapindex', {'xmlns': NS_SITEMAP})
+        for tranche, (maj, _, _) in sorted(tranches.items(), key=lambda element: int(element[0])):
+            xml.startElement('sitemap', {})
+            xml.addQuickElement('loc', url_publique(f'/{nom_tranche(tranche)}'))
+            xml.addQuickElement('lastmod', maj)
+            xml.endElement('sitemap')
+        xml.endElement('sitemapindex')
+        xml.endDocument()
+
+    ecrire(racine() / 'sitemap.xml', rendu)
+
+
+# --- flux RSS / Atom -----------------------------------------------------------
+
+def signatures_flux():
+    """{nom du flux: signature} pour le flux global et chaque catégorie ayant des articles publiés."""
+    agregats = {'maj': Max('date_modification'), 'nb': Count('id'), 'somme': Sum('id')}
+    signatures = {
+        ligne['categorie_slug']: signature(ligne) + [ligne['categorie_nom']]
+        for ligne in ArticlePublie.objects.exclude(categorie_id=None).order_by()
+        .values('categorie_slug', 'categorie_nom').annotate(**agregats)
+    }
+    total = ArticlePublie.objects.aggregate(**agregats)
+    if total['nb']:
+        signatures[FLUX_GLOBAL] = signature(total)
+    return signatures
+
+
+def ecrire_flux(nom):
+    articles = ArticlePublie.objects.all()
+    titre = getattr(settings, 'BLOG_TITRE', 'Soft Skills')
+    if nom != FLUX_GLOBAL:
+        articles = articles.filter(categorie_slug=nom)
+        titre = f"{titre} — {articles.values_list('categorie_nom', flat=True).first()}"
+    derniers = list(articles[:getattr(settings, 'BLOG_FLUX_TAILLE', 20)])
+
+    for extension, (generateur, _) in FORMATS_FLUX.items():
+        document = generateur(
+            title=titre, link=url_publique('/'), description=titre,
+            feed_url=url_publique(f'/flux/{nom}.{extension}'), language=settings.LANGUAGE_CODE,
+        )
+        for article in derniers:
+            document.add_item(
+                title=article.titre,
+                link=url_article(article.slug),
+                description=article.meta_description or article.extrait,
+                author_name=article.auteur_nom,
+                pubdate=article.date_creation,
+                updateddate=article.date_modification,
+                unique_id=url_article(article.slug),
+                categories=[mot.strip() for mot in article.mots_cles.split(',') if mot.strip()],
+            )
+        ecrire(racine() / 'flux' / f'{nom}.{extension}', lambda fichier: document.write(fichier, 'utf-8'))
+
+
+# --- génération incrémentale ---------------------------------------------------
+
+def lire_manifeste():
+    try:
+        return json.loads((racine() / 'manifeste.json').read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def supprimer(nom):
+    try:
+        (racine() / nom).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def generer(forcer=False):
+    """Réécrit les tranches et flux modifiés ; retourne le nombre de fichiers écrits et supprimés."""
+    taille = taille_tranche()
+    ancien = lire_manifeste()
+    if forcer or ancien.get('taille') != taille or ancien.get('url') != url_publique(''):
+        ancien = {}
+    anciennes_tranches, anciens_flux = ancien.get('tranches', {}), ancien.get('flux', {})
+    stats = {'ecrits': 0, 'supprimes': 0}
+
+    tranches = signatures_tranches(taille)
+    for tranche, sig in tranches.items():
+        if anciennes_tranches.get(tranche) != sig:
+            ecrire_tranche(tranche, taille)
+            stats['ecrits'] += 1
+    for tranche in set(anciennes_tranches) - set(tranches):
+        supprimer(nom_tranche(tranche))
+        stats['supprimes'] += 1
+    if tranches != anciennes_tranches or not (racine() / 'sitemap.xml').exists():
+        ecrire_index(tranches)
+        stats['ecrits'] += 1
+
+    signatures = signatures_flux()
+    for nom, sig in signatures.items():
+        if anciens_flux.get(nom) != sig:
+            ecrire_flux(nom)
+            stats['ecrits'] += len(FORMATS_FLUX)
+    for nom in set(anciens_flux) - set(signatures):
+        for extension in FORMATS_FLUX:
+            supprimer(f'flux/{nom}.{extension}')
+            stats['supprimes'] += 1
+
+    ecrire(racine() / 'manifeste.json', lambda fichier: json.dump({
+        'taille': taille, 'url': url_publique(''), 'tranches': tranches, 'flux': signatures,
+    }, fichier))
+    return stats
+
+
+# --- service -------------------------------------------------------------------
+
+def servir(request, chemin, content_type='application/xml; charset=utf-8'):
+    """Sert un fichier pré-rendu, avec 304 si le client a déjà cette version."""
+    fichier = racine() / chemin
+    try:
+        etat = fichier.stat()
+    except FileNotFoundError:
+        raise Http404("Fichier non généré (commande generer_diffusion).")
+    etag = quote_etag(hashlib.md5(f'{etat.st_mtime_ns}:{etat.st_size}'.encode()).hexdigest())
+    reponse = get_conditional_response(request, etag=etag, last_modified=int(etat.st_mtime))
+    if reponse is None:
+        reponse = FileResponse(fichier.open('rb'), content_type=content_type)
+        reponse['ETag'] = etag
+        reponse['Last-Modified'] = http_date(etat.st_mtime)
+    return reponse
@@ -0,0 +1,134 @@
+"""
+Flux public : table ``ArticlePublie``, copie dénormalisée des articles publiés.
+
+La liste publique (``/api/articles/`` pour un visiteur non staff, avec ou sans
+``?categorie__slug=``) lit une tranche contiguë de cette table, dans l'ordre
+de ses index ``(date_creation, id)`` et ``(categorie_slug, date_creation,
+id)`` : ni jointure, ni filtre sur ``statut``, ni découpage de l'extrait. La
+recherche, le tri explicite et les vues staff restent sur ``Article``.
+
+Mise à jour incrémentale, ligne par ligne :
+
+* ``rafraichir(*ids)`` recopie les articles donnés (ou retire ceux qui ne
+  sont plus publiés) — appelé par les signaux d'``Article`` et après les
+  écritures en masse (import, rendus d'images, jeux de benchmark) ;
+* ``renommer_categorie`` / ``renommer_auteur`` / ``detacher`` propagent les
+  changements des lignes liées ;
+* ``blog.compteurs`` applique ses deltas aux deux tables.
+
+``reconstruire()`` repart de zéro et ``verifier()`` liste les écarts (commande
+``reconstruire_flux``).
+"""
+from django.db import transaction
+
+from .models import Article, ArticlePublie
+
+CHAMPS = [
+    'titre', 'slug', 'extrait', 'image', 'rendus', 'rendus_pour', 'categorie_id', 'categorie_nom',
+    'categorie_slug', 'auteur_id', 'auteur_nom', 'date_creation', 'date_modification', 'statut',
+    'meta_description', 'mots_cles', 'nb_commentaires_valides',
+]
+# paramètres qu'une liste servie par le flux sait honorer
+PARAMETRES = {'page', 'cursor', 'count', 'format', 'categorie__slug', 'statut'}
+
+
+def ligne(article):
+    categorie, auteur = article.categorie, article.auteur
+    return ArticlePublie(
+        id=article.pk,
+        titre=article.titre,
+        slug=article.slug,
+        extrait=article.extrait,
+        image=article.image.name or '',
+        rendus=article.rendus,
+        rendus_pour=article.rendus_pour,
+        categorie_id=article.categorie_id,
+        categorie_nom=categorie.nom if categorie else None,
+        categorie_slug=categorie.slug if categorie else None,
+        auteur_id=article.auteur_id,
+        auteur_nom=auteur.get_username() if auteur else None,
+        date_creation=article.date_creation,
+        date_modification=article.date_modification,
+        statut=article.statut,
+        meta_description=article.meta_description,
+        mots_cles=article.mots_cles,
+        nb_commentaires_valides=article.nb_commentaires_valides,
+    )
+
+
+def publies(article_ids=None):
+    articles = Article.objects.filter(statut='published').select_related('categorie', 'auteur')
+    if article_ids is not None:
+        articles = articles.filter(pk__in=article_ids)
+    return articles
+
+
+def rafraichir(*article_ids):
+    """Recopie les articles donnés dans le flux, ou les en retire s'ils ne sont plus publiés."""
+    if not article_ids:
+        return
+    with transaction.atomic():
+        lignes = [ligne(article) for article in publies(article_ids)]
+        ArticlePublie.objects.filter(pk__in=article_ids).exclude(pk__in=[l.pk for l in lignes]).delete()
+        ArticlePublie.objects.bulk_create(
+            lignes, update_conflicts=True, unique_fields=['id'], update_fields=CHAMPS,
+        )
+
+
+def retirer(*article_ids):
+    ArticlePublie.objects.filter(pk__in=article_ids).delete()
+
+
+def renommer_categorie(categorie):
+    ArticlePublie.objects.filter(categorie_id=categorie.pk).update(
+        categorie_nom=categorie.nom, categorie_slug=categorie.slug,
+    )
+
+
+def renommer_auteur(user):
+    ArticlePublie.objects.filter(auteur_id=user.pk).update(auteur_nom=user.get_username())
+
+
+def detacher(**lien):
+    """Catégorie ou auteur supprimé : les articles passent à NULL (SET_NULL) sans signal."""
+    (champ, pk), = lien.items()
+    valeurs = {f'{champ}_id': None, f'{champ}_nom': None}
+    if champ == 'categorie':
+        valeurs['categorie_slug'] = None
+    ArticlePublie.objects.filter(**{f'{champ}_id': pk}).update(**valeurs)
+
+
+def reconstruire(taille=500):
+    """Vide et remplit le flux depuis ``Article`` ; retourne le nombre de lignes."""
+    total = 0
+    with transaction.atomic():
+        ArticlePublie.objects.all().delete()
+        lot = []
+        for article in publies().order_by().iterator(chunk_size=taille):
+            lot.append(ligne(article))
+            if len(lot) >= taille:
+                total += len(ArticlePublie.objects.bulk_create(lot))
+                lot = []
+        total += len(ArticlePublie.objects.bulk_create(lot))
+    return total
+
+
+def verifier():
+    """Ids des articles dont la ligne du flux manque, est en trop ou diffère."""
+    attendu = {article.pk: ligne(article) for article in publies()}
+    ecarts = []
+    for actuelle in ArticlePublie.objects.all():
+        reference = attendu.pop(actuelle.pk, None)
+        if reference is None or any(getattr(reference, c) != getattr(actuelle, c) for c in CHAMPS):
+            ecarts.append(actuelle.pk)
+    return sorted(ecarts + list(attendu))
+
+
+def liste_publique(parametres):
+    """Queryset du flux pour ces paramètres de liste, ou None s'il faut passer par ``Article``."""
+    if set(parametres) - PARAMETRES or parametres.get('statut', 'published') not in ('', 'published'):
+        return None
+    queryset = ArticlePublie.objects.all()
+    if parametres.get('categorie__slug'):
+        queryset = queryset.filter(categorie_slug=parametres['categorie__slug'])
+    return queryset
@@ -3,6 +3,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Article, Commentaire, Categorie, Tag, AbonnementNewsletter
+from skills.models import Skill
 from django.contrib.auth.models import User
 
 
@@ -20,10 +21,8 @@ class ArticleForm(forms.ModelForm):
     class Meta:
         model = Article
         fields = [
-            'titre', 'sous_titre', 'resume', 'contenu', 'categorie', 'tags',
-            'image_principale', 'image_alt', 'statut', 'type_article',
-            'date_publication', 'meta_title', 'meta_description', 'meta_keywords',
-            'epingle', 'commentaires_actifs', 'partage_reseaux'
+            'titre', 'contenu', 'categorie', 'tags', 'image', 'statut',
+            'date_publication', 'meta_description', 'mots_cles',
         ]
         
         widgets = {
@@ -31,40 +30,22 @@ class ArticleForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Titre de l\'article'
             }),
-            'sous_titre': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Sous-titre (optionnel)'
-            }),
-            'resume': forms.Textarea(attrs={
-                'class': 'form-control',
-                'rows': 3,
-                'placeholder': 'Résumé de l\'article (300 caractères max)'
-            }),
             'contenu': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 15,
                 'placeholder': 'Contenu de l\'article'
             }),
             'categorie': forms.Select(attrs={'class': 'form-control'}),
-            'image_alt': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Texte alternatif pour l\'image'
-            }),
             'statut': forms.Select(attrs={'class': 'form-control'}),
-            'type_article': forms.Select(attrs={'class': 'form-control'}),
             'date_publication': forms.DateTimeInput(attrs={
                 'class': 'form-control',
                 'type': 'datetime-local'
             }),
-            'meta_title': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Titre SEO (60 caractères max)'
-            }),
             'meta_description': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Description SEO (160 caractères max)'
             }),
-            'meta_keywords': forms.TextInput(attrs={
+            'mots_cles': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Mots-clés SEO séparés par des virgules'
             }),
@@ -76,26 +57,12 @@ class ArticleForm(forms.ModelForm):
             raise ValidationError('Le titre doit contenir au moins 10 caractères.')
         return titre
     
-    def clean_resume(self):
-        resume = self.cleaned_data.get('resume')
-        if len(resume) < 50:
-            raise ValidationError('Le résumé doit contenir au moins 50 caractères.')
-        if len(resume) > 300:
-            raise ValidationError('Le résumé ne peut pas dépasser 300 caractères.')
-        return resume
-    
     def clean_contenu(self):
         contenu = self.cleaned_data.get('contenu')
         if len(contenu) < 200:
             raise ValidationError('Le contenu doit contenir au moins 200 caractères.')
         return contenu
     
-    def clean_meta_title(self):
-        meta_title = self.cleaned_data.get('meta_title')
-        if meta_title and len(meta_title) > 60:
-            raise ValidationError('Le titre SEO ne peut pas dépasser 60 caractères.')
-        return meta_title
-    
     def clean_meta_description(self):
         meta_description = self.cleaned_data.get('meta_description')
         if meta_description and len(meta_description) > 160:
@@ -109,21 +76,13 @@ class CommentaireForm(forms.ModelForm):
     """
     class Meta:
         model = Commentaire
-        fields = ['nom', 'email', 'site_web', 'contenu']
+        fields = ['auteur', 'contenu']
         
         widgets = {
-            'nom': forms.TextInput(attrs={
+            'auteur': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Votre nom'
             }),
-            'email': forms.EmailInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Votre email'
-            }),
-            'site_web': forms.URLInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Votre site web (optionnel)'
-            }),
             'contenu': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 4,
@@ -139,11 +98,11 @@ class CommentaireForm(forms.ModelForm):
             raise ValidationError('Le commentaire ne peut pas dépasser 1000 caractères.')
         return contenu
     
-    def clean_nom(self):
-        nom = self.cleaned_data.get('nom')
-        if nom and len(nom) < 2:
+    def clean_auteur(self):
+        auteur = self.cleaned_data.get('auteur')
+        if auteur and len(auteur) < 2:
             raise ValidationError('Le nom doit contenir au moins 2 caractères.')
-        return nom
+        return auteur
 
 
 class CategorieForm(forms.ModelForm):
@@ -152,30 +111,13 @@ class CategorieForm(forms.ModelForm):
     """
     class Meta:
         model = Categorie
-        fields = ['nom', 'description', 'couleur', 'icone', 'meta_description', 'actif']
+        fields = ['nom']
         
         widgets = {
             'nom': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Nom de la catégorie'
             }),
-            'description': forms.Textarea(attrs={
-                'class': 'form-control',
-                'rows': 3,
-                'placeholder': 'Description de la catégorie'
-            }),
-            'couleur': forms.TextInput(attrs={
-                'class': 'form-control',
-                'type': 'color'
-            }),
-            'icone': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'fa-solid fa-brain (exemple)'
-            }),
-            'meta_description': forms.TextInput(attrs={
-                'class': 'form-control',
-                'placeholder': 'Description SEO (160 caractères max)'
-            }),
         }
     
     def clean_nom(self):
@@ -251,7 +193,7 @@ class RechercheArticleForm(forms.Form):
     )
     
     categorie = forms.ModelChoiceField(
-        queryset=Categorie.objects.filter(actif=True),
+        queryset=Categorie.objects.all(),
         required=False,
         empty_label="Toutes les catégories",
         widget=forms.Select(attrs={'class': 'form-control'})
@@ -351,18 +293,16 @@ class ModerationCommentaireForm(forms.Form):
     )
 
 
-    from .models import SoftSkill  # ⚠️ à vérifier si déjà importé
-
 class SoftSkillForm(forms.ModelForm):
     """
     Formulaire pour créer et modifier des Soft Skills
     """
     class Meta:
-        model = SoftSkill
-        fields = ['nom', 'description']
+        model = Skill
+        fields = ['name', 'description']
         
         widgets = {
-            'nom': forms.TextInput(attrs={
+            'name': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Nom du Soft Skill'
             }),
@@ -0,0 +1,133 @@
+"""
+Images d'articles : originaux dédoublonnés et déclinaisons responsive.
+
+* ``StockageDedoublonne`` range chaque original sous l'empreinte SHA-256 de
+  son contenu (``articles/<sha256>.<ext>``) : deux envois identiques partagent
+  le même fichier, le second n'écrit rien.
+* La commande ``generer_rendus`` (worker) produit, pour chaque article dont
+  ``rendus_pour`` ne correspond plus à ``image``, des déclinaisons WebP et JPEG
+  recompressées aux largeurs ``BLOG_IMAGES_LARGEURS`` (sans agrandir). Elles
+  sont elles aussi nommées d'après l'original, donc calculées une seule fois.
+* Les serializers exposent ``srcset`` (un attribut par format) dès que les
+  déclinaisons de l'image courante existent.
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .versions import invalider
+
+FORMATS = {
+    # format -> (format Pillow, extension, options d'enregistrement)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def largeurs():
+    return getattr(settings, 'BLOG_IMAGES_LARGEURS', (320, 640, 1024))
+
+
+class StockageDedoublonne(FileSystemStorage):
+    """Nomme les fichiers d'après l'empreinte de leur contenu."""
+
+    def save(self, name, content, max_length=None):
+        empreinte = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for morceau in content.chunks():
+            empreinte.update(morceau)
+        content.seek(0)
+        dossier, nom = os.path.split(name)
+        extension = os.path.splitext(nom)[1].lower()
+        name = os.path.join(dossier, f"{empreinte.hexdigest()}{extension}")
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+stockage = StockageDedoublonne()
+
+
+def stockage_images():
+    return stockage
+
+
+def nom_rendu(image, largeur, format_):
+    dossier, nom = os.path.split(image)
+    racine = os.path.splitext(nom)[0]
+    return os.path.join(dossier, 'rendus', f"{racine}-{largeur}.{FORMATS[format_][1]}")
+
+
+def generer(image):
+    """Crée (si besoin) les déclinaisons de ``image`` ; retourne {format: {largeur: nom}}."""
+    with stockage.open(image, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    cibles = sorted({min(largeur, original.width) for largeur in largeurs()})
+    rendus = {format_: {} for format_ in FORMATS}
+    for largeur in cibles:
+        copie = None
+        for format_, (format_pil, _, options) in FORMATS.items():
+            nom = nom_rendu(image, largeur, format_)
+            if not stockage.exists(nom):
+                if copie is None:
+                    hauteur = max(1, round(original.height * largeur / original.width))
+                    copie = original.resize((largeur, hauteur), Image.LANCZOS)
+                sortie = io.BytesIO()
+                (copie.convert('RGB') if format_pil == 'JPEG' else copie).save(sortie, format_pil, **options)
+                # nom déjà unique : on écrit sans repasser par le dédoublonnage
+                FileSystemStorage.save(stockage, nom, ContentFile(sortie.getvalue()))
+            rendus[format_][str(largeur)] = nom
+    return rendus
+
+
+def traiter(article):
+    """Génère les déclinaisons d'un article et les enregistre sans toucher au reste de la ligne."""
+    from . import flux
+    from .models import Article  # models.py importe ce module (stockage)
+
+    image = article.image.name
+    rendus = generer(image) if image else {}
+    # filtre sur l'image : si elle a changé entre-temps, le prochain passage s'en charge
+    mis_a_jour = Article.objects.filter(pk=article.pk, image=image).update(
+        rendus=rendus, rendus_pour=image, date_modification=timezone.now(),
+    )
+    if mis_a_jour:
+        flux.rafraichir(article.pk)
+        invalider('articles', f'article:{article.pk}')
+    return bool(mis_a_jour)
+
+
+def a_traiter():
+    from .models import Article
+
+    return Article.objects.exclude(image='').exclude(image__isnull=True).exclude(rendus_pour=F('image'))
+
+
+def url_image(nom, request=None):
+    # comme ImageField de DRF : URL absolue quand la requête est connue
+    url = stockage.url(nom)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def srcset(image, rendus, rendus_pour, url):
+    """{format: "url 320w, url 640w"} pour l'image courante, ou None si pas encore générée."""
+    if not image or not rendus or rendus_pour != image:
+        return None
+    return {
+        format_: ', '.join(f"{url(nom)} {largeur}w" for largeur, nom in sorted(
+            par_largeur.items(), key=lambda element: int(element[0])
+        ))
+        for format_, par_largeur in rendus.items()
+    }
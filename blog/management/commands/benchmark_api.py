@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from blog import benchmark, popularite
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure requêtes SQL, latences p50/p95 et pic mémoire de chaque endpoint sur une base "
+        "de test jetable, à deux tailles de jeu, et compare à blog/benchmarks/baseline.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100)
+        parser.add_argument('--facteur', type=int, default=5, help="Taille du second jeu : articles x facteur")
+        parser.add_argument('--commentaires', type=int, default=5)
+        parser.add_argument('--reponses', type=int, default=2)
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--ecrire-baseline', action='store_true', help="Enregistre les mesures comme référence")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # vues et likes comptés sur la base jetable : jamais vidés dans la vraie
+            with popularite.base_jetable():
+                mesures = []
+                deja = 0
+                for taille in (options['articles'], options['articles'] * options['facteur']):
+                    benchmark.generer_donnees(
+                        articles=taille - deja, commentaires=options['commentaires'], reponses=options['reponses'],
+                    )
+                    deja = taille
+                    resultats = benchmark.mesurer(options['repetitions'])
+                    mesures.append(resultats)
+                    self.afficher(taille, resultats)
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+            teardown_test_environment()
+
+        if options['ecrire_baseline']:
+            benchmark.ecrire_baseline(mesures[-1])
+            self.stdout.write(self.style.SUCCESS(f"Référence écrite dans {benchmark.BASELINE}"))
+            return
+
+        erreurs = benchmark.comparer(mesures[0], mesures[1], benchmark.charger_baseline())
+        if erreurs:
+            raise CommandError("Régressions :\n" + "\n".join(erreurs))
+        self.stdout.write(self.style.SUCCESS("Aucune régression du nombre de requêtes."))
+
+    def afficher(self, taille, resultats):
+        self.stdout.write(f"\n{taille} articles")
+        self.stdout.write(f"{'endpoint':<26}{'requêtes':>9}{'p50 ms':>9}{'p95 ms':>9}{'mém. ko':>10}")
+        for nom, m in resultats.items():
+            self.stdout.write(
+                f"{nom:<26}{m['requetes']:>9}{m['p50_ms']:>9}{m['p95_ms']:>9}{m['memoire_pic_ko']:>10}"
+            )
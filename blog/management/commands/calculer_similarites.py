@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.similarite import recalculer
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule l'index TF-IDF des articles publiés et leurs plus proches voisins "
+        "(après un import en masse, ou pour rafraîchir les IDF)."
+    )
+
+    def handle(self, *args, **options):
+        total = recalculer()
+        self.stdout.write(self.style.SUCCESS(f"{total} article(s) indexé(s)."))
@@ -0,0 +1,47 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from blog import benchmark, popularite
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge ASGI : débit et latences des lectures synchrones face à leurs versions "
+        "asynchrones (api/async/…), sur une base de test jetable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=200)
+        parser.add_argument('--concurrence', type=int, default=50, help="Clients simultanés")
+        parser.add_argument('--requetes', type=int, default=500, help="Requêtes par endpoint et par variante")
+        parser.add_argument('--avec-cache', action='store_true',
+                            help="Garde le cache (sinon DummyCache : on compare les chemins base de données)")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        reglages = {'DEBUG': False}  # pas de journal connection.queries pendant la charge
+        if not options['avec_cache']:
+            reglages['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        try:
+            benchmark.generer_donnees(articles=options['articles'])
+            paires = benchmark.paires_async()
+            # vues comptées sur la base jetable : jamais vidées dans la vraie
+            with override_settings(**reglages), popularite.base_jetable():
+                resultats = asyncio.run(
+                    benchmark.charge_asgi(paires, options['concurrence'], options['requetes'])
+                )
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'endpoint':<22}{'variante':<9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}  statuts")
+        for nom, variantes in resultats.items():
+            for variante, m in variantes.items():
+                self.stdout.write(
+                    f"{nom:<22}{variante:<9}{m['requetes_s']:>9}{m['p50_ms']:>9}{m['p95_ms']:>9}  {m['statuts']}"
+                )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.models import EnvoiNewsletter
+from blog.newsletter import envoyer
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie un nouveau numéro de la newsletter (--sujet) ou reprend le dernier envoi inachevé, "
+        "par lots d'abonnés sur une seule connexion, avec point de reprise après chaque lot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sujet', help="Crée un nouveau numéro avec ce sujet")
+        parser.add_argument('--introduction', default='', help="Texte placé avant la liste des articles")
+        parser.add_argument('--depuis', help="Articles publiés depuis cette date (ISO 8601) ; "
+                                             "par défaut depuis le numéro précédent")
+        parser.add_argument('--envoi', type=int, help="Reprend cet envoi plutôt que le dernier inachevé")
+        parser.add_argument('--lot', type=int, default=None, help="Abonnés par lot (BLOG_NEWSLETTER_TAILLE_LOT)")
+        parser.add_argument('--limite', type=int, default=None, help="Nombre maximal d'abonnés pour ce passage")
+
+    def handle(self, *args, **options):
+        if options['sujet']:
+            depuis = parse_datetime(options['depuis']) if options['depuis'] else None
+            if options['depuis'] and depuis is None:
+                raise CommandError(f"Date invalide : {options['depuis']}")
+            if depuis and timezone.is_naive(depuis):
+                depuis = timezone.make_aware(depuis)
+            envoi = EnvoiNewsletter.objects.create(
+                sujet=options['sujet'], introduction=options['introduction'], depuis=depuis,
+            )
+        else:
+            envois = EnvoiNewsletter.objects.filter(date_fin__isnull=True)
+            if options['envoi']:
+                envois = envois.filter(pk=options['envoi'])
+            envoi = envois.order_by('date_creation', 'id').first()
+            if envoi is None:
+                raise CommandError("Aucun envoi à reprendre (--sujet pour un nouveau numéro).")
+
+        envoyes, echecs = envoyer(envoi, options['lot'], options['limite'])
+        self.stdout.write(f"« {envoi.sujet} » : {envoyes} message(s) envoyé(s), {echecs} refusé(s).")
+        if envoi.date_fin:
+            self.stdout.write(self.style.SUCCESS(
+                f"Envoi {envoi.pk} terminé : {envoi.nb_envoyes} envoyé(s), {envoi.nb_echecs} échec(s) au total."
+            ))
+        else:
+            self.stdout.write(f"Envoi {envoi.pk} en cours : reprise après l'abonné {envoi.dernier_abonne}.")
@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.transfert import TYPES, exporter
+
+
+class Command(BaseCommand):
+    help = "Exporte catégories, articles et commentaires en JSONL (lecture en flux)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sortie', help="Fichier de sortie (stdout par défaut)")
+        parser.add_argument('--types', nargs='+', choices=TYPES, default=list(TYPES))
+
+    def handle(self, *args, **options):
+        sortie = open(options['sortie'], 'w', encoding='utf-8') if options['sortie'] else sys.stdout
+        try:
+            for ligne in exporter(options['types']):
+                sortie.write(ligne)
+        finally:
+            if sortie is not sys.stdout:
+                sortie.close()
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.diffusion import generer, racine
+
+
+class Command(BaseCommand):
+    help = (
+        "Pré-rend le sitemap (index + tranches) et les flux RSS/Atom par catégorie, "
+        "en ne réécrivant que les fichiers dont les articles ont changé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forcer', action='store_true', help="Réécrit tous les fichiers")
+        parser.add_argument('--boucle', action='store_true', help="Régénère en continu")
+        parser.add_argument('--intervalle', type=float, default=60.0, help="Secondes entre deux passages")
+
+    def handle(self, *args, **options):
+        forcer = options['forcer']
+        while True:
+            stats = generer(forcer=forcer)
+            forcer = False
+            if stats['ecrits'] or stats['supprimes'] or not options['boucle']:
+                self.stdout.write(
+                    f"{stats['ecrits']} fichier(s) écrit(s), {stats['supprimes']} supprimé(s) dans {racine()}."
+                )
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
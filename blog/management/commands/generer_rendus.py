@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import flux
+from blog.images import a_traiter, traiter
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker d'images : génère les déclinaisons WebP/JPEG (srcset) des articles dont "
+        "l'image est nouvelle ou a changé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=50)
+        parser.add_argument('--boucle', action='store_true', help="Continue à surveiller les nouveaux envois")
+        parser.add_argument('--intervalle', type=float, default=10.0, help="Secondes d'attente quand tout est à jour")
+
+    def handle(self, *args, **options):
+        while True:
+            lot = list(a_traiter().only('id', 'image').order_by('id')[:options['lot']])
+            for article in lot:
+                try:
+                    traiter(article)
+                except (OSError, ValueError) as exc:
+                    # image illisible : on la marque traitée pour ne pas boucler dessus
+                    self.stderr.write(f"Article {article.pk} : {exc}")
+                    type(article).objects.filter(pk=article.pk).update(rendus={}, rendus_pour=article.image.name)
+                    flux.rafraichir(article.pk)
+            if lot:
+                self.stdout.write(f"{len(lot)} article(s) traité(s).")
+                continue
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
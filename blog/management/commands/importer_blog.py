@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.transfert import TAILLE_LOT, TYPES, ErreurImport, importer, lire_csv, lire_jsonl
+
+
+class Command(BaseCommand):
+    help = "Importe en masse catégories, articles et commentaires depuis un fichier JSONL ou CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier à importer")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+        parser.add_argument('--type', choices=TYPES, help="Type des lignes d'un fichier CSV")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT)
+
+    def handle(self, *args, **options):
+        with open(options['fichier'], 'rb') as flux:
+            if options['format'] == 'csv':
+                enregistrements = lire_csv(flux, options['type'])
+            else:
+                enregistrements = lire_jsonl(flux)
+            try:
+                stats = importer(enregistrements, taille_lot=options['taille_lot'])
+            except ErreurImport as exc:
+                raise CommandError(str(exc))
+
+        for type_, compteurs in stats.items():
+            self.stdout.write(
+                f"{type_}: {compteurs['crees']} créé(s), {compteurs['modifies']} modifié(s), "
+                f"{compteurs['ignores']} ignoré(s)"
+            )
+            for message in compteurs['erreurs']:
+                self.stderr.write(f"  {message}")
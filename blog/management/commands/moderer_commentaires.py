@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.moderation import purger_spam, traiter_lot
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de modération : note par lots les commentaires en attente, valide les sûrs, "
+        "rejette le spam et laisse les cas incertains aux modérateurs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=None, help="Taille des lots (BLOG_MODERATION_TAILLE_LOT)")
+        parser.add_argument('--boucle', action='store_true', help="Continue à surveiller la file")
+        parser.add_argument('--intervalle', type=float, default=5.0, help="Secondes d'attente quand la file est vide")
+        parser.add_argument('--purger-spam', type=int, metavar='JOURS',
+                            help="Supprime ensuite le spam de plus de JOURS jours")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = traiter_lot(options['lot'])
+            if any(stats.values()):
+                self.stdout.write(
+                    f"{stats['valide']} validé(s), {stats['spam']} spam, {stats['incertain']} à vérifier"
+                )
+                continue
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
+
+        if options['purger_spam'] is not None:
+            supprimes = purger_spam(options['purger_spam'])
+            self.stdout.write(self.style.SUCCESS(f"{supprimes} commentaire(s) de spam supprimé(s)."))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.publication import prochaine_echeance, publier_lot
+
+
+class Command(BaseCommand):
+    help = (
+        "Planificateur : publie par lots les articles programmés dont la date de publication est passée, "
+        "en préchauffant le cache des listes et des détails concernés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=None, help="Taille des lots (BLOG_PUBLICATION_TAILLE_LOT)")
+        parser.add_argument('--boucle', action='store_true', help="Continue à surveiller les échéances")
+        parser.add_argument('--intervalle', type=float, default=30.0,
+                            help="Attente maximale (secondes) entre deux passages quand rien n'est échu")
+        parser.add_argument('--sans-prechauffage', action='store_true', help="Publie sans remplir le cache")
+
+    def handle(self, *args, **options):
+        while True:
+            publies, chauds, echecs = publier_lot(options['lot'], not options['sans_prechauffage'])
+            if publies:
+                self.stdout.write(f"{publies} article(s) publié(s), {chauds} réponse(s) préchauffée(s).")
+                if echecs:
+                    self.stderr.write(f"{echecs} réponse(s) non préchauffée(s).")
+                continue
+            if not options['boucle']:
+                break
+            # on dort jusqu'à la prochaine échéance, sans dépasser l'intervalle
+            echeance = prochaine_echeance()
+            attente = options['intervalle']
+            if echeance is not None:
+                attente = min(attente, max(0.0, (echeance - timezone.now()).total_seconds()))
+            time.sleep(attente)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.compteurs import recalculer, verifier
+
+
+class Command(BaseCommand):
+    help = "Recalcule (ou vérifie avec --verifier) les compteurs de commentaires dénormalisés."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verifier', action='store_true',
+            help="Liste les écarts sans rien corriger ; code de sortie non nul s'il y en a",
+        )
+
+    def handle(self, *args, **options):
+        articles, commentaires = verifier()
+        for pk, stocke, reel in articles:
+            self.stdout.write(f"Article {pk} : nb_commentaires_valides={stocke}, attendu {reel}")
+        for pk, stocke, reel in commentaires:
+            self.stdout.write(f"Commentaire {pk} : nb_reponses={stocke}, attendu {reel}")
+
+        if options['verifier']:
+            if articles or commentaires:
+                raise CommandError(f"{len(articles) + len(commentaires)} compteur(s) incorrect(s).")
+            self.stdout.write(self.style.SUCCESS("Compteurs cohérents."))
+            return
+
+        nb_articles, nb_commentaires = recalculer()
+        self.stdout.write(self.style.SUCCESS(
+            f"{nb_articles} article(s) et {nb_commentaires} commentaire(s) recalculé(s)."
+        ))
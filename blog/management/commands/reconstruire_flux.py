@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.flux import reconstruire, verifier
+from blog.versions import invalider
+
+
+class Command(BaseCommand):
+    help = "Reconstruit (ou vérifie avec --verifier) le flux public dénormalisé des articles publiés."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verifier', action='store_true',
+            help="Liste les articles désynchronisés sans rien corriger ; code de sortie non nul s'il y en a",
+        )
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            ecarts = verifier()
+            for pk in ecarts:
+                self.stdout.write(f"Article {pk} : ligne du flux absente, en trop ou différente")
+            if ecarts:
+                raise CommandError(f"{len(ecarts)} article(s) désynchronisé(s).")
+            self.stdout.write(self.style.SUCCESS("Flux public cohérent."))
+            return
+
+        total = reconstruire()
+        invalider('articles')
+        self.stdout.write(self.style.SUCCESS(f"{total} article(s) publié(s) dans le flux."))
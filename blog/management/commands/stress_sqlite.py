@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from blog import benchmark, popularite
+
+PROFILS = {
+    # réglages par défaut de Django / du module sqlite3
+    'défaut': {},
+    'production': getattr(settings, 'SQLITE_PROFIL_PRODUCTION', {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Écritures concurrentes (commentaires, articles) sur une base SQLite jetable, "
+        "avec le profil par défaut puis le profil de production : débit, latences, erreurs de verrou."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fils', type=int, default=8)
+        parser.add_argument('--ecritures', type=int, default=50, help="Écritures par fil")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Réservé à SQLite.")
+        setup_test_environment()
+        reglages = connection.settings_dict
+        anciens = reglages['NAME'], reglages['OPTIONS'], reglages['TEST'].get('NAME')
+        try:
+            with tempfile.TemporaryDirectory() as dossier:
+                for nom, options_db in PROFILS.items():
+                    # base fichier (et non en mémoire) : WAL et verrous réels
+                    reglages['OPTIONS'] = dict(options_db)
+                    reglages['TEST']['NAME'] = str(Path(dossier) / f"{nom}.sqlite3")
+                    connection.close()
+                    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                    try:
+                        with popularite.base_jetable():
+                            resultats = benchmark.stress_ecritures(options['fils'], options['ecritures'])
+                    finally:
+                        connection.creation.destroy_test_db(anciens[0], verbosity=0)
+                    self.stdout.write(
+                        f"{nom:<12}{resultats['ecritures_s']:>10} écritures/s   p50 {resultats['p50_ms']} ms"
+                        f"   p95 {resultats['p95_ms']} ms   erreurs {resultats['erreurs']}"
+                    )
+        finally:
+            reglages['NAME'], reglages['OPTIONS'], reglages['TEST']['NAME'] = anciens
+            teardown_test_environment()
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copie la base SQLite principale vers les répliques de BLOG_REPLIQUES (API de sauvegarde "
+        "en ligne de SQLite). Sert à tester le routage lectures/écritures avec deux fichiers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true', help="Recopie en continu")
+        parser.add_argument('--intervalle', type=float, default=2.0, help="Secondes entre deux copies")
+
+    def handle(self, *args, **options):
+        repliques = getattr(settings, 'BLOG_REPLIQUES', [])
+        if not repliques:
+            raise CommandError("Aucune réplique : définir la variable d'environnement BLOG_REPLIQUES.")
+        if any(connections[alias].vendor != 'sqlite' for alias in ['default', *repliques]):
+            raise CommandError("Réservé à SQLite : ailleurs, la réplication est celle du serveur.")
+
+        while True:
+            source = sqlite3.connect(str(connections['default'].settings_dict['NAME']))
+            try:
+                for alias in repliques:
+                    connections[alias].close()
+                    cible = sqlite3.connect(str(connections[alias].settings_dict['NAME']))
+                    try:
+                        source.backup(cible)
+                    finally:
+                        cible.close()
+                    self.stdout.write(f"{alias} synchronisée.")
+            finally:
+                source.close()
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
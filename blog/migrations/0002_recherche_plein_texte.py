@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# (table source, table FTS5 / index GIN, colonnes) — aligné sur blog.recherche.INDEX
+INDEX = [
+    ('blog_article', 'blog_article_fts', ('titre', 'contenu', 'meta_description', 'mots_cles')),
+    ('blog_commentaire', 'blog_commentaire_fts', ('auteur', 'contenu')),
+]
+
+
+def sqlite_creer(source, fts, colonnes):
+    cols = ', '.join(colonnes)
+    new_cols = ', '.join(f'new.{c}' for c in colonnes)
+    old_cols = ', '.join(f'old.{c}' for c in colonnes)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{source}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sqlite_supprimer(source, fts, colonnes):
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffixe}" for suffixe in ('ai', 'ad', 'au')] + [
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+
+def postgres_creer(source, fts, colonnes):
+    vecteur = " || ' ' || ".join(f"coalesce({c}, '')" for c in colonnes)
+    return [f"CREATE INDEX {fts} ON {source} USING GIN (to_tsvector('french', {vecteur}))"]
+
+
+def postgres_supprimer(source, fts, colonnes):
+    return [f"DROP INDEX IF EXISTS {fts}"]
+
+
+OPERATIONS = {
+    'sqlite': (sqlite_creer, sqlite_supprimer),
+    'postgresql': (postgres_creer, postgres_supprimer),
+}
+
+
+def executer(schema_editor, sens):
+    operations = OPERATIONS.get(schema_editor.connection.vendor)
+    if operations is None:
+        return
+    for source, fts, colonnes in INDEX:
+        for sql in operations[sens](source, fts, colonnes):
+            schema_editor.execute(sql)
+
+
+def creer_index(apps, schema_editor):
+    executer(schema_editor, 0)
+
+
+def supprimer_index(apps, schema_editor):
+    executer(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_recherche_plein_texte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-date_creation', '-id'], name='article_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['-date_creation', '-id'], name='commentaire_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['valide', '-date_creation', '-id'], name='commentaire_valide_date_idx'),
+        ),
+    ]
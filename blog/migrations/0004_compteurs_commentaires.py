@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remplir_compteurs(apps, schema_editor):
+    Article = apps.get_model('blog', 'Article')
+    Commentaire = apps.get_model('blog', 'Commentaire')
+
+    def compte(lien):
+        return Coalesce(Subquery(
+            Commentaire.objects.filter(**{lien: OuterRef('pk')}, valide=True)
+            .order_by().values(lien).annotate(n=Count('id')).values('n')
+        ), 0)
+
+    Article.objects.update(nb_commentaires_valides=compte('article'))
+    Commentaire.objects.update(nb_reponses=compte('parent'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_index_pagination_keyset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='nb_commentaires_valides',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='commentaire',
+            name='nb_reponses',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(remplir_compteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+
+def sortir_valides_de_la_file(apps, schema_editor):
+    # les commentaires déjà validés n'ont pas à repasser en modération
+    Commentaire = apps.get_model('blog', 'Commentaire')
+    Commentaire.objects.filter(valide=True).update(statut_moderation='valide')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_compteurs_commentaires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentaire',
+            name='empreinte',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='commentaire',
+            name='score_spam',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='commentaire',
+            name='statut_moderation',
+            field=models.CharField(choices=[('attente', 'En attente'), ('valide', 'Validé'), ('incertain', 'À vérifier'), ('spam', 'Spam')], default='attente', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(condition=models.Q(('statut_moderation', 'attente')), fields=['id'], name='commentaire_file_moderation'),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['empreinte', 'date_creation'], name='commentaire_empreinte_idx'),
+        ),
+        migrations.RunPython(sortir_valides_de_la_file, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+import blog.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_moderation_commentaires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='rendus',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rendus_pour',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=blog.images.stockage_images, upload_to='articles/'),
+        ),
+    ]
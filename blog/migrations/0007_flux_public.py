@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+def remplir_flux(apps, schema_editor):
+    # même contenu que blog.flux.ligne(), sans les méthodes des modèles
+    Article = apps.get_model('blog', 'Article')
+    ArticlePublie = apps.get_model('blog', 'ArticlePublie')
+    lignes = []
+    for a in Article.objects.filter(statut='published').values(
+        'id', 'titre', 'slug', 'contenu', 'image', 'rendus', 'rendus_pour', 'categorie_id', 'categorie__nom',
+        'categorie__slug', 'auteur_id', 'auteur__username', 'date_creation', 'date_modification', 'statut',
+        'meta_description', 'mots_cles', 'nb_commentaires_valides',
+    ).iterator():
+        contenu = a.pop('contenu')
+        lignes.append(ArticlePublie(
+            extrait=(contenu[:300] + '...') if len(contenu) > 300 else contenu,
+            image=a.pop('image') or '',
+            categorie_nom=a.pop('categorie__nom'),
+            categorie_slug=a.pop('categorie__slug'),
+            auteur_nom=a.pop('auteur__username'),
+            **a,
+        ))
+    ArticlePublie.objects.bulk_create(lignes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_rendus_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticlePublie',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('titre', models.CharField(max_length=250)),
+                ('slug', models.CharField(max_length=300)),
+                ('extrait', models.TextField(blank=True)),
+                ('image', models.CharField(blank=True, max_length=100)),
+                ('rendus', models.JSONField(blank=True, default=dict)),
+                ('rendus_pour', models.CharField(blank=True, max_length=100)),
+                ('categorie_id', models.BigIntegerField(db_index=True, null=True)),
+                ('categorie_nom', models.CharField(max_length=100, null=True)),
+                ('categorie_slug', models.CharField(max_length=120, null=True)),
+                ('auteur_id', models.BigIntegerField(db_index=True, null=True)),
+                ('auteur_nom', models.CharField(max_length=150, null=True)),
+                ('date_creation', models.DateTimeField()),
+                ('date_modification', models.DateTimeField()),
+                ('statut', models.CharField(default='published', max_length=10)),
+                ('meta_description', models.CharField(blank=True, max_length=300)),
+                ('mots_cles', models.CharField(blank=True, max_length=300)),
+                ('nb_commentaires_valides', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Article publié (flux)',
+                'verbose_name_plural': 'Articles publiés (flux)',
+                'ordering': ['-date_creation', '-id'],
+                'indexes': [models.Index(fields=['-date_creation', '-id'], name='flux_date_id_idx'), models.Index(fields=['categorie_slug', '-date_creation', '-id'], name='flux_categorie_date_idx')],
+            },
+        ),
+        migrations.RunPython(remplir_flux, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def dater_les_publies(apps, schema_editor):
+    # faute de mieux, les articles déjà publiés l'ont été à leur création
+    Article = apps.get_model('blog', 'Article')
+    Article.objects.filter(statut='published').update(date_publication=F('date_creation'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_flux_public'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='date_publication',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='statut',
+            field=models.CharField(choices=[('draft', 'Brouillon'), ('scheduled', 'Programmé'), ('published', 'Publié')], default='draft', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('statut', 'scheduled')), fields=['date_publication', 'id'], name='article_file_publication'),
+        ),
+        migrations.RunPython(dater_les_publies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_publication_programmee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSimilaire',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rang', models.PositiveSmallIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similaires', to='blog.article')),
+                ('similaire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.article')),
+            ],
+            options={
+                'verbose_name': 'Article similaire',
+                'verbose_name_plural': 'Articles similaires',
+                'ordering': ['article', 'rang'],
+                'indexes': [models.Index(fields=['article', 'rang'], name='article_similaire_rang_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'similaire'), name='article_similaire_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TermeArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terme', models.CharField(max_length=100)),
+                ('poids', models.FloatField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termes', to='blog.article')),
+            ],
+            options={
+                'verbose_name': "Terme d'article",
+                'verbose_name_plural': "Termes d'articles",
+                'indexes': [models.Index(fields=['terme', 'article'], name='terme_article_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'terme'), name='terme_article_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def tags_depuis_mots_cles(apps, schema_editor):
+    # un tag par mot-clé distinct (à la casse et aux accents près : même slug)
+    Article = apps.get_model('blog', 'Article')
+    Tag = apps.get_model('blog', 'Tag')
+    ArticleTag = apps.get_model('blog', 'ArticleTag')
+    noms, liens = {}, set()
+    for article_id, mots_cles in Article.objects.exclude(mots_cles='').values_list('id', 'mots_cles').iterator():
+        for mot in mots_cles.split(','):
+            nom = ' '.join(mot.split()).lower()[:50]
+            slug = slugify(nom)[:50]
+            if slug:
+                noms.setdefault(slug, nom)
+                liens.add((article_id, slug))
+    Tag.objects.bulk_create([Tag(nom=nom, slug=slug) for slug, nom in noms.items()], batch_size=500)
+    ids = dict(Tag.objects.values_list('slug', 'id'))
+    ArticleTag.objects.bulk_create(
+        [ArticleTag(article_id=article_id, tag_id=ids[slug]) for article_id, slug in sorted(liens)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_popularite'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(blank=True, max_length=60, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ['nom'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.article')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.tag')),
+            ],
+            options={
+                'verbose_name': "Tag d'article",
+                'verbose_name_plural': "Tags d'articles",
+            },
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='articles', through='blog.ArticleTag', to='blog.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='articletag',
+            index=models.Index(fields=['tag', 'article'], name='tag_article_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='articletag',
+            constraint=models.UniqueConstraint(fields=('article', 'tag'), name='article_tag_unique'),
+        ),
+        migrations.RunPython(tags_depuis_mots_cles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+import blog.models
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvoiNewsletter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=200)),
+                ('introduction', models.TextField(blank=True)),
+                ('depuis', models.DateTimeField(blank=True, null=True)),
+                ('texte', models.TextField(blank=True, editable=False)),
+                ('html', models.TextField(blank=True, editable=False)),
+                ('dernier_abonne', models.BigIntegerField(default=0, editable=False)),
+                ('nb_envoyes', models.PositiveIntegerField(default=0, editable=False)),
+                ('nb_echecs', models.PositiveIntegerField(default=0, editable=False)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                'verbose_name': 'Envoi de la newsletter',
+                'verbose_name_plural': 'Envois de la newsletter',
+                'ordering': ['-date_creation', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AbonnementNewsletter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('nom', models.CharField(blank=True, max_length=100)),
+                ('actif', models.BooleanField(default=True)),
+                ('date_inscription', models.DateTimeField(auto_now_add=True)),
+                ('jeton', models.CharField(default=blog.models.jeton_desinscription, editable=False, max_length=40, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Abonnement à la newsletter',
+                'verbose_name_plural': 'Abonnements à la newsletter',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('actif', True)), fields=['id'], name='abonnement_actifs_idx')],
+                'constraints': [models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='abonnement_email_unique', violation_error_message='Cette adresse est déjà inscrite.')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_newsletter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeauLimitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=200, unique=True)),
+                ('tat', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Seau de limitation',
+                'verbose_name_plural': 'Seaux de limitation',
+                'indexes': [models.Index(fields=['tat'], name='seau_tat_idx')],
+            },
+        ),
+    ]
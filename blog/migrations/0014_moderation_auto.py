@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marquer_decisions_auto(apps, schema_editor):
+    # avant ce champ, rien ne distinguait les décisions du modèle : on retient
+    # celles qui suivent le score (validé sous le seuil, spam au-dessus)
+    Commentaire = apps.get_model('blog', 'Commentaire')
+    seuil_valide = getattr(settings, 'BLOG_MODERATION_SEUIL_VALIDE', 0.15)
+    seuil_spam = getattr(settings, 'BLOG_MODERATION_SEUIL_SPAM', 0.9)
+    commentaires = Commentaire.objects.using(schema_editor.connection.alias)
+    commentaires.filter(statut_moderation='valide', score_spam__lte=seuil_valide).update(moderation_auto=True)
+    commentaires.filter(statut_moderation='spam', score_spam__gte=seuil_spam).update(moderation_auto=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_seaux_limitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentaire',
+            name='moderation_auto',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(marquer_decisions_auto, migrations.RunPython.noop),
+    ]
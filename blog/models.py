@@ -1,13 +1,20 @@
-from django.db import models
-from django.utils.text import slugify
+import secrets
+
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from .images import stockage_images
+from .slugs import enregistrer_avec_slug
+from .verrous import reessayer_si_verrouille
 
 User = get_user_model()
 
 class Categorie(models.Model):
     nom = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
+    # log de la tendance de ses articles (blog.popularite)
+    score_tendance = models.FloatField(default=0, editable=False)
 
     class Meta:
         verbose_name = "Catégorie"
@@ -19,52 +26,89 @@ class Categorie(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base = slugify(self.nom)[:110]
-            slug = base
-            counter = 1
-            while Categorie.objects.filter(slug=slug).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
+            return enregistrer_avec_slug(self, self.nom, 110, super().save, *args, **kwargs)
+        super().save(*args, **kwargs)
+
+
+class Tag(models.Model):
+    nom = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=60, unique=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tag"
+        verbose_name_plural = "Tags"
+        ordering = ['nom']
+
+    def __str__(self):
+        return self.nom
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            return enregistrer_avec_slug(self, self.nom, 50, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
 
 class Article(models.Model):
     STATUT_CHOICES = (
         ('draft', 'Brouillon'),
+        ('scheduled', 'Programmé'),
         ('published', 'Publié'),
     )
 
     titre = models.CharField(max_length=250)
     slug = models.SlugField(max_length=300, unique=True, blank=True)
     contenu = models.TextField()
-    image = models.ImageField(upload_to='articles/', null=True, blank=True)
+    # originaux rangés sous l'empreinte de leur contenu (blog.images)
+    image = models.ImageField(upload_to='articles/', storage=stockage_images, null=True, blank=True)
     categorie = models.ForeignKey(Categorie, on_delete=models.SET_NULL, null=True, related_name='articles')
     auteur = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='articles')
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='draft')
+    # 'scheduled' : publié à cette date par la commande publier_programmes (blog.publication)
+    date_publication = models.DateTimeField(null=True, blank=True)
     meta_description = models.CharField(max_length=300, blank=True)
     mots_cles = models.CharField(max_length=300, blank=True, help_text="Sépare les mots-clés par des virgules")
+    # filtres ?tags= / ?tags__in= et facettes (blog.tags)
+    tags = models.ManyToManyField(Tag, through='ArticleTag', related_name='articles', blank=True)
+    # compteur dénormalisé, tenu à jour par blog.compteurs
+    nb_commentaires_valides = models.PositiveIntegerField(default=0, editable=False)
+    # déclinaisons responsive {format: {largeur: chemin}} de l'image ``rendus_pour``
+    rendus = models.JSONField(default=dict, blank=True, editable=False)
+    rendus_pour = models.CharField(max_length=100, blank=True, editable=False)
+    # compteurs tamponnés et vidés par lots, tendance en log (blog.popularite)
+    vues = models.PositiveIntegerField(default=0, editable=False)
+    likes = models.PositiveIntegerField(default=0, editable=False)
+    score_tendance = models.FloatField(default=0, editable=False)
 
     class Meta:
         verbose_name = "Article"
         verbose_name_plural = "Articles"
         ordering = ['-date_creation']
+        indexes = [
+            # ?ordering=-vues / -likes / trending (départagés par id)
+            models.Index(fields=['-vues', '-id'], name='article_vues_idx'),
+            models.Index(fields=['-likes', '-id'], name='article_likes_idx'),
+            models.Index(fields=['-score_tendance', '-id'], name='article_tendance_idx'),
+            # pagination keyset (date_creation, id), cf. blog.pagination
+            models.Index(fields=['-date_creation', '-id'], name='article_date_id_idx'),
+            # file des publications programmées, lue par échéance
+            models.Index(fields=['date_publication', 'id'], name='article_file_publication',
+                         condition=models.Q(statut='scheduled')),
+        ]
 
     def __str__(self):
         return self.titre
 
+    @reessayer_si_verrouille
     def save(self, *args, **kwargs):
+        if self.statut == 'published' and self.date_publication is None:
+            self.date_publication = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'date_publication'}
         # génération slug si absent
         if not self.slug:
-            base = slugify(self.titre)[:280]
-            slug = base
-            counter = 1
-            while Article.objects.filter(slug=slug).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
+            return enregistrer_avec_slug(self, self.titre, 280, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     @property
@@ -80,11 +124,226 @@ class Commentaire(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     valide = models.BooleanField(default=False)  # modération manuelle par défaut
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='reponses')
+    # réponses validées, tenu à jour par blog.compteurs
+    nb_reponses = models.PositiveIntegerField(default=0, editable=False)
+    # file de modération traitée par lots (blog.moderation)
+    MODERATION_CHOICES = (
+        ('attente', 'En attente'),
+        ('valide', 'Validé'),
+        ('incertain', 'À vérifier'),
+        ('spam', 'Spam'),
+    )
+    statut_moderation = models.CharField(max_length=10, choices=MODERATION_CHOICES, default='attente', editable=False)
+    score_spam = models.FloatField(null=True, blank=True, editable=False)
+    empreinte = models.CharField(max_length=32, blank=True, editable=False)
+    # décision prise par le modèle, pas par un modérateur : exclue de l'entraînement
+    moderation_auto = models.BooleanField(default=False, editable=False)
 
     class Meta:
         verbose_name = "Commentaire"
         verbose_name_plural = "Commentaires"
         ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['-date_creation', '-id'], name='commentaire_date_id_idx'),
+            models.Index(fields=['valide', '-date_creation', '-id'], name='commentaire_valide_date_idx'),
+            models.Index(fields=['id'], name='commentaire_file_moderation',
+                         condition=models.Q(statut_moderation='attente')),
+            models.Index(fields=['empreinte', 'date_creation'], name='commentaire_empreinte_idx'),
+        ]
 
     def __str__(self):
         return f"Commentaire de {self.auteur} sur {self.article.titre[:30]}"
+
+    @reessayer_si_verrouille
+    def save(self, *args, **kwargs):
+        # post_save met à jour les compteurs dénormalisés dans la même transaction
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Commentaire, instance=self)):
+            super().save(*args, **kwargs)
+
+
+class ArticleTag(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = "Tag d'article"
+        verbose_name_plural = "Tags d'articles"
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'tag'], name='article_tag_unique'),
+        ]
+        indexes = [
+            # articles d'un tag, lus dans l'index sans toucher la table
+            models.Index(fields=['tag', 'article'], name='tag_article_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} — {self.tag_id}"
+
+
+class ArticlePublie(models.Model):
+    """
+    Flux public : copie dénormalisée des articles publiés (blog.flux).
+
+    Une ligne par article publié, avec tout ce que la liste publique affiche
+    (catégorie, auteur, extrait) : la liste se lit sans jointure, dans l'ordre
+    des index. Tenu à jour par les signaux et les écritures en masse.
+    """
+    id = models.BigIntegerField(primary_key=True)  # même id que l'article
+    titre = models.CharField(max_length=250)
+    slug = models.CharField(max_length=300)
+    extrait = models.TextField(blank=True)
+    image = models.CharField(max_length=100, blank=True)
+    rendus = models.JSONField(default=dict, blank=True)
+    rendus_pour = models.CharField(max_length=100, blank=True)
+    categorie_id = models.BigIntegerField(null=True, db_index=True)
+    categorie_nom = models.CharField(max_length=100, null=True)
+    categorie_slug = models.CharField(max_length=120, null=True)
+    auteur_id = models.BigIntegerField(null=True, db_index=True)
+    auteur_nom = models.CharField(max_length=150, null=True)
+    date_creation = models.DateTimeField()
+    date_modification = models.DateTimeField()
+    statut = models.CharField(max_length=10, default='published')
+    meta_description = models.CharField(max_length=300, blank=True)
+    mots_cles = models.CharField(max_length=300, blank=True)
+    nb_commentaires_valides = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Article publié (flux)"
+        verbose_name_plural = "Articles publiés (flux)"
+        ordering = ['-date_creation', '-id']
+        indexes = [
+            models.Index(fields=['-date_creation', '-id'], name='flux_date_id_idx'),
+            models.Index(fields=['categorie_slug', '-date_creation', '-id'], name='flux_categorie_date_idx'),
+        ]
+
+    def __str__(self):
+        return self.titre
+
+
+class TermeArticle(models.Model):
+    """Index de termes (blog.similarite) : poids TF-IDF normalisé d'un terme dans un article publié."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='termes')
+    terme = models.CharField(max_length=100)
+    poids = models.FloatField()
+
+    class Meta:
+        verbose_name = "Terme d'article"
+        verbose_name_plural = "Termes d'articles"
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'terme'], name='terme_article_unique'),
+        ]
+        indexes = [
+            # listes inverses : articles contenant un terme
+            models.Index(fields=['terme', 'article'], name='terme_article_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.terme} ({self.poids:.3f})"
+
+
+class ArticleSimilaire(models.Model):
+    """Plus proches voisins précalculés d'un article (blog.similarite), rangés par score décroissant."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='similaires')
+    similaire = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rang = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Article similaire"
+        verbose_name_plural = "Articles similaires"
+        ordering = ['article', 'rang']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'similaire'], name='article_similaire_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['article', 'rang'], name='article_similaire_rang_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} → {self.similaire_id} ({self.score:.3f})"
+
+
+def jeton_desinscription():
+    return secrets.token_urlsafe(24)
+
+
+class AbonnementNewsletter(models.Model):
+    # enregistrée en minuscules ; unicité garantie aussi à la casse près (contrainte sur Lower)
+    email = models.EmailField()
+    nom = models.CharField(max_length=100, blank=True)
+    actif = models.BooleanField(default=True)
+    date_inscription = models.DateTimeField(auto_now_add=True)
+    # lien de désinscription personnel, cf. blog.newsletter
+    jeton = models.CharField(max_length=40, unique=True, default=jeton_desinscription, editable=False)
+
+    class Meta:
+        verbose_name = "Abonnement à la newsletter"
+        verbose_name_plural = "Abonnements à la newsletter"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='abonnement_email_unique',
+                                    violation_error_message="Cette adresse est déjà inscrite."),
+        ]
+        indexes = [
+            # parcours des abonnés actifs par tranches d'id (envoi de la newsletter)
+            models.Index(fields=['id'], name='abonnement_actifs_idx', condition=models.Q(actif=True)),
+        ]
+
+    def __str__(self):
+        return self.email
+
+    def save(self, *args, **kwargs):
+        self.email = self.email.strip().lower()
+        super().save(*args, **kwargs)
+
+
+class EnvoiNewsletter(models.Model):
+    """
+    Un numéro de la newsletter et l'avancement de son envoi (blog.newsletter).
+
+    Le contenu est rendu une fois, au premier passage, et gardé ici : une
+    reprise envoie exactement le même numéro. ``dernier_abonne`` est le point
+    de reprise (id du dernier abonné servi).
+    """
+    sujet = models.CharField(max_length=200)
+    introduction = models.TextField(blank=True)
+    # articles publiés depuis cette date (par défaut : depuis le numéro précédent)
+    depuis = models.DateTimeField(null=True, blank=True)
+    texte = models.TextField(blank=True, editable=False)
+    html = models.TextField(blank=True, editable=False)
+    dernier_abonne = models.BigIntegerField(default=0, editable=False)
+    nb_envoyes = models.PositiveIntegerField(default=0, editable=False)
+    nb_echecs = models.PositiveIntegerField(default=0, editable=False)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True, editable=False)
+    date_fin = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Envoi de la newsletter"
+        verbose_name_plural = "Envois de la newsletter"
+        ordering = ['-date_creation', '-id']
+
+    def __str__(self):
+        return self.sujet
+
+
+
+class SeauLimitation(models.Model):
+    """
+    Seau GCRA de ``blog.throttling`` tenu en base, quand le cache n'a pas
+    d'opérations atomiques (cache fichier) : ``tat`` (ms) est avancé par un
+    UPDATE conditionnel unique.
+    """
+    cle = models.CharField(max_length=200, unique=True)
+    tat = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "Seau de limitation"
+        verbose_name_plural = "Seaux de limitation"
+        indexes = [
+            # purge des seaux pleins (tat dépassé)
+            models.Index(fields=['tat'], name='seau_tat_idx'),
+        ]
+
+    def __str__(self):
+        return self.cle
@@ -0,0 +1,174 @@
+"""
+Modération des commentaires par lots.
+
+Le POST d'un commentaire reste un simple INSERT : la file est la colonne
+``statut_moderation`` (``'attente'`` par défaut, index partiel). La commande
+``moderer_commentaires`` dépile les commentaires en attente par lots et les
+note tous ensemble :
+
+* modèle bayésien naïf sur les mots et paires de mots, entraîné à chaque lot
+  sur les derniers commentaires étiquetés par un modérateur (validés / spam ;
+  les décisions automatiques, ``moderation_auto``, n'en font pas partie pour
+  que le modèle n'apprenne pas de ses propres erreurs) ;
+* nombre de liens, proportion de majuscules ;
+* empreinte du contenu normalisé, comparée aux commentaires récents et au
+  reste du lot (vagues de copier-coller).
+
+Score ≤ ``BLOG_MODERATION_SEUIL_VALIDE`` : validé automatiquement ;
+≥ ``BLOG_MODERATION_SEUIL_SPAM`` : rejeté comme spam ; entre les deux :
+``'incertain'``, laissé aux modérateurs.
+"""
+import hashlib
+import math
+import re
+import unicodedata
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .compteurs import valider_commentaires
+from .models import Commentaire
+
+_MOTS = re.compile(r"\w+")
+_LIENS = re.compile(r"https?://|www\.", re.IGNORECASE)
+
+
+def reglage(nom, defaut):
+    return getattr(settings, f'BLOG_MODERATION_{nom}', defaut)
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(_MOTS.findall(texte))
+
+
+def empreinte(texte):
+    return hashlib.md5(normaliser(texte).encode()).hexdigest()
+
+
+def jetons(texte):
+    mots = normaliser(texte).split()
+    return mots + [f'{a} {b}' for a, b in zip(mots, mots[1:])]
+
+
+class ModeleBayes:
+    """Bayes naïf sur la présence des jetons ; ``log_ratio`` : log P(spam|texte) / P(ham|texte)."""
+    MIN_EXEMPLES = 20
+
+    def __init__(self, hams, spams):
+        self.actif = len(hams) >= self.MIN_EXEMPLES and len(spams) >= self.MIN_EXEMPLES
+        if not self.actif:
+            return
+        compte_ham = Counter(j for texte in hams for j in set(jetons(texte)))
+        compte_spam = Counter(j for texte in spams for j in set(jetons(texte)))
+        n_ham, n_spam = len(hams), len(spams)
+        self.a_priori = math.log(n_spam / n_ham)
+        # lissage de Laplace, par document (présence du jeton)
+        self.poids = {
+            jeton: math.log((compte_spam[jeton] + 1) / (n_spam + 2)) - math.log((compte_ham[jeton] + 1) / (n_ham + 2))
+            for jeton in compte_ham.keys() | compte_spam.keys()
+        }
+
+    def log_ratio(self, texte):
+        if not self.actif:
+            return 0.0
+        total = self.a_priori + sum(self.poids.get(j, 0.0) for j in set(jetons(texte)))
+        return max(-10.0, min(10.0, total))
+
+    @classmethod
+    def depuis_base(cls, limite, using=None):
+        etiquetes = (
+            Commentaire.objects.using(using).filter(moderation_auto=False)
+            .order_by('-id').values_list('contenu', flat=True)
+        )
+        return cls(
+            list(etiquetes.filter(statut_moderation='valide')[:limite]),
+            list(etiquetes.filter(statut_moderation='spam')[:limite]),
+        )
+
+
+def doublons(commentaires, using=None):
+    """empreinte -> nombre d'autres commentaires récents (base + lot) au même contenu."""
+    depuis = timezone.now() - timedelta(hours=reglage('FENETRE_DOUBLONS_HEURES', 24))
+    dans_lot = Counter(c.empreinte for c in commentaires)
+    en_base = dict(
+        Commentaire.objects.using(using).filter(empreinte__in=list(dans_lot), date_creation__gte=depuis)
+        .exclude(pk__in=[c.pk for c in commentaires])
+        .order_by().values('empreinte').annotate(n=Count('id')).values_list('empreinte', 'n')
+    )
+    return {e: n - 1 + en_base.get(e, 0) for e, n in dans_lot.items()}
+
+
+def scorer(commentaires, modele, using=None):
+    """
+    Probabilité de spam de chaque commentaire du lot (renseigne aussi ``empreinte``).
+    Une seule requête pour le lot (doublons) ; le reste est du calcul en mémoire.
+    """
+    for c in commentaires:
+        c.empreinte = empreinte(c.contenu)
+    copies = doublons(commentaires, using)
+    scores = []
+    for c in commentaires:
+        log_odds = -1.0 + modele.log_ratio(c.contenu)
+        liens = len(_LIENS.findall(c.contenu))
+        log_odds += 1.5 * liens + (2.0 if liens >= 3 else 0.0)
+        lettres = [ch for ch in c.contenu if ch.isalpha()]
+        if len(lettres) >= 20 and sum(ch.isupper() for ch in lettres) / len(lettres) > 0.5:
+            log_odds += 1.0
+        # « Merci ! » peut se répéter légitimement : seuls les textes assez longs comptent
+        if copies[c.empreinte] and len(normaliser(c.contenu)) >= 20:
+            log_odds += 2.0 + min(copies[c.empreinte], 5)
+        scores.append(1 / (1 + math.exp(-log_odds)))
+    return scores
+
+
+def traiter_lot(taille=None, modele=None):
+    """Modère un lot de la file ; retourne les effectifs par décision."""
+    taille = taille or reglage('TAILLE_LOT', 500)
+    alias = router.db_for_write(Commentaire)
+    modele = modele or ModeleBayes.depuis_base(reglage('CORPUS', 2000), alias)
+    seuil_valide = reglage('SEUIL_VALIDE', 0.15)
+    seuil_spam = reglage('SEUIL_SPAM', 0.9)
+
+    with transaction.atomic(using=alias):
+        file = Commentaire.objects.using(alias).filter(statut_moderation='attente').order_by('id')
+        if connections[alias].features.has_select_for_update_skip_locked:
+            file = file.select_for_update(skip_locked=True)  # plusieurs workers possibles
+        lot = list(file.only('id', 'article_id', 'parent_id', 'contenu', 'valide', 'date_creation')[:taille])
+        if not lot:
+            return dict.fromkeys(('valide', 'incertain', 'spam'), 0)
+
+        a_valider = []
+        for commentaire, score in zip(lot, scorer(lot, modele, alias)):
+            commentaire.score_spam = round(score, 4)
+            # déjà validé à la création (par un membre de l'équipe) : étiquette humaine
+            commentaire.moderation_auto = not commentaire.valide
+            if commentaire.valide or score <= seuil_valide:
+                commentaire.statut_moderation = 'valide'
+                if not commentaire.valide:
+                    a_valider.append(commentaire.pk)
+            elif score >= seuil_spam:
+                commentaire.statut_moderation = 'spam'
+            else:
+                commentaire.statut_moderation = 'incertain'
+        Commentaire.objects.using(alias).bulk_update(
+            lot, ['empreinte', 'score_spam', 'statut_moderation', 'moderation_auto'],
+        )
+        if a_valider:
+            valider_commentaires(Commentaire.objects.using(alias).filter(pk__in=a_valider), auto=True)
+    decisions = Counter(c.statut_moderation for c in lot)
+    return {statut: decisions[statut] for statut in ('valide', 'incertain', 'spam')}
+
+
+def purger_spam(jours):
+    """Supprime le spam de plus de ``jours`` jours ; retourne le nombre supprimé."""
+    limite = timezone.now() - timedelta(days=jours)
+    supprimes, _ = Commentaire.objects.filter(
+        statut_moderation='spam', valide=False, date_creation__lt=limite,
+    ).delete()
+    return supprimes
@@ -0,0 +1,133 @@
+"""
+Newsletter : rendu d'un numéro et envoi par lots aux abonnés actifs.
+
+* Le numéro (texte et HTML) est rendu une seule fois, au premier passage,
+  et gardé dans ``EnvoiNewsletter`` : introduction puis articles publiés
+  depuis ``depuis`` (par défaut, le début du numéro précédent). Seuls la
+  salutation et le lien de désinscription changent d'un abonné à l'autre ;
+  ils sont ajoutés par concaténation autour de ces parties communes.
+* Les abonnés actifs sont lus par tranches d'id (``id > dernier``, index
+  partiel ``abonnement_actifs_idx``) : mémoire constante quel que soit leur
+  nombre.
+* Une seule connexion (``get_connection``) sert à tous les lots : avec SMTP,
+  une seule session pour tout l'envoi.
+* Après chaque lot, l'avancement (``dernier_abonne`` et compteurs) est
+  écrit en base. Sur erreur, le point de reprise est le dernier abonné servi :
+  relancer la commande ``envoyer_newsletter`` reprend là. Après un arrêt
+  brutal, au plus un lot est renvoyé. Un destinataire refusé par le serveur
+  est compté en échec sans interrompre l'envoi.
+"""
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+from django.utils.html import escape, format_html, format_html_join, linebreaks
+
+from .diffusion import url_article, url_publique
+from .models import AbonnementNewsletter, Article, EnvoiNewsletter
+
+
+def reglage(nom, defaut):
+    return getattr(settings, f'BLOG_NEWSLETTER_{nom}', defaut)
+
+
+def url_desinscription(jeton):
+    return url_publique(reglage('CHEMIN_DESINSCRIPTION', '/newsletter/desinscription/{jeton}/').format(jeton=jeton))
+
+
+def articles(envoi):
+    """Articles publiés depuis ``envoi.depuis`` ou, à défaut, depuis le numéro précédent."""
+    depuis = envoi.depuis or EnvoiNewsletter.objects.exclude(pk=envoi.pk).filter(
+        date_debut__isnull=False,
+    ).order_by('-date_debut').values_list('date_debut', flat=True).first()
+    publies = Article.objects.filter(statut='published')
+    if depuis:
+        publies = publies.filter(date_publication__gte=depuis)
+    return publies.order_by('-date_publication', '-id').only(
+        'titre', 'slug', 'contenu', 'meta_description',
+    )[:reglage('ARTICLES', 10)]
+
+
+def rendre(envoi):
+    """(texte, html) communs à tous les abonnés."""
+    liste = [(url_article(a.slug), a.titre, a.meta_description or a.extrait) for a in articles(envoi)]
+    texte = ''.join(f"{titre}\n{url}\n{resume}\n\n" for url, titre, resume in liste)
+    html = format_html_join('\n', '<h2><a href="{}">{}</a></h2>\n<p>{}</p>', liste)
+    if envoi.introduction:
+        texte = f"{envoi.introduction}\n\n{texte}"
+        html = linebreaks(envoi.introduction, autoescape=True) + '\n' + html
+    return texte, html
+
+
+def message(envoi, email, nom, jeton, connexion):
+    lien = url_desinscription(jeton)
+    salutation = f"Bonjour {nom}," if nom else "Bonjour,"
+    courriel = EmailMultiAlternatives(
+        envoi.sujet,
+        f"{salutation}\n\n{envoi.texte}--\nSe désinscrire : {lien}\n",
+        reglage('EXPEDITEUR', settings.DEFAULT_FROM_EMAIL),
+        [email],
+        connection=connexion,
+        headers={'List-Unsubscribe': f'<{lien}>'},
+    )
+    courriel.attach_alternative(
+        f"<p>{escape(salutation)}</p>\n{envoi.html}\n"
+        + format_html('<p><a href="{}">Se désinscrire</a></p>', lien),
+        'text/html',
+    )
+    return courriel
+
+
+def abonnes(apres, taille):
+    return AbonnementNewsletter.objects.filter(actif=True, id__gt=apres).order_by('id').values_list(
+        'id', 'email', 'nom', 'jeton',
+    )[:taille]
+
+
+def avancer(envoi, dernier, envoyes, echecs):
+    # point de reprise, écrit après chaque lot (et sur erreur)
+    EnvoiNewsletter.objects.filter(pk=envoi.pk).update(
+        dernier_abonne=dernier, nb_envoyes=F('nb_envoyes') + envoyes, nb_echecs=F('nb_echecs') + echecs,
+    )
+    envoi.dernier_abonne = dernier
+    envoi.nb_envoyes += envoyes
+    envoi.nb_echecs += echecs
+
+
+def envoyer(envoi, taille=None, limite=None, connexion=None):
+    """
+    Envoie (ou reprend) un numéro, au plus ``limite`` abonnés pour ce passage ;
+    retourne (envoyés, échecs) de ce passage.
+    """
+    if envoi.date_debut is None:
+        envoi.texte, envoi.html = rendre(envoi)
+        envoi.date_debut = timezone.now()
+        envoi.save(update_fields=['texte', 'html', 'date_debut'])
+    taille = taille or reglage('TAILLE_LOT', 200)
+    connexion = connexion or get_connection()
+    total_envoyes = total_echecs = 0
+    with connexion:
+        while envoi.date_fin is None:
+            restant = taille if limite is None else min(taille, limite - total_envoyes - total_echecs)
+            if restant <= 0:
+                break
+            lot = list(abonnes(envoi.dernier_abonne, restant))
+            if not lot:
+                envoi.date_fin = timezone.now()
+                envoi.save(update_fields=['date_fin'])
+                break
+            dernier, envoyes, echecs = envoi.dernier_abonne, 0, 0
+            try:
+                for pk, email, nom, jeton in lot:
+                    try:
+                        envoyes += connexion.send_messages([message(envoi, email, nom, jeton, connexion)])
+                    except smtplib.SMTPRecipientsRefused:
+                        echecs += 1
+                    dernier = pk
+            finally:
+                avancer(envoi, dernier, envoyes, echecs)
+                total_envoyes += envoyes
+                total_echecs += echecs
+    return total_envoyes, total_echecs
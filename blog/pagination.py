@@ -0,0 +1,209 @@
+"""
+Pagination des listes d'articles et de commentaires.
+
+``BlogPagination`` garde le comportement par défaut (``?page=N``) et ajoute :
+
+* un mode keyset (``?cursor=``) trié sur ``(date_creation, id)`` : une page
+  profonde coûte autant que la première, sans ``COUNT(*)`` ni ``OFFSET``.
+  Un tri demandé (``?ordering=``) est repris tel quel, l'id en dernier pour
+  départager, s'il ne porte que sur des colonnes non nulles lues par la
+  page ; sinon (rang de recherche, compteur absent de la page) : 400 ;
+* un mode page sans comptage (``?page=N&count=false``) qui évite le
+  ``COUNT(*)`` en lisant une ligne de plus que la taille de page.
+"""
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def valeur(ligne, champ):
+    # les lignes peuvent être des instances ou des dicts issus de .values()
+    if isinstance(ligne, dict):
+        return ligne[champ]
+    return getattr(ligne, champ)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = 10
+    ordering = ('-date_creation', '-id')
+    invalid_cursor_message = 'Curseur invalide.'
+    invalid_ordering_message = "Tri incompatible avec la pagination par curseur (?cursor=)."
+
+    def encode_cursor(self, ligne, reverse):
+        position = []
+        for champ in self.champs():
+            v = valeur(ligne, champ)
+            position.append(v.isoformat() if isinstance(v, datetime.datetime) else v)
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            champs = self.champs()
+            position = [
+                model._meta.get_field(champ).to_python(v)
+                for champ, v in zip(champs, data['p'], strict=True)
+            ]
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def tri(self, queryset):
+        """Tri explicite du queryset (``?ordering=``, recherche) ou, à défaut, ``self.ordering``."""
+        demande = queryset.query.order_by
+        if not demande:
+            return tuple(self.ordering)
+        meta = queryset.model._meta
+        colonnes = getattr(queryset, '_fields', None)  # lignes .values() : seules ces clés sont lisibles
+        ordre = []
+        for terme in demande:
+            if not isinstance(terme, str):
+                raise ParseError(self.invalid_ordering_message)
+            nom = terme.lstrip('-')
+            nom = meta.pk.name if nom == 'pk' else nom
+            try:
+                champ = meta.get_field(nom)
+            except FieldDoesNotExist:  # annotation (rang de recherche...)
+                raise ParseError(self.invalid_ordering_message)
+            if champ.null or champ.is_relation or (colonnes and nom not in colonnes):
+                raise ParseError(self.invalid_ordering_message)
+            ordre.append(f"{'-' if terme.startswith('-') else ''}{nom}")
+        if meta.pk.name not in [terme.lstrip('-') for terme in ordre]:
+            ordre.append(f"{'-' if ordre[-1].startswith('-') else ''}{meta.pk.name}")
+        return tuple(ordre)
+
+    def champs(self):
+        return [champ.lstrip('-') for champ in self.ordering]
+
+    def filtre_apres(self, position, reverse):
+        # comparaison de tuples (a, b) < (x, y) écrite en Q : a < x OR (a = x AND b < y)
+        condition = Q()
+        egalites = {}
+        for ordre, v in zip(self.ordering, position):
+            champ = ordre.lstrip('-')
+            descendant = ordre.startswith('-') != reverse
+            lookup = 'lt' if descendant else 'gt'
+            condition |= Q(**egalites, **{f'{champ}__{lookup}': v})
+            egalites[champ] = v
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.tri(queryset)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [o[1:] if o.startswith('-') else f'-{o}' for o in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.filtre_apres(position, reverse))
+
+        lignes = list(queryset[:self.page_size + 1])
+        encore = len(lignes) > self.page_size
+        lignes = lignes[:self.page_size]
+        if reverse:
+            lignes.reverse()
+            self.has_next, self.has_previous = position is not None, encore
+        else:
+            self.has_next, self.has_previous = encore, position is not None
+        self.lignes = lignes
+        return lignes
+
+    def get_next_link(self):
+        if not self.has_next or not self.lignes:
+            return None
+        return self.encode_cursor(self.lignes[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.lignes:
+            return None
+        return self.encode_cursor(self.lignes[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class BlogPagination(PageNumberPagination):
+    count_query_param = 'count'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.sans_comptage = False
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.get_page_size(request) or self.keyset.page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.count_query_param, '').lower() in ('0', 'false', 'non'):
+            return self.paginate_sans_comptage(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_sans_comptage(self, queryset, request):
+        self.request = request
+        self.sans_comptage = True
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            self.numero = int(page_number)
+            if self.numero < 1:
+                raise ValueError('Le numéro de page doit être positif.')
+        except ValueError as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        debut = (self.numero - 1) * page_size
+        lignes = list(queryset[debut:debut + page_size + 1])
+        if not lignes and self.numero > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='Page vide.'))
+        self.has_next = len(lignes) > page_size
+        return lignes[:page_size]
+
+    def get_next_link(self):
+        if not self.sans_comptage:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.numero + 1)
+
+    def get_previous_link(self):
+        if not self.sans_comptage:
+            return super().get_previous_link()
+        if self.numero <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.numero == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.numero - 1)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.sans_comptage:
+            return Response(OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data),
+            ]))
+        return super().get_paginated_response(data)
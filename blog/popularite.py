@@ -0,0 +1,273 @@
+"""
+Vues, likes et tendance des articles, comptés sans écriture par requête.
+
+Chaque lecture d'un article (détail, by-slug, y compris les 304 et les
+réponses servies par le cache) et chaque like s'ajoutent à un tampon propre au
+processus. Un fil d'arrière-plan le vide toutes les
+``BLOG_POPULARITE_INTERVALLE`` secondes : un SELECT et un UPDATE groupé
+(``CASE pk WHEN ...``) pour tous les articles touchés, autant pour leurs
+catégories. Les lectures ne prennent donc jamais le verrou d'écriture de
+SQLite. Un arrêt brutal du processus perd au plus un intervalle de comptage.
+Un vidage raté (quelle que soit l'erreur) est journalisé et ses incréments
+sont remis au tampon pour le suivant.
+
+Chaque incrément est rangé avec la base où il a été compté (alias et nom de
+fichier / base) : un lot n'est jamais écrit ailleurs. Les commandes qui
+comptent sur une base jetable (``benchmark_api``, ``charge_asgi``,
+``stress_sqlite``) l'entourent de ``base_jetable()`` : ni fil de vidage, ni
+vidage à la sortie du processus, tampon vidé avant la suppression de la base.
+
+Tendance : décroissance « vers l'avant » (forward decay). Un évènement de
+poids ``w`` à l'instant ``t`` compte ``w * exp(λ (t - t0))``, avec
+``λ = ln 2 / BLOG_POPULARITE_DEMI_VIE`` et ``t0`` une époque fixe : classer
+par cette somme revient à classer par la somme décroissante dans le temps,
+sans jamais réécrire les anciens scores. On stocke son logarithme
+(``score_tendance``), additionné par ``logaddexp``, pour ne jamais déborder.
+
+Un like n'est compté qu'une fois par votant (utilisateur, sinon IP) et par
+article sur ``BLOG_POPULARITE_FENETRE_LIKE`` secondes : un ``cache.add``
+atomique, sans écriture en base.
+
+Chaque vidage invalide l'étiquette ``popularite``, dont dépendent les listes
+triées par ``vues``, ``likes`` ou tendance (``?ordering=trending``).
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from rest_framework import filters
+
+from .models import Article, Categorie
+from .versions import invalider
+
+logger = logging.getLogger(__name__)
+
+EPOQUE = 1_735_689_600  # 2025-01-01 UTC
+POIDS = {'vues': 1.0, 'likes': 5.0}
+CHAMPS_TRI = ('vues', 'likes', 'score_tendance')
+
+
+def reglage(nom, defaut):
+    return getattr(settings, f'BLOG_POPULARITE_{nom}', defaut)
+
+
+def logaddexp(a, b):
+    if a is None:
+        return b
+    haut, bas = max(a, b), min(a, b)
+    return haut + math.log1p(math.exp(bas - haut))
+
+
+def log_poids(poids, instant):
+    demi_vie = reglage('DEMI_VIE', 24 * 3600)
+    return math.log(poids) + math.log(2) / demi_vie * (instant - EPOQUE)
+
+
+def base_courante(alias=DEFAULT_DB_ALIAS):
+    # les écritures partent toujours sur la principale (backend.routeurs) ; le nom
+    # distingue une base de test installée temporairement sous le même alias
+    return alias, str(connections[alias].settings_dict['NAME'])
+
+
+class Tampon:
+    """
+    Incréments en attente, par base puis par article ; protégé par un verrou
+    (les vues arrivent de plusieurs fils).
+    """
+    MAX_ARTICLES = 10_000
+
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.fil = None
+        self.jetable = False
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        # {(alias, nom de la base): (vues, likes, tendance)}
+        self.lots = {}
+
+    def lot(self, base):
+        return self.lots.setdefault(base, (Counter(), Counter(), {}))
+
+    def ajouter(self, article_id, champ, instant=None, base=None):
+        increment = log_poids(POIDS[champ], instant or time.time())
+        base = base or base_courante()
+        with self.verrou:
+            vues, likes, tendance = self.lot(base)
+            (vues if champ == 'vues' else likes)[article_id] += 1
+            tendance[article_id] = logaddexp(tendance.get(article_id), increment)
+            plein = sum(len(lot[2]) for lot in self.lots.values()) >= self.MAX_ARTICLES
+        if plein:
+            vider()
+        else:
+            self.demarrer()
+
+    def prendre(self):
+        with self.verrou:
+            lots = self.lots
+            self.reinitialiser()
+        return lots
+
+    def remettre(self, base, vues, likes, tendance):
+        # vidage raté : on garde les incréments pour le suivant
+        with self.verrou:
+            en_attente = self.lot(base)
+            en_attente[0].update(vues)
+            en_attente[1].update(likes)
+            for article_id, score in tendance.items():
+                en_attente[2][article_id] = logaddexp(en_attente[2].get(article_id), score)
+
+    def demarrer(self):
+        intervalle = reglage('INTERVALLE', 10)
+        if self.fil is not None or not intervalle or self.jetable:
+            return
+        with self.verrou:
+            if self.fil is None:
+                self.fil = threading.Thread(target=self.boucle, args=(intervalle,), daemon=True,
+                                            name='blog-popularite')
+                self.fil.start()
+                atexit.register(vider)
+
+    def boucle(self, intervalle):
+        while True:
+            time.sleep(intervalle)
+            try:
+                vider()
+            except Exception:
+                # le fil doit survivre ; les incréments du vidage raté ont été remis au tampon
+                logger.exception("Vidage des compteurs de popularité impossible, nouvel essai dans %s s.", intervalle)
+
+
+tampon = Tampon()
+
+
+@contextmanager
+def base_jetable():
+    """Comptage sur une base de test : ni fil de vidage ni vidage à la sortie, tampon vidé à la fin du bloc."""
+    tampon.jetable = True
+    try:
+        yield
+    finally:
+        with tampon.verrou:
+            tampon.reinitialiser()
+        tampon.jetable = False
+
+
+def compter(article_id, champ='vues'):
+    try:
+        tampon.ajouter(int(article_id), champ)
+    except (TypeError, ValueError):
+        pass
+
+
+def aimer(article_id, votant):
+    """Compte un like, sauf si ``votant`` a déjà aimé l'article dans la fenêtre ; retourne True si compté."""
+    if not cache.add(f'blog:like:{article_id}:{votant}', 1, reglage('FENETRE_LIKE', 24 * 3600)):
+        return False
+    compter(article_id, 'likes')
+    return True
+
+
+def case(valeurs, output_field):
+    return Case(
+        *[When(pk=pk, then=Value(v)) for pk, v in valeurs.items()],
+        default=Value(0), output_field=output_field,
+    )
+
+
+def vider():
+    """
+    Écrit le tampon en base (UPDATE groupés), chaque lot dans la base où il a
+    été compté ; retourne le nombre d'articles mis à jour.
+    """
+    total, echec = 0, None
+    for base, (vues, likes, tendance) in tampon.prendre().items():
+        if base != base_courante(base[0]):
+            continue  # base de test disparue : ses compteurs ne valent pour aucune autre
+        try:
+            total += ecrire(base[0], vues, likes, tendance)
+        except Exception as exc:
+            tampon.remettre(base, vues, likes, tendance)
+            echec = exc
+    if echec is not None:
+        raise echec
+    if total:
+        invalider('popularite')
+    return total
+
+
+def ecrire(alias, vues, likes, tendance):
+    with transaction.atomic(using=alias):
+        articles = Article.objects.using(alias)
+        lignes = articles.filter(pk__in=list(tendance)).order_by().select_for_update().values_list(
+            'pk', 'score_tendance', 'categorie_id',
+        )
+        scores, par_categorie = {}, defaultdict(lambda: None)
+        for pk, actuel, categorie_id in lignes:
+            scores[pk] = logaddexp(actuel, tendance[pk])
+            if categorie_id is not None:
+                par_categorie[categorie_id] = logaddexp(par_categorie[categorie_id], tendance[pk])
+        if not scores:
+            return 0
+        articles.filter(pk__in=scores).update(
+            vues=F('vues') + case({pk: vues[pk] for pk in scores}, IntegerField()),
+            likes=F('likes') + case({pk: likes[pk] for pk in scores}, IntegerField()),
+            score_tendance=case(scores, FloatField()),
+        )
+        if par_categorie:
+            categories = Categorie.objects.using(alias)
+            actuels = (
+                categories.filter(pk__in=list(par_categorie)).order_by().select_for_update()
+                .values_list('pk', 'score_tendance')
+            )
+            categories.filter(pk__in=list(par_categorie)).update(score_tendance=case(
+                {pk: logaddexp(actuel, par_categorie[pk]) for pk, actuel in actuels}, FloatField(),
+            ))
+    return len(scores)
+
+
+def compter_vues(article_id):
+    """
+    Décorateur d'action de lecture (à placer au-dessus de ``reponse_en_cache``) :
+    compte une vue de ``article_id(request, **kwargs)`` quand l'article a été servi
+    à un visiteur (pas aux lectures internes de préchauffage, ``blog.publication``).
+    """
+    def decorateur(methode):
+        @wraps(methode)
+        def wrapper(self, request, *args, **kwargs):
+            reponse = methode(self, request, *args, **kwargs)
+            if reponse.status_code in (200, 304) and not getattr(request, 'prechauffage', False):
+                compter(article_id(request, **kwargs))
+            return reponse
+        return wrapper
+    return decorateur
+
+
+def tri_populaire(request):
+    """La liste demandée est-elle triée par popularité (et donc périmée à chaque vidage) ?"""
+    ordering = request.GET.get('ordering', '')
+    return any(champ in ordering for champ in CHAMPS_TRI + ('trending',))
+
+
+class TriFilter(filters.OrderingFilter):
+    """``OrderingFilter`` avec l'alias ``trending`` (tendance décroissante) et l'id pour départager."""
+    ALIAS = {'trending': '-score_tendance', '-trending': 'score_tendance'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = [self.ALIAS.get(champ.strip(), champ) for champ in fields]
+        return super().remove_invalid_fields(queryset, fields, view, request)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and request.query_params.get(self.ordering_param) and not {'id', '-id'} & set(ordering):
+            ordering = [*ordering, '-id']
+        return ordering
@@ -0,0 +1,143 @@
+"""
+Publication programmée des articles.
+
+Un article ``scheduled`` porte sa ``date_publication`` ; la commande
+``publier_programmes`` lit la file des échéances dépassées (index partiel
+``article_file_publication``) et publie par lots : un seul UPDATE par lot,
+puis flux public (``blog.flux``) et étiquettes de cache mis à jour. L'UPDATE
+ne déclenche aucun signal : tout ce qui dépend du statut est refait ici
+(voisins de ``blog.similarite``, facettes ``tags``, catalogue des skills).
+
+Une fois la transaction validée (``on_commit``), le lot est préchauffé : la première
+page de la liste publique (générale et par catégorie), le détail et le
+by-slug de chaque article sont rendus par les vues elles-mêmes et rangés dans
+le cache de réponses (``blog.cache_reponses``). Les premiers visiteurs
+tombent donc sur un cache déjà chaud, au lieu de recalculer tous en même
+temps les réponses que la publication vient d'invalider. Préchauffer avant la
+validation rangerait en cache des articles publiés par une transaction qui
+peut encore être annulée. Les URL absolues de
+ces réponses sont construites sur ``BLOG_URL_PUBLIQUE`` (schéma et hôte).
+Ces lectures internes sont marquées (``prechauffage``) : elles ne comptent
+pas de vues (``blog.popularite``).
+"""
+import io
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, router, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from skills import catalogue
+
+from . import flux, similarite
+from .cache_reponses import retenir_slug
+from .models import Article
+from .versions import invalider
+from .views import ArticleViewSet
+
+VUES = {action: ArticleViewSet.as_view({'get': action}) for action in ('list', 'retrieve', 'by_slug')}
+
+
+def reglage(nom, defaut):
+    return getattr(settings, f'BLOG_PUBLICATION_{nom}', defaut)
+
+
+def echus(maintenant=None):
+    """Articles programmés dont l'échéance est passée, par ordre d'échéance."""
+    return Article.objects.filter(
+        statut='scheduled', date_publication__lte=maintenant or timezone.now(),
+    ).order_by('date_publication', 'id')
+
+
+def prochaine_echeance():
+    return Article.objects.filter(statut='scheduled').order_by('date_publication', 'id').values_list(
+        'date_publication', flat=True,
+    ).first()
+
+
+def publier_lot(taille=None, prechauffage=True):
+    """
+    Publie un lot d'articles échus ; retourne (publiés, réponses préchauffées,
+    échecs). Dans une transaction englobante, le préchauffage attend sa
+    validation et n'est pas compté.
+    """
+    taille = taille or reglage('TAILLE_LOT', 50)
+    alias = router.db_for_write(Article)
+    chauffe = {'rendues': 0, 'echecs': 0}
+
+    def chauffer():
+        chauffe['rendues'], chauffe['echecs'] = prechauffer(ids)
+
+    with transaction.atomic(using=alias):
+        file = echus().using(alias)
+        if connections[alias].features.has_select_for_update_skip_locked:
+            file = file.select_for_update(skip_locked=True)  # plusieurs workers possibles
+        ids = list(file.values_list('id', flat=True)[:taille])
+        if not ids:
+            return 0, 0, 0
+        Article.objects.using(alias).filter(pk__in=ids, statut='scheduled').update(
+            statut='published', date_modification=timezone.now(),
+        )
+        flux.rafraichir(*ids)
+        # UPDATE sans signal : voisins calculés ici
+        for article in Article.objects.using(alias).filter(pk__in=ids).only(*similarite.CHAMPS):
+            similarite.mettre_a_jour(article)
+        invalider('articles', 'tags', *[f'article:{pk}' for pk in ids])
+        catalogue.invalider()  # articles liés aux compétences
+        if prechauffage:
+            transaction.on_commit(chauffer, using=alias)
+    return len(ids), chauffe['rendues'], chauffe['echecs']
+
+
+def a_prechauffer(article_ids):
+    """(action, url, kwargs) des lectures publiques que la publication de ces articles change."""
+    articles = list(Article.objects.filter(pk__in=article_ids).select_related('categorie').order_by('id'))
+    liste = reverse('article-list')
+    cibles = [('list', liste, {})]
+    for slug in sorted({a.categorie.slug for a in articles if a.categorie}):
+        cibles.append(('list', f"{liste}?{urlencode({'categorie__slug': slug})}", {}))
+    for article in articles:
+        pk = str(article.pk)
+        # by-slug ne passe par le cache qu'une fois la correspondance slug -> id connue
+        retenir_slug(article.slug, article.pk)
+        cibles.append(('retrieve', reverse('article-detail', args=[pk]), {'pk': pk}))
+        cibles.append(('by_slug', reverse('article-by-slug', args=[article.slug]), {'pk': article.slug}))
+    return cibles
+
+
+def requete_interne(url, adresse):
+    """GET anonyme sur ``url`` tel que reçu par ``adresse`` (schéma, hôte), marqué comme préchauffage."""
+    chemin = urlsplit(url)
+    requete = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': chemin.path,
+        'QUERY_STRING': chemin.query,
+        'HTTP_HOST': adresse.netloc,
+        'SERVER_NAME': adresse.hostname,
+        'SERVER_PORT': str(adresse.port or (443 if adresse.scheme == 'https' else 80)),
+        'wsgi.url_scheme': adresse.scheme,
+        'wsgi.input': io.BytesIO(),
+    })
+    requete.prechauffage = True
+    return requete
+
+
+def prechauffer(article_ids):
+    """Rend en visiteur anonyme les réponses touchées par la publication ; retourne (rendues, échecs)."""
+    adresse = urlsplit(getattr(settings, 'BLOG_URL_PUBLIQUE', 'http://localhost:8000'))
+    rendues = echecs = 0
+    for action, url, kwargs in a_prechauffer(article_ids):
+        try:
+            # point de sauvegarde : un échec de rendu n'annule pas la publication
+            with transaction.atomic(using=router.db_for_write(Article)):
+                reponse = VUES[action](requete_interne(url, adresse), **kwargs)
+        except Exception:
+            echecs += 1
+            continue
+        if reponse.status_code == 200:
+            rendues += 1
+        else:
+            echecs += 1
+    return rendues, echecs
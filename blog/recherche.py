@@ -0,0 +1,156 @@
+"""
+Recherche plein texte pour les articles et les commentaires.
+
+Le backend est choisi selon la base utilisée :
+
+* SQLite : tables virtuelles FTS5 à contenu externe (``blog_article_fts``,
+  ``blog_commentaire_fts``), tenues à jour par des triggers créés dans la
+  migration 0002 — y compris pour ``bulk_create`` et ``queryset.update()``.
+  SQLite supprime les triggers quand une migration reconstruit la table
+  (``AddField``…) : ``installer_index_sqlite`` les recrée après chaque migrate ;
+* PostgreSQL : ``to_tsvector`` sur un index GIN d'expression ;
+* autres bases : ``icontains`` classique de ``SearchFilter``.
+
+Les termes sont recherchés par préfixe (``comm`` trouve ``communication``) et,
+sauf tri explicite (``?ordering=``), les résultats sont classés par pertinence.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Article, Commentaire
+
+# modèle -> (table FTS5, colonnes indexées) ; doit rester aligné sur la migration 0002
+INDEX = {
+    Article: ('blog_article_fts', ('titre', 'contenu', 'meta_description', 'mots_cles')),
+    Commentaire: ('blog_commentaire_fts', ('auteur', 'contenu')),
+}
+
+MOT_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def extraire_mots(texte):
+    return MOT_RE.findall(texte or '')
+
+
+class RechercheBackend:
+    """Interface commune des backends : filtre un queryset sur une recherche."""
+
+    def __init__(self, model):
+        self.model = model
+        self.table, self.colonnes = INDEX[model]
+
+    def filtrer(self, queryset, mots, classer=True):
+        raise NotImplementedError
+
+
+class RechercheSQLite(RechercheBackend):
+
+    def requete_match(self, mots):
+        # chaque mot entre guillemets (pas de syntaxe FTS injectée) + préfixe
+        return ' '.join('"%s"*' % mot.replace('"', '') for mot in mots)
+
+    def filtrer(self, queryset, mots, classer=True):
+        # une seule jointure sur la table FTS : MATCH évalué une fois, et bm25()
+        # lu sur la même ligne (pas de sous-requête corrélée par article)
+        source = self.model._meta.db_table
+        queryset = queryset.extra(
+            tables=[self.table],
+            where=[f"{self.table}.rowid = {source}.id", f"{self.table} MATCH %s"],
+            params=[self.requete_match(mots)],
+        )
+        if not classer:
+            return queryset
+        # bm25 calculé dans la requête filtrée (catégorie, statut, tags...) : pas de
+        # présélection globale tronquée ; plus petit = plus pertinent
+        rang = RawSQL(f"bm25({self.table})", [], output_field=FloatField())
+        return queryset.annotate(rang_recherche=rang).order_by('rang_recherche', '-pk')
+
+
+class RecherchePostgres(RechercheBackend):
+    CONFIG = 'french'
+
+    def vecteur(self):
+        # même expression que l'index GIN créé par la migration 0002
+        colonnes = " || ' ' || ".join(f"coalesce({self.model._meta.db_table}.{c}, '')" for c in self.colonnes)
+        return f"to_tsvector('{self.CONFIG}', {colonnes})"
+
+    def requete_tsquery(self, mots):
+        # les mots viennent de extraire_mots() : uniquement des caractères \w
+        return ' & '.join("%s:*" % mot for mot in mots)
+
+    def filtrer(self, queryset, mots, classer=True):
+        tsquery = self.requete_tsquery(mots)
+        vecteur = self.vecteur()
+        queryset = queryset.filter(RawSQL(
+            f"{vecteur} @@ to_tsquery('{self.CONFIG}', %s)", [tsquery], output_field=BooleanField(),
+        ))
+        if not classer:
+            return queryset
+        rang = RawSQL(f"ts_rank({vecteur}, to_tsquery('{self.CONFIG}', %s))", [tsquery])
+        return queryset.annotate(rang_recherche=rang).order_by('-rang_recherche')
+
+
+def installer_index_sqlite(using='default', **kwargs):
+    """
+    Recrée tables FTS5 et triggers manquants (post_migrate), puis reconstruit
+    l'index d'une table dont les triggers avaient disparu.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        triggers = {row[0] for row in cursor.fetchall()}
+        for model, (table, colonnes) in INDEX.items():
+            if {f'{table}_ai', f'{table}_ad', f'{table}_au'} <= triggers:
+                continue
+            source = model._meta.db_table
+            cols = ', '.join(colonnes)
+            new_cols = ', '.join(f'new.{c}' for c in colonnes)
+            old_cols = ', '.join(f'old.{c}' for c in colonnes)
+            for sql in (
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({cols}, content='{source}', "
+                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {source} BEGIN "
+                f"INSERT INTO {table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {source} BEGIN "
+                f"INSERT INTO {table}({table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+                f"INSERT INTO {table}({table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+                f"INSERT INTO {table}({table}) VALUES ('rebuild')",
+            ):
+                cursor.execute(sql)
+
+
+BACKENDS = {
+    'sqlite': RechercheSQLite,
+    'postgresql': RecherchePostgres,
+}
+
+
+def get_backend(model, using=None):
+    using = using or router.db_for_read(model)
+    backend = BACKENDS.get(connections[using].vendor)
+    return backend(model) if backend else None
+
+
+class RechercheTexteFilter(filters.SearchFilter):
+    """
+    Remplaçant de ``SearchFilter`` qui s'appuie sur l'index plein texte.
+    Retombe sur les LIKE de ``search_fields`` si la base n'a pas de backend.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        mots = [mot for terme in self.get_search_terms(request) for mot in extraire_mots(terme)]
+        if not mots:
+            return super().filter_queryset(request, queryset, view)
+        backend = get_backend(queryset.model, using=queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        classer = not request.query_params.get(filters.OrderingFilter.ordering_param)
+        return backend.filtrer(queryset, mots, classer=classer)
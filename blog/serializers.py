@@ -1,43 +1,83 @@
 from rest_framework import serializers
-from .models import Categorie, Article, Commentaire
+from django.db.models import F
+from django.db.models.functions import Length, Substr
+from .models import Categorie, Article, Commentaire, Tag
+from .arbre_commentaires import get_arbre
+from .images import srcset, url_image
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+def srcset_article(article, context):
+    # déclinaisons WebP / JPEG produites par le worker generer_rendus (blog.images)
+    request = context.get('request')
+    return srcset(article.image.name, article.rendus, article.rendus_pour, lambda nom: url_image(nom, request))
+
+
 class CategorieSerializer(serializers.ModelSerializer):
     class Meta:
         model = Categorie
         fields = ('id', 'nom', 'slug')
 
 
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ('id', 'nom', 'slug')
+
+
 class ArticleListSerializer(serializers.ModelSerializer):
     categorie = CategorieSerializer(read_only=True)
     auteur = serializers.StringRelatedField(read_only=True)
     extrait = serializers.ReadOnlyField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
-        fields = ('id', 'titre', 'slug', 'extrait', 'image', 'categorie', 'auteur', 'date_creation', 'statut', 'meta_description', 'mots_cles')
+        fields = ('id', 'titre', 'slug', 'extrait', 'image', 'srcset', 'categorie', 'auteur', 'date_creation', 'statut', 'meta_description', 'mots_cles', 'nb_commentaires_valides')
+
+    def get_srcset(self, obj):
+        return srcset_article(obj, self.context)
 
 
 class ArticleDetailSerializer(serializers.ModelSerializer):
     categorie = CategorieSerializer(read_only=True)
     auteur = serializers.StringRelatedField(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)  # prefetch_related('tags') dans les vues
     commentaires = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
-        fields = ('id', 'titre', 'slug', 'contenu', 'image', 'categorie', 'auteur', 'date_creation', 'date_modification', 'statut', 'meta_description', 'mots_cles', 'commentaires')
+        fields = ('id', 'titre', 'slug', 'contenu', 'image', 'srcset', 'categorie', 'auteur', 'date_creation', 'date_modification', 'date_publication', 'statut', 'meta_description', 'mots_cles', 'tags', 'nb_commentaires_valides', 'commentaires')
+
+    def get_srcset(self, obj):
+        return srcset_article(obj, self.context)
 
     def get_commentaires(self, obj):
-        commentaires = obj.commentaires.filter(valide=True, parent__isnull=True).order_by('-date_creation')
-        return CommentaireSerializer(commentaires, many=True).data
+        # arbre complet (réponses imbriquées), chargé en une requête et mis en cache ;
+        # les vues asynchrones le chargent elles-mêmes et le passent dans le contexte
+        if 'arbre' in self.context:
+            return self.context['arbre']
+        return get_arbre(obj.pk)
 
 
 class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
+    # tags existants, désignés par leur slug
+    tags = serializers.SlugRelatedField(many=True, slug_field='slug', queryset=Tag.objects.all(), required=False)
+
     class Meta:
         model = Article
-        fields = ('titre', 'contenu', 'image', 'categorie', 'statut', 'meta_description', 'mots_cles')
+        fields = ('titre', 'contenu', 'image', 'categorie', 'statut', 'date_publication', 'meta_description', 'mots_cles', 'tags')
+
+    def validate(self, attrs):
+        # un article programmé doit savoir quand paraître (publier_programmes)
+        statut = attrs.get('statut', getattr(self.instance, 'statut', None))
+        date_publication = attrs.get('date_publication', getattr(self.instance, 'date_publication', None))
+        if statut == 'scheduled' and date_publication is None:
+            raise serializers.ValidationError({'date_publication': "Obligatoire pour un article programmé."})
+        return attrs
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -49,8 +89,8 @@ class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
 class CommentaireSerializer(serializers.ModelSerializer):
     class Meta:
         model = Commentaire
-        fields = ('id', 'article', 'auteur', 'auteur_user', 'contenu', 'date_creation', 'valide', 'parent')
-        read_only_fields = ('date_creation', 'valide', 'auteur_user')
+        fields = ('id', 'article', 'auteur', 'auteur_user', 'contenu', 'date_creation', 'valide', 'parent', 'nb_reponses')
+        read_only_fields = ('date_creation', 'valide', 'auteur_user', 'nb_reponses')
 
     def validate(self, attrs):
         # simple anti-spam: contenu min length
@@ -67,3 +107,108 @@ class CommentaireSerializer(serializers.ModelSerializer):
         # par défaut, commentaire non validé (modération)
         validated_data['valide'] = False
         return super().create(validated_data)
+
+
+# --- chemin rapide en lecture seule pour les listes ---------------------------
+#
+# Mêmes sorties (octet pour octet une fois rendues en JSON) qu'ArticleListSerializer
+# et CommentaireSerializer, mais construites directement depuis .values() : pas de
+# machinerie de champs DRF par ligne, et l'extrait est découpé en SQL (Substr) pour
+# ne jamais charger le contenu complet. L'équivalence est vérifiée par blog/tests.py.
+
+class FastSerializer:
+    date_field = serializers.DateTimeField()
+
+    def __init__(self, lignes, context=None):
+        self.lignes = lignes
+        self.context = context or {}
+
+    @property
+    def data(self):
+        return [self.to_representation(ligne) for ligne in self.lignes]
+
+    def date(self, valeur):
+        return self.date_field.to_representation(valeur) if valeur is not None else None
+
+
+class ArticleListFastSerializer(FastSerializer):
+    LONGUEUR_EXTRAIT = 300
+
+    @classmethod
+    def preparer(cls, queryset):
+        return queryset.values(
+            'id', 'titre', 'slug', 'image', 'date_creation', 'statut', 'meta_description', 'mots_cles',
+            'nb_commentaires_valides', 'categorie_id', 'rendus', 'rendus_pour',
+            extrait_debut=Substr('contenu', 1, cls.LONGUEUR_EXTRAIT),
+            extrait_tronque=Length('contenu'),
+            categorie_nom=F('categorie__nom'),
+            categorie_slug=F('categorie__slug'),
+            auteur_nom=F('auteur__' + User.USERNAME_FIELD),
+        )
+
+    def image(self, nom):
+        return url_image(nom, self.context.get('request')) if nom else None
+
+    def extrait(self, ligne):
+        extrait = ligne['extrait_debut']
+        if ligne['extrait_tronque'] > self.LONGUEUR_EXTRAIT:
+            extrait += '...'
+        return extrait
+
+    def to_representation(self, ligne):
+        categorie = None
+        if ligne['categorie_id'] is not None:
+            categorie = {'id': ligne['categorie_id'], 'nom': ligne['categorie_nom'], 'slug': ligne['categorie_slug']}
+        return {
+            'id': ligne['id'],
+            'titre': ligne['titre'],
+            'slug': ligne['slug'],
+            'extrait': self.extrait(ligne),
+            'image': self.image(ligne['image']),
+            'srcset': srcset(ligne['image'], ligne['rendus'], ligne['rendus_pour'], self.image),
+            'categorie': categorie,
+            'auteur': ligne['auteur_nom'],
+            'date_creation': self.date(ligne['date_creation']),
+            'statut': ligne['statut'],
+            'meta_description': ligne['meta_description'],
+            'mots_cles': ligne['mots_cles'],
+            'nb_commentaires_valides': ligne['nb_commentaires_valides'],
+        }
+
+
+class ArticleFluxSerializer(ArticleListFastSerializer):
+    """Même sortie, lue dans le flux public dénormalisé (blog.flux) : aucune jointure."""
+
+    @classmethod
+    def preparer(cls, queryset):
+        return queryset.values(
+            'id', 'titre', 'slug', 'extrait', 'image', 'date_creation', 'statut', 'meta_description',
+            'mots_cles', 'nb_commentaires_valides', 'categorie_id', 'categorie_nom', 'categorie_slug',
+            'auteur_nom', 'rendus', 'rendus_pour',
+        )
+
+    def extrait(self, ligne):
+        return ligne['extrait']
+
+
+class CommentaireFastSerializer(FastSerializer):
+
+    @classmethod
+    def preparer(cls, queryset):
+        return queryset.values(
+            'id', 'article_id', 'auteur', 'auteur_user_id', 'contenu', 'date_creation', 'valide',
+            'parent_id', 'nb_reponses',
+        )
+
+    def to_representation(self, ligne):
+        return {
+            'id': ligne['id'],
+            'article': ligne['article_id'],
+            'auteur': ligne['auteur'],
+            'auteur_user': ligne['auteur_user_id'],
+            'contenu': ligne['contenu'],
+            'date_creation': self.date(ligne['date_creation']),
+            'valide': ligne['valide'],
+            'parent': ligne['parent_id'],
+            'nb_reponses': ligne['nb_reponses'],
+        }
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import compteurs, flux, similarite
+from .arbre_commentaires import invalider_arbre
+from .cache_reponses import oublier_slugs
+from .models import Article, Categorie, Commentaire, Tag
+from .versions import invalider
+
+
+@receiver(post_init, sender=Commentaire)
+def commentaire_charge(sender, instance, **kwargs):
+    # état d'origine, pour calculer le delta des compteurs à l'enregistrement
+    instance._contribution_compteurs = compteurs.contribution(instance)
+
+
+@receiver(post_save, sender=Commentaire)
+def commentaire_enregistre(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        compteurs.commentaire_enregistre(instance, created)
+    invalider_arbre(instance.article_id)
+
+
+@receiver(post_delete, sender=Commentaire)
+def commentaire_supprime(sender, instance, **kwargs):
+    compteurs.commentaire_supprime(instance)
+    invalider_arbre(instance.article_id)
+
+
+@receiver(post_save, sender=Categorie)
+@receiver(post_delete, sender=Categorie)
+def categorie_modifiee(sender, instance, **kwargs):
+    # nom / slug imbriqués dans les représentations d'articles
+    invalider('categories')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_modifie(sender, instance, **kwargs):
+    invalider('tags')
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def tags_article_modifies(sender, action, **kwargs):
+    # tags affichés dans le détail, filtres et facettes de la liste
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalider('tags')
+
+
+@receiver(post_save, sender=Categorie)
+def categorie_enregistree(sender, instance, created, **kwargs):
+    if not created:
+        flux.renommer_categorie(instance)
+
+
+@receiver(post_delete, sender=Categorie)
+def categorie_supprimee(sender, instance, **kwargs):
+    flux.detacher(categorie=instance.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+def utilisateur_enregistre(sender, instance, created, update_fields=None, **kwargs):
+    # le nom d'auteur est recopié dans le flux ; last_login seul ne le change pas
+    if not created and (update_fields is None or sender.USERNAME_FIELD in update_fields):
+        flux.renommer_auteur(instance)
+
+
+@receiver(post_delete, sender=get_user_model())
+def utilisateur_supprime(sender, instance, **kwargs):
+    flux.detacher(auteur=instance.pk)
+
+
+@receiver(post_init, sender=Article)
+def article_charge(sender, instance, **kwargs):
+    # slug d'origine (sans le charger s'il est différé) : sa correspondance slug -> id est à oublier s'il change
+    instance._slug_origine = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_modifie(sender, instance, **kwargs):
+    invalider('articles', f'article:{instance.pk}')
+    oublier_slugs(*{instance.slug, instance._slug_origine} - {None, ''})
+    instance._slug_origine = instance.slug
+
+
+@receiver(post_save, sender=Article)
+def article_enregistre(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    flux.rafraichir(instance.pk)
+    if update_fields is None or set(similarite.CHAMPS) & set(update_fields):
+        similarite.mettre_a_jour(instance)
+
+
+@receiver(post_delete, sender=Article)
+def article_supprime(sender, instance, **kwargs):
+    flux.retirer(instance.pk)
@@ -0,0 +1,241 @@
+"""
+Articles similaires : index TF-IDF et plus proches voisins précalculés.
+
+* ``TermeArticle`` : pour chaque article publié, ses termes et leur poids
+  TF-IDF (normalisé L2). Les termes viennent du titre (compté double), du
+  contenu et des ``mots_cles`` normalisés, rangés sous ``mc:<mot-clé>`` et
+  comptés triple. Les fréquences documentaires sont lues dans la table
+  elle-même (index ``terme``) ; le nombre d'articles indexés est gardé en
+  cache (``nb_documents``), ajusté à chaque réindexation.
+* ``ArticleSimilaire`` : les ``BLOG_SIMILAIRES_K`` voisins de chaque article
+  (similarité cosinus), lus en une requête indexée sur ``(article, rang)``
+  par l'action ``/api/articles/<id>/related/``.
+
+À l'enregistrement d'un article (signal), ``mettre_a_jour`` réindexe ses
+termes et cherche ses candidats dans les listes inverses de ses
+``BLOG_SIMILAIRES_TERMES`` termes les plus lourds, puis met à jour sa liste et
+celles des voisins concernés. Le travail fait dans le signal est borné : les
+termes présents dans plus de ``BLOG_SIMILAIRES_DF_MAX`` du corpus sont
+ignorés (peu discriminants, listes les plus longues) et seuls les
+``BLOG_SIMILAIRES_POSTES`` meilleurs poids de chaque liste inverse sont lus. Les poids des autres articles gardent l'IDF du
+moment où ils ont été calculés : la commande ``calculer_similarites`` refait
+tout l'index d'un coup (et après un import en masse, qui ne passe pas par les
+signaux). Calculs en Python pur sur des vecteurs creux (dicts) : pas de
+dépendance numérique pour un corpus de la taille d'un blog.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Article, ArticleSimilaire, TermeArticle
+from .moderation import normaliser
+
+MOTS_VIDES = set("""
+    les des une dans pour par sur avec sans est sont pas plus que qui quoi aux ces ses son sa leur leurs
+    nous vous ils elles elle lui etre avoir fait faire tout tous toute toutes mais donc car comme
+    cette cet entre vers chez aussi tres bien ainsi alors dont elle ont etait peut nos vos mes tes
+""".split())
+# champs lus pour l'index ; un enregistrement qui n'en touche aucun ne réindexe pas
+CHAMPS = ('id', 'titre', 'contenu', 'mots_cles', 'statut')
+POIDS_TITRE = 2
+POIDS_MOT_CLE = 3
+# en dessous de ce nombre d'articles, aucun terme n'est jugé trop courant
+DF_PLANCHER = 50
+CLE_DOCUMENTS = 'blog:similarite:documents'
+
+
+def reglage(nom, defaut):
+    return getattr(settings, f'BLOG_SIMILAIRES_{nom}', defaut)
+
+
+def mots_cles(texte):
+    """``'Écoute active, empathie'`` -> ``['ecoute active', 'empathie']`` (normalisés, sans doublon)."""
+    vus = []
+    for mot in (texte or '').split(','):
+        mot = normaliser(mot)
+        if mot and mot not in vus:
+            vus.append(mot)
+    return vus
+
+
+def mots(texte):
+    return [m for m in normaliser(texte).split() if len(m) > 2 and not m.isdigit() and m not in MOTS_VIDES]
+
+
+def frequences(article):
+    tf = Counter(mots(article.contenu))
+    for mot in mots(article.titre):
+        tf[mot] += POIDS_TITRE
+    for mot in mots_cles(article.mots_cles):
+        tf[f'mc:{mot}'[:100]] += POIDS_MOT_CLE
+    return tf
+
+
+def ponderer(tf, df, n):
+    """TF-IDF (tf logarithmique, idf lissé) normalisé L2."""
+    vecteur = {
+        terme: (1 + math.log(nb)) * (math.log((1 + n) / (1 + df.get(terme, 0))) + 1)
+        for terme, nb in tf.items()
+    }
+    norme = math.sqrt(sum(p * p for p in vecteur.values())) or 1.0
+    return {terme: p / norme for terme, p in vecteur.items()}
+
+
+def lourds(vecteur, df=None, n=0):
+    """Termes les plus lourds du vecteur, sans les termes trop courants du corpus (``df`` : fréquences)."""
+    plafond = max(reglage('DF_MAX', 0.5) * n, DF_PLANCHER)
+    termes = [terme for terme in vecteur if df is None or df.get(terme, 0) <= plafond]
+    return sorted(termes, key=vecteur.get, reverse=True)[:reglage('TERMES', 20)]
+
+
+def nb_documents():
+    """Nombre d'articles indexés : compté une fois, puis tenu en cache."""
+    n = cache.get(CLE_DOCUMENTS)
+    if n is None:
+        n = TermeArticle.objects.values('article').distinct().count()
+        cache.add(CLE_DOCUMENTS, n, reglage('DUREE_DOCUMENTS', 3600))
+    return n
+
+
+def ajuster_documents(delta):
+    def ajuster():
+        try:
+            cache.incr(CLE_DOCUMENTS, delta) if delta > 0 else cache.decr(CLE_DOCUMENTS, -delta)
+        except ValueError:  # absent : recompté à la prochaine lecture
+            pass
+    if delta:
+        transaction.on_commit(ajuster)
+
+
+def indexer(article):
+    """
+    Réécrit les termes de l'article ; retourne (vecteur, termes à chercher),
+    ({}, []) s'il n'est pas publié.
+    """
+    n = nb_documents()
+    etait_indexe = TermeArticle.objects.filter(article=article).delete()[0] > 0
+    if article.statut != 'published':
+        ajuster_documents(-etait_indexe)
+        return {}, []
+    ajuster_documents(not etait_indexe)
+    n += not etait_indexe
+    tf = frequences(article)
+    df = dict(
+        TermeArticle.objects.filter(terme__in=list(tf)).values('terme').annotate(nb=Count('id'))
+        .values_list('terme', 'nb')
+    )
+    df = {terme: df.get(terme, 0) + 1 for terme in tf}
+    vecteur = ponderer(tf, df, n)
+    TermeArticle.objects.bulk_create(
+        [TermeArticle(article=article, terme=terme, poids=poids) for terme, poids in vecteur.items()],
+        batch_size=500,
+    )
+    return vecteur, lourds(vecteur, df, n)
+
+
+def scores(article_id, vecteur, termes):
+    """
+    Produit scalaire avec les articles qui partagent un des ``termes`` ; au plus
+    ``BLOG_SIMILAIRES_POSTES`` articles lus par terme (les plus gros poids).
+    """
+    resultat = defaultdict(float)
+    lignes = TermeArticle.objects.filter(terme__in=termes).exclude(article_id=article_id).annotate(
+        position=Window(RowNumber(), partition_by=F('terme'), order_by=F('poids').desc()),
+    ).filter(position__lte=reglage('POSTES', 200))
+    for autre, terme, poids in lignes.values_list('article_id', 'terme', 'poids').iterator():
+        resultat[autre] += vecteur[terme] * poids
+    return resultat
+
+
+def classer(candidats):
+    """{id: score} -> [(id, score)] des k meilleurs, score décroissant puis id."""
+    k = reglage('K', 5)
+    return sorted(candidats.items(), key=lambda element: (-element[1], element[0]))[:k]
+
+
+def remplacer(listes):
+    """Réécrit les listes {article_id: [(similaire_id, score)]}."""
+    ArticleSimilaire.objects.filter(article_id__in=listes).delete()
+    ArticleSimilaire.objects.bulk_create([
+        ArticleSimilaire(article_id=article_id, similaire_id=similaire_id, score=round(score, 6), rang=rang)
+        for article_id, liste in listes.items()
+        for rang, (similaire_id, score) in enumerate(liste, start=1)
+    ], batch_size=500)
+
+
+def mettre_a_jour(article):
+    """Réindexe un article et met à jour sa liste de voisins et celles qu'il touche."""
+    with transaction.atomic():
+        vecteur, termes = indexer(article)
+        candidats = scores(article.pk, vecteur, termes) if vecteur else {}
+        listes = {article.pk: classer(candidats)}
+
+        # listes des autres : l'article y entre, y change de score ou en sort
+        sources = set(candidats) | set(
+            ArticleSimilaire.objects.filter(similaire=article).values_list('article_id', flat=True)
+        )
+        existantes = defaultdict(dict)
+        for source, similaire, score in ArticleSimilaire.objects.filter(article_id__in=sources).values_list(
+            'article_id', 'similaire_id', 'score',
+        ):
+            existantes[source][similaire] = score
+        for source in sources:
+            voisins = dict(existantes[source])
+            voisins.pop(article.pk, None)
+            if source in candidats:
+                voisins[article.pk] = candidats[source]  # cosinus symétrique
+            nouvelle = classer(voisins)
+            if nouvelle != classer(existantes[source]):
+                listes[source] = nouvelle
+        remplacer(listes)
+    return listes[article.pk]
+
+
+def recalculer():
+    """Reconstruit l'index et toutes les listes de voisins ; retourne le nombre d'articles indexés."""
+    articles = list(Article.objects.filter(statut='published').only(*CHAMPS))
+    frequences_par_article = {article.pk: frequences(article) for article in articles}
+    df = Counter(terme for tf in frequences_par_article.values() for terme in tf)
+    vecteurs = {pk: ponderer(tf, df, len(articles)) for pk, tf in frequences_par_article.items()}
+
+    inverse = defaultdict(list)
+    for pk, vecteur in vecteurs.items():
+        for terme, poids in vecteur.items():
+            inverse[terme].append((pk, poids))
+    listes = {}
+    for pk, vecteur in vecteurs.items():
+        candidats = defaultdict(float)
+        for terme in lourds(vecteur, df, len(articles)):
+            for autre, poids in inverse[terme]:
+                if autre != pk:
+                    candidats[autre] += vecteur[terme] * poids
+        listes[pk] = classer(candidats)
+
+    with transaction.atomic():
+        TermeArticle.objects.all().delete()
+        ArticleSimilaire.objects.all().delete()
+        TermeArticle.objects.bulk_create([
+            TermeArticle(article_id=pk, terme=terme, poids=poids)
+            for pk, vecteur in vecteurs.items() for terme, poids in vecteur.items()
+        ], batch_size=1000)
+        remplacer(listes)
+        transaction.on_commit(lambda: cache.set(CLE_DOCUMENTS, len(articles), reglage('DUREE_DOCUMENTS', 3600)))
+    return len(articles)
+
+
+def similaires(article_id, publics=True):
+    """Voisins d'un article en une lecture indexée ; ``publics`` : seulement entre articles publiés."""
+    lignes = ArticleSimilaire.objects.filter(article_id=article_id)
+    if publics:
+        lignes = lignes.filter(article__statut='published', similaire__statut='published')
+    return [
+        {'id': pk, 'titre': titre, 'slug': slug, 'score': score}
+        for pk, titre, slug, score in lignes.order_by('rang').values_list(
+            'similaire_id', 'similaire__titre', 'similaire__slug', 'score',
+        )
+    ]
@@ -0,0 +1,91 @@
+"""
+Attribution de slugs uniques pour ``Article`` et ``Categorie``.
+
+Le prochain suffixe libre est trouvé en une seule requête d'agrégat sur
+l'index unique du slug : ``base`` et ``base-N`` sont exactement les slugs de
+l'intervalle ``[base, base + '.')`` puisque ``'.'`` suit ``'-'`` en ASCII et
+qu'un slug ne contient que ``[a-z0-9_-]``. Au lieu de vérifier au préalable,
+on tente l'INSERT et on recommence sur ``IntegrityError`` si une sauvegarde
+concurrente a pris le même slug.
+"""
+import re
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+TENTATIVES = 5
+
+
+def slugs_de_base(model, base, using=None):
+    manager = model._default_manager
+    if using:
+        manager = manager.db_manager(using)
+    return manager.filter(slug__gte=base, slug__lt=base + '.')
+
+
+def prochain_slug(model, base, using=None):
+    stats = slugs_de_base(model, base, using).aggregate(
+        pris=Count('pk', filter=Q(slug=base)),
+        suffixe=Max(
+            Cast(Substr('slug', len(base) + 2), IntegerField()),
+            filter=Q(slug__regex=r'^%s-[0-9]+$' % re.escape(base)),
+        ),
+    )
+    if not stats['pris']:
+        return base
+    return f"{base}-{(stats['suffixe'] or 0) + 1}"
+
+
+def enregistrer_avec_slug(instance, source, longueur, save, *args, **kwargs):
+    """
+    Attribue un slug libre dérivé de ``source`` (tronqué à ``longueur``) puis
+    appelle ``save(*args, **kwargs)``, en réessayant si le slug est pris entre-temps.
+    """
+    model = type(instance)
+    using = kwargs.get('using') or router.db_for_write(model, instance=instance)
+    base = slugify(source)[:longueur]
+    for tentative in range(TENTATIVES):
+        instance.slug = prochain_slug(model, base, using)
+        try:
+            with transaction.atomic(using=using):
+                return save(*args, **kwargs)
+        except IntegrityError:
+            deja_pris = slugs_de_base(model, base, using).filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not deja_pris or tentative == TENTATIVES - 1:
+                raise
+
+
+def allouer_slugs(model, sources, longueur, using=None, reserves=()):
+    """
+    Version groupée pour les imports : un slug libre par source, en une seule
+    requête pour tout le lot (les doublons à l'intérieur du lot sont suffixés).
+    ``reserves`` : slugs pas encore en base mais déjà pris par le lot.
+    """
+    bases = [slugify(source)[:longueur] for source in sources]
+    distinctes = set(bases)
+    if not distinctes:
+        return []
+    condition = Q()
+    for base in distinctes:
+        condition |= Q(slug__gte=base, slug__lt=base + '.')
+    manager = model._default_manager.db_manager(using) if using else model._default_manager
+    existants = set(manager.filter(condition).values_list('slug', flat=True)) | set(reserves)
+
+    prochains = {}
+    for base in distinctes:
+        motif = re.compile(r'^%s-([0-9]+)$' % re.escape(base))
+        suffixes = [int(m.group(1)) for m in map(motif.match, existants) if m]
+        prochains[base] = None if base not in existants else max(suffixes, default=0) + 1
+
+    slugs = []
+    for base in bases:
+        suffixe = prochains[base]
+        if suffixe is None:
+            slugs.append(base)
+            prochains[base] = 1
+        else:
+            slugs.append(f"{base}-{suffixe}")
+            prochains[base] = suffixe + 1
+    return slugs
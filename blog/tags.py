@@ -0,0 +1,65 @@
+"""
+Tags des articles : filtres et facettes de la liste.
+
+* ``?tags=a,b`` : articles portant tous ces tags (ET) ; ``?tags__in=a,b`` :
+  au moins un (OU). Les deux se lisent dans la table de liaison
+  (``ArticleTag``, index ``(tag, article)``) par une sous-requête
+  ``id IN (...)`` : pas de jointure sur la liste, donc pas de doublons ni de
+  ``DISTINCT``. Le ET est un ``GROUP BY article HAVING COUNT = n``.
+* ``?facettes=1`` : nombre d'articles du résultat courant (filtres compris)
+  par tag et par catégorie, en une requête (deux GROUP BY réunis par
+  ``UNION ALL``), ajouté à la réponse sous ``facettes``.
+"""
+from django.db.models import Count, F, Value
+from rest_framework import filters
+
+from .models import ArticleTag
+
+PARAMETRES = ('tags', 'tags__in', 'facettes')
+
+
+def slugs(valeur):
+    return sorted({slug.strip() for slug in (valeur or '').split(',') if slug.strip()})
+
+
+def avec_tous(slugs_tags):
+    return ArticleTag.objects.filter(tag__slug__in=slugs_tags).values('article_id').annotate(
+        nb=Count('tag_id'),
+    ).filter(nb=len(slugs_tags)).values('article_id')
+
+
+def avec_un(slugs_tags):
+    return ArticleTag.objects.filter(tag__slug__in=slugs_tags).values('article_id')
+
+
+class TagFilter(filters.BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        if tous := slugs(request.query_params.get('tags')):
+            queryset = queryset.filter(pk__in=avec_tous(tous))
+        if un := slugs(request.query_params.get('tags__in')):
+            queryset = queryset.filter(pk__in=avec_un(un))
+        return queryset
+
+
+def demandees(request):
+    return request.query_params.get('facettes', '').lower() in ('1', 'true', 'oui')
+
+
+def facettes(queryset):
+    """{'tags': [...], 'categories': [...]} : {slug, nom, nb} par nombre décroissant puis nom."""
+    ids = queryset.order_by().values('pk')
+    par_tag = ArticleTag.objects.filter(article_id__in=ids).order_by().values('tag_id').annotate(
+        type=Value('tags'), slug=F('tag__slug'), nom=F('tag__nom'), nb=Count('article_id'),
+    ).values_list('type', 'slug', 'nom', 'nb')
+    par_categorie = queryset.model.objects.filter(pk__in=ids, categorie__isnull=False).order_by().values(
+        'categorie_id',
+    ).annotate(
+        type=Value('categories'), cle=F('categorie__slug'), libelle=F('categorie__nom'), nb=Count('id'),
+    ).values_list('type', 'cle', 'libelle', 'nb')
+
+    resultat = {'tags': [], 'categories': []}
+    for type_, slug, nom, nb in par_tag.union(par_categorie, all=True):
+        resultat[type_].append({'slug': slug, 'nom': nom, 'nb': nb})
+    for liste in resultat.values():
+        liste.sort(key=lambda facette: (-facette['nb'], facette['nom']))
+    return resultat
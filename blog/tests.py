@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import smtplib
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, models, router, transaction
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend.instrumentation import Mesure, statistiques
+from backend.routeurs import COOKIE, EpinglagePrimaireMiddleware
+
+from . import (
+    benchmark, compteurs, diffusion, flux, images, moderation, newsletter, popularite, publication, similarite, slugs,
+    tags,
+)
+from .models import AbonnementNewsletter, Categorie, Article, ArticlePublie, Commentaire, EnvoiNewsletter, SeauLimitation, Tag
+from .serializers import (
+    ArticleListSerializer, CommentaireSerializer,
+    ArticleListFastSerializer, CommentaireFastSerializer,
+)
+from .arbre_commentaires import get_arbre
+from .cache_reponses import cle_slug
+from .slugs import allouer_slugs
+from .throttling import SEAUX, SeauCache, maintenant_ms, seau
+from .transfert import importer
+
+User = get_user_model()
+
+
+class FastSerializerTests(TestCase):
+    """Les serializers rapides doivent rendre exactement le même JSON que les serializers DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        auteur = User.objects.create_user('redaction', first_name='Équipe')
+        categorie = Categorie.objects.create(nom='Communication')
+        cls.articles = [
+            Article.objects.create(titre='Court', contenu='Un contenu court.', statut='published',
+                                   categorie=categorie, auteur=auteur),
+            Article.objects.create(titre='Pile 300', contenu='é' * 300, statut='published', categorie=categorie),
+            Article.objects.create(titre='Long', contenu='Écoute active, ' * 40, statut='draft',
+                                   auteur=auteur, image='articles/ecoute.jpg'),
+            Article.objects.create(titre='Sans rien', contenu='', meta_description='SEO', mots_cles='a, b'),
+        ]
+        racine = Commentaire.objects.create(article=cls.articles[0], auteur='Léa', contenu='Merci !', valide=True)
+        Commentaire.objects.create(article=cls.articles[0], auteur='Tom', auteur_user=auteur,
+                                   contenu='Réponse', valide=True, parent=racine)
+        Commentaire.objects.create(article=cls.articles[1], auteur='Spam', contenu='http://spam')
+
+    def setUp(self):
+        cache.clear()
+
+    def rendre(self, data):
+        return JSONRenderer().render(data)
+
+    def test_article_liste_identique(self):
+        queryset = Article.objects.select_related('categorie', 'auteur').order_by('id')
+        for context in ({}, {'request': RequestFactory().get('/api/articles/')}):
+            with self.subTest(context=bool(context)):
+                attendu = ArticleListSerializer(queryset, many=True, context=context).data
+                rapide = ArticleListFastSerializer(ArticleListFastSerializer.preparer(queryset), context).data
+                self.assertEqual(self.rendre(rapide), self.rendre(attendu))
+
+    def test_extrait_calcule_en_sql(self):
+        lignes = ArticleListFastSerializer.preparer(Article.objects.order_by('id'))
+        self.assertNotIn('contenu', lignes.query.values_select)
+        self.assertEqual(lignes[2]['extrait_debut'], self.articles[2].contenu[:300])
+
+    def test_commentaire_identique(self):
+        queryset = Commentaire.objects.order_by('id')
+        attendu = CommentaireSerializer(queryset, many=True).data
+        rapide = CommentaireFastSerializer(CommentaireFastSerializer.preparer(queryset)).data
+        self.assertEqual(self.rendre(rapide), self.rendre(attendu))
+
+    def test_endpoint_liste_identique(self):
+        reponse = self.client.get('/api/articles/')
+        queryset = Article.objects.filter(statut='published').select_related('categorie', 'auteur')
+        attendu = ArticleListSerializer(
+            queryset, many=True, context={'request': reponse.wsgi_request},
+        ).data
+        self.assertEqual(self.rendre(reponse.json()['results']), self.rendre(attendu))
+
+    def test_endpoint_liste_sans_requete_par_ligne(self):
+        with self.assertNumQueries(3):  # validateurs ETag + COUNT(*) + page
+            self.client.get('/api/articles/')
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get('/api/commentaires/', {'cursor': ''})
+
+
+class ArbreCommentairesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(titre='Débattre', contenu='...', statut='published')
+
+    def commenter(self, auteur, parent=None, valide=True):
+        return Commentaire.objects.create(article=self.article, auteur=auteur, contenu=f'Avis de {auteur}',
+                                          parent=parent, valide=valide)
+
+    def plan(self, noeuds):
+        return [(noeud['auteur'], self.plan(noeud['reponses'])) for noeud in noeuds]
+
+    def test_imbrication_et_ordre(self):
+        ana = self.commenter('Ana')
+        self.commenter('Bo', parent=ana)
+        cleo = self.commenter('Cléo', parent=ana)
+        self.commenter('Dan', parent=cleo)
+        masque = self.commenter('Eve', valide=False)
+        self.commenter('Fil', parent=masque)  # parent non validé : invisible
+        self.commenter('Gus')
+        self.assertEqual(self.plan(get_arbre(self.article.pk)), [
+            ('Gus', []),
+            ('Ana', [('Cléo', [('Dan', [])]), ('Bo', [])]),  # du plus récent au plus ancien, à chaque niveau
+        ])
+
+    def test_lecture_en_cache_et_invalidation(self):
+        ana = self.commenter('Ana')
+        get_arbre(self.article.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.plan(get_arbre(self.article.pk)), [('Ana', [])])
+
+        bo = self.commenter('Bo', parent=ana)  # création
+        self.assertEqual(self.plan(get_arbre(self.article.pk)), [('Ana', [('Bo', [])])])
+
+        attente = self.commenter('Cléo', valide=False)
+        self.assertEqual(len(get_arbre(self.article.pk)), 1)
+        compteurs.valider_commentaires(Commentaire.objects.filter(pk=attente.pk))  # validation
+        self.assertEqual(self.plan(get_arbre(self.article.pk)), [('Cléo', []), ('Ana', [('Bo', [])])])
+
+        bo.delete()  # suppression
+        self.assertEqual(self.plan(get_arbre(self.article.pk)), [('Cléo', []), ('Ana', [])])
+
+    def test_actions_admin(self):
+        attente = self.commenter('Ana', valide=False)
+        get_arbre(self.article.pk)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemple.org', 'x'))
+        url = '/admin/blog/commentaire/'
+        self.client.post(url, {'action': 'valider_commentaires', '_selected_action': [attente.pk]})
+        self.assertEqual(self.plan(get_arbre(self.article.pk)), [('Ana', [])])
+        self.client.post(url, {'action': 'rejeter_commentaires', '_selected_action': [attente.pk]})
+        self.assertEqual(get_arbre(self.article.pk), [])
+
+
+class SlugsTests(TestCase):
+
+    def test_doublons_suffixes(self):
+        Article.objects.create(titre='Écoute active', contenu='...')  # même préfixe, autre base
+        obtenus = [Article.objects.create(titre='Écoute', contenu='...').slug for _ in range(3)]
+        self.assertEqual(obtenus, ['ecoute', 'ecoute-1', 'ecoute-2'])
+        Article.objects.create(titre='Écoute', slug='ecoute-9', contenu='...')
+        self.assertEqual(Article.objects.create(titre='Écoute', contenu='...').slug, 'ecoute-10')  # numérique
+        self.assertEqual(allouer_slugs(Article, ['Écoute', 'Écoute', 'Inédit', 'Inédit'], 280),
+                         ['ecoute-11', 'ecoute-12', 'inedit', 'inedit-1'])
+
+    def test_course_reessaie_avec_le_suivant(self):
+        Article.objects.create(titre='Écoute', contenu='...')
+        prochain = slugs.prochain_slug
+        perimes = iter(['ecoute'])  # calculé avant l'INSERT concurrent qui a pris « ecoute »
+
+        def prochain_concurrent(model, base, using=None):
+            return next(perimes, None) or prochain(model, base, using)
+
+        with mock.patch.object(slugs, 'prochain_slug', side_effect=prochain_concurrent) as appels:
+            article = Article.objects.create(titre='Écoute', contenu='...')
+        self.assertEqual((article.slug, appels.call_count), ('ecoute-1', 2))
+
+        with mock.patch.object(slugs, 'prochain_slug', return_value='ecoute'), self.assertRaises(IntegrityError):
+            Article.objects.create(titre='Écoute', contenu='...')  # abandon après TENTATIVES
+
+
+class CurseurTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.articles = [Article.objects.create(titre=f'Négocier {i}', contenu='...', statut='published')
+                        for i in range(12)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_curseur_suit_le_tri_demande(self):
+        page = self.client.get('/api/articles/', {'ordering': 'date_creation', 'cursor': ''}).json()
+        suite = self.client.get(page['next']).json()
+        self.assertEqual([a['id'] for a in page['results'] + suite['results']], [a.pk for a in self.articles])
+        self.assertIsNone(suite['next'])
+        precedente = self.client.get(suite['previous']).json()
+        self.assertEqual(precedente['results'], page['results'])
+
+    def test_tri_incompatible_400(self):
+        for params in ({'ordering': '-vues'}, {'search': 'négocier'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/articles/', {**params, 'cursor': ''}).status_code, 400)
+                self.assertEqual(self.client.get('/api/articles/', params).status_code, 200)
+
+
+class ConditionnelTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(titre='Écoute', contenu='...', statut='published')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('editrice', is_staff=True))
+
+    def test_304_puis_invalidation_apres_ecriture(self):
+        for url in (f'/api/articles/{self.article.pk}/', f'/api/articles/{self.article.slug}/by-slug/',
+                    '/api/articles/'):
+            with self.subTest(url=url):
+                cache.clear()
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+                Commentaire.objects.create(article=self.article, auteur='Léa', contenu='Merci', valide=True)
+                reponse = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(reponse.status_code, 200)
+                self.assertNotEqual(reponse['ETag'], etag)
+                etag = reponse['ETag']
+
+                modifie = self.client.patch(f'/api/articles/{self.article.pk}/', {'titre': f'Écoute {url}'})
+                self.assertEqual(modifie.status_code, 200)
+                reponse = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(reponse.status_code, 200)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=reponse['ETag']).status_code, 304)
+
+    def test_if_modified_since(self):
+        url = f'/api/articles/{self.article.pk}/'
+        depuis = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=depuis).status_code, 304)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=5)):
+            self.article.save()  # Last-Modified à la seconde près
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=depuis).status_code, 200)
+
+
+class CacheReponsesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(titre='Écoute', contenu='...', statut='published')
+
+    def test_hit_puis_miss_apres_article_ou_commentaire(self):
+        url = f'/api/articles/{self.article.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['titre'], 'Écoute')
+
+        Commentaire.objects.create(article=self.article, auteur='Léa', contenu='Merci', valide=True)
+        with CaptureQueriesContext(connection) as requetes:
+            self.client.get(url)
+        self.assertTrue(requetes.captured_queries)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.article.titre = 'Écoute active'
+        self.article.save()
+        self.assertEqual(self.client.get(url).json()['titre'], 'Écoute active')
+        self.client.get('/api/articles/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/articles/')
+        Article.objects.create(titre='Nouveau', contenu='...', statut='published')
+        self.assertEqual(self.client.get('/api/articles/').json()['count'], 2)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'miroir.exemple'])
+    def test_cle_par_hote_et_schema(self):
+        for i in range(12):
+            Article.objects.create(titre=f'Page {i}', contenu='...', statut='published')
+        self.assertTrue(self.client.get('/api/articles/').json()['next'].startswith('http://testserver/'))
+        suivant = self.client.get('/api/articles/', HTTP_HOST='miroir.exemple').json()['next']
+        self.assertTrue(suivant.startswith('http://miroir.exemple/'))
+        self.assertTrue(self.client.get('/api/articles/', secure=True).json()['next'].startswith('https://'))
+
+    def test_slug_repris_par_un_autre_article(self):
+        ancien = self.article.slug
+        self.client.get(f'/api/articles/{ancien}/by-slug/')
+        self.assertEqual(cache.get(cle_slug(ancien)), self.article.pk)
+        self.article.slug = 'ecoute-renommee'
+        self.article.save()
+        self.assertIsNone(cache.get(cle_slug(ancien)))
+
+        repreneur = Article.objects.create(titre='Autre', slug=ancien, contenu='...', statut='published')
+        self.assertEqual(self.client.get(f'/api/articles/{ancien}/by-slug/').json()['id'], repreneur.pk)
+        repreneur.titre = 'Autre, corrigé'
+        repreneur.save()
+        self.assertEqual(self.client.get(f'/api/articles/{ancien}/by-slug/').json()['titre'], 'Autre, corrigé')
+
+
+class RechercheTests(TestCase):
+
+    def test_triggers_fts_survivent_aux_migrations(self):
+        # les migrations qui reconstruisent blog_article suppriment les triggers FTS5
+        Article.objects.create(titre='Écoute active', contenu='Communication bienveillante', statut='published')
+        reponse = self.client.get('/api/articles/', {'search': 'communication'})
+        self.assertEqual([a['titre'] for a in reponse.json()['results']], ['Écoute active'])
+
+    def test_recherche_combinee_aux_filtres(self):
+        # le classement se fait dans la requête filtrée, pas sur une présélection globale
+        categorie = Categorie.objects.create(nom='Leadership')
+        Article.objects.bulk_create([
+            Article(titre=f'Note {i}', slug=f'note-{i}', contenu='communication ' * 5, statut='published')
+            for i in range(1100)  # plus que l'ancien plafond de 1000 résultats
+        ], batch_size=500)
+        cible = Article.objects.create(titre='Déléguer', contenu='Une communication claire.', statut='published',
+                                       categorie=categorie)
+        Article.objects.create(titre='Communication', contenu='communication', statut='published',
+                               categorie=categorie)
+        Article.objects.create(titre='Brouillon', contenu='communication', categorie=categorie)
+
+        reponse = self.client.get('/api/articles/', {'search': 'communication', 'categorie__slug': categorie.slug})
+        self.assertEqual(reponse.json()['count'], 2)
+        self.assertEqual([a['titre'] for a in reponse.json()['results']], ['Communication', cible.titre])
+
+    def test_bm25_lu_sur_la_jointure(self):
+        Article.objects.create(titre='Écoute active', contenu='Communication bienveillante', statut='published')
+        with CaptureQueriesContext(connection) as requetes:
+            self.client.get('/api/articles/', {'search': 'communication'})
+        recherches = [q['sql'] for q in requetes if 'MATCH' in q['sql']]
+        self.assertEqual(len(recherches), 3)  # validateurs ETag + COUNT(*) + page
+        for sql in recherches:
+            self.assertEqual(sql.count('MATCH'), 1)  # ni IN (SELECT rowid ...) ni sous-requête bm25 par ligne
+        self.assertIn('bm25(blog_article_fts)', recherches[-1])
+
+
+class BenchmarkTests(TestCase):
+    """Le nombre de requêtes de chaque endpoint ne croît pas avec N et respecte la référence."""
+
+    def test_requetes_constantes(self):
+        benchmark.generer_donnees(articles=5, commentaires=2, reponses=1, utilisateurs=3, skills=3)
+        petit = benchmark.mesurer(repetitions=1)
+        benchmark.generer_donnees(articles=20, commentaires=2, reponses=1, utilisateurs=3, skills=3)
+        grand = benchmark.mesurer(repetitions=1)
+        self.assertEqual(benchmark.comparer(petit, grand, benchmark.charger_baseline()), [])
+
+
+class FormulairesTests(TestCase):
+
+    def test_formulaire_article(self):
+        from .forms import ArticleForm  # le module doit s'importer : champs alignés sur les modèles
+        tag = Tag.objects.create(nom='écoute')
+        categorie = Categorie.objects.create(nom='Communication')
+        formulaire = ArticleForm(data={
+            'titre': 'Écoute active au travail', 'contenu': 'Reformuler. ' * 20, 'statut': 'published',
+            'categorie': categorie.pk,
+            'tags': [tag.pk], 'mots_cles': 'écoute',
+        })
+        self.assertTrue(formulaire.is_valid(), formulaire.errors)
+        article = formulaire.save()
+        self.assertEqual((list(article.tags.all()), article.slug), ([tag], 'ecoute-active-au-travail'))
+        self.assertIsNotNone(article.date_publication)
+
+
+class InstrumentationTests(TestCase):
+
+    def test_server_timing_et_statistiques(self):
+        statistiques.reinitialiser()
+        Article.objects.create(titre='Mesuré', contenu='...', statut='published')
+        reponse = self.client.get('/api/articles/')
+        self.assertIn('sql;dur=', reponse['Server-Timing'])
+        self.assertIn('serialisation;dur=', reponse['Server-Timing'])
+
+        self.assertEqual(self.client.get('/api/instrumentation/').status_code, 403)
+        admin = User.objects.create_superuser('admin', password='x')
+        self.client.force_login(admin)
+        stats = self.client.get('/api/instrumentation/').json()['endpoints']
+        self.assertEqual(stats['GET article-list']['appels'], 1)
+        self.assertEqual(stats['GET article-list']['requetes_sql_moyen'], 3)
+
+    def test_detection_n_plus_un(self):
+        mesure = Mesure()
+        for pk in (1, 2, 3):
+            mesure(lambda *args: None, f'SELECT * FROM blog_article WHERE id = {pk}', None, False, {})
+        mesure(lambda *args: None, 'SELECT * FROM t WHERE id IN (%s, %s)', None, False, {})
+        self.assertTrue(mesure.n_plus_un())
+        self.assertEqual(mesure.doublons(), [('SELECT * FROM blog_article WHERE id = ?', 3)])
+
+
+class ModerationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.article = Article.objects.create(titre='Écoute', contenu='...', statut='published')
+        Commentaire.objects.bulk_create(
+            [Commentaire(article=cls.article, auteur='Lecteur', contenu=f"Article très clair sur l'écoute, merci {i}",
+                         valide=True, statut_moderation='valide') for i in range(25)]
+            + [Commentaire(article=cls.article, auteur='Bot', contenu=f"Casino gratuit bonus {i} http://x.example",
+                           statut_moderation='spam') for i in range(25)]
+        )
+
+    def test_post_est_un_seul_insert(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('lea'))
+        with self.assertNumQueries(4):  # article (validation) + SAVEPOINT + INSERT + RELEASE
+            reponse = client.post('/api/commentaires/', {
+                'article': self.article.pk, 'auteur': 'Léa', 'contenu': 'Merci pour cet article clair',
+            })
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(Commentaire.objects.get(pk=reponse.json()['id']).statut_moderation, 'attente')
+
+    def test_traiter_lot(self):
+        ham = Commentaire.objects.create(article=self.article, auteur='Léa', contenu="Merci, l'article est très clair")
+        spams = [
+            Commentaire.objects.create(article=self.article, auteur='Bot',
+                                       contenu="Casino gratuit bonus http://a.example http://b.example")
+            for _ in range(2)
+        ]
+        douteux = Commentaire.objects.create(article=self.article, auteur='Max', contenu='Voir www.exemple.fr')
+
+        self.assertEqual(moderation.traiter_lot(), {'valide': 1, 'incertain': 1, 'spam': 2})
+        self.assertEqual(moderation.traiter_lot(), {'valide': 0, 'incertain': 0, 'spam': 0})
+        ham.refresh_from_db()
+        self.assertTrue(ham.valide)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).nb_commentaires_valides, 1)  # bulk_create : hors compteurs
+        self.assertEqual({c.statut_moderation for c in Commentaire.objects.filter(pk__in=[s.pk for s in spams])},
+                         {'spam'})
+        douteux.refresh_from_db()
+        self.assertEqual((douteux.statut_moderation, douteux.valide), ('incertain', False))
+        self.assertEqual(
+            dict(Commentaire.objects.filter(pk__in=[ham.pk, douteux.pk, *[c.pk for c in spams]])
+                 .values_list('pk', 'moderation_auto')),
+            {ham.pk: True, douteux.pk: True, spams[0].pk: True, spams[1].pk: True},
+        )
+        compteurs.valider_commentaires(Commentaire.objects.filter(pk=douteux.pk))  # décision d'un modérateur
+        self.assertFalse(Commentaire.objects.get(pk=douteux.pk).moderation_auto)
+
+    def test_entrainement_sur_etiquettes_humaines(self):
+        Commentaire.objects.bulk_create([
+            Commentaire(article=self.article, auteur='Lecteur', contenu=f'Zorglub approuvé {i}', valide=True,
+                        statut_moderation='valide', moderation_auto=True) for i in range(30)
+        ])
+        modele = moderation.ModeleBayes.depuis_base(2000)
+        self.assertTrue(modele.actif)
+        self.assertNotIn('zorglub', modele.poids)
+        self.assertIn('casino', modele.poids)
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(titre='Limité', contenu='...', statut='published')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('rafale'))
+
+    def poster(self):
+        return self.client.post('/api/commentaires/', {'article': self.article.pk, 'auteur': 'Bot', 'contenu': 'Encore un message'})
+
+    def test_seau_ip_429_sans_requete(self):
+        for mode in ('cache', 'local'):
+            with self.subTest(mode=mode), self.settings(BLOG_THROTTLE_MODE=mode):
+                SEAUX['local'].tat.clear()
+                for _ in range(5):
+                    self.assertEqual(self.poster().status_code, 201)
+                with self.assertNumQueries(0):
+                    reponse = self.poster()
+                self.assertEqual(reponse.status_code, 429)
+                self.assertIn('Retry-After', reponse)
+                cache.clear()
+                self.assertEqual(self.client.get('/api/commentaires/').status_code, 200)
+
+    def test_seau_se_recharge(self):
+        seau = SeauCache()
+        self.assertIsNone(seau.consommer('test', 2, 60))
+        self.assertIsNone(seau.consommer('test', 2, 60))
+        self.assertAlmostEqual(seau.consommer('test', 2, 60), 30, delta=1)
+        with mock.patch('blog.throttling.maintenant_ms', return_value=maintenant_ms() + 31_000):
+            self.assertIsNone(seau.consommer('test', 2, 60))
+
+    def test_refus_sans_jeton_pris_aux_seaux_suivants(self):
+        for _ in range(5):
+            self.assertEqual(self.poster().status_code, 201)
+        with mock.patch.object(SeauCache, 'consommer', autospec=True, side_effect=SeauCache.consommer) as pris:
+            self.assertEqual(self.poster().status_code, 429)
+        self.assertEqual([appel.args[1].split(':')[1] for appel in pris.call_args_list], ['ip'])
+
+    def test_cache_fichier_seaux_locaux(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        fichier = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                               'LOCATION': dossier.name}}
+        with self.settings(CACHES=fichier):
+            SEAUX['local'].tat.clear()
+            self.assertIs(seau(), SEAUX['local'])
+            for _ in range(5):
+                self.assertEqual(self.poster().status_code, 201)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.poster().status_code, 429)
+        self.assertIs(seau(), SEAUX['cache'])
+        with self.settings(BLOG_THROTTLE_MODE='base'):
+            self.assertIs(seau(), SEAUX['base'])
+
+        base = SEAUX['base']
+        self.assertIsNone(base.consommer('test', 2, 60))
+        self.assertIsNone(base.consommer('test', 2, 60))
+        with self.assertNumQueries(2):  # UPDATE refusé (0 ligne), puis lecture de tat
+            self.assertAlmostEqual(base.consommer('test', 2, 60), 30, delta=1)
+        self.assertEqual(SeauLimitation.objects.filter(cle='test').count(), 1)
+        with mock.patch('blog.throttling.maintenant_ms', return_value=maintenant_ms() + 31_000):
+            with self.assertNumQueries(1):
+                self.assertIsNone(base.consommer('test', 2, 60))
+
+
+class VerrouSQLiteTests(TestCase):
+
+    def test_reessai_sur_base_verrouillee(self):
+        article = Article.objects.create(titre='Verrou', contenu='...')
+        commentaire = Commentaire(article=article, auteur='Léa', contenu='Rejoué après verrou')
+        save = models.Model.save
+        erreurs = iter([OperationalError('database is locked')] * 2)
+
+        def save_verrouille(instance, *args, **kwargs):
+            erreur = next(erreurs, None)
+            if erreur:
+                raise erreur
+            return save(instance, *args, **kwargs)
+
+        with mock.patch.object(models.Model, 'save', save_verrouille), \
+                mock.patch('blog.verrous.connections') as connections, mock.patch('time.sleep') as sleep:
+            connections.__getitem__.return_value.vendor = 'sqlite'
+            connections.__getitem__.return_value.in_atomic_block = False
+            commentaire.save()
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(Commentaire.objects.filter(contenu='Rejoué après verrou').exists())
+
+
+@override_settings(BLOG_SQLITE_ATTENTE=0.05)
+class VerrouConcurrentTests(TransactionTestCase):
+    """Un autre écrivain tient vraiment le verrou : l'écriture attend puis passe."""
+
+    def ecrivain_bloquant(self, duree):
+        pret, fin = threading.Event(), threading.Event()
+
+        def tenir():
+            try:
+                with transaction.atomic():
+                    Article.objects.create(titre='Tient le verrou', contenu='...')
+                    pret.set()
+                    fin.wait(duree)
+            finally:
+                connection.close()
+
+        fil = threading.Thread(target=tenir)
+        fil.start()
+        pret.wait(5)
+        return fil
+
+    def test_reessai_sous_contention(self):
+        fil = self.ecrivain_bloquant(0.2)
+        with mock.patch('blog.verrous.time.sleep', wraps=time.sleep) as sleep:
+            Article.objects.create(titre='Après le verrou', contenu='...')
+        fil.join()
+        self.assertGreaterEqual(sleep.call_count, 1)
+        self.assertEqual(Article.objects.count(), 2)
+
+    @override_settings(BLOG_SQLITE_TENTATIVES=1)
+    def test_sans_reessai_erreur_de_verrou(self):
+        fil = self.ecrivain_bloquant(0.2)
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            Article.objects.create(titre='Trop tôt', contenu='...')
+        fil.join()
+
+
+@override_settings(BLOG_REPLIQUES=['replique_1'])
+class RouteurRepliquesTests(SimpleTestCase):
+
+    def passer(self, requete, ecrire=False):
+        bases = []
+
+        def vue(request):
+            bases.append(router.db_for_read(Article))
+            if ecrire:
+                router.db_for_write(Article)
+                bases.append(router.db_for_read(Article))
+            return HttpResponse()
+
+        return EpinglagePrimaireMiddleware(vue)(requete), bases
+
+    def test_lecture_sur_replique(self):
+        reponse, bases = self.passer(RequestFactory().get('/api/articles/'))
+        self.assertEqual(bases, ['replique_1'])
+        self.assertNotIn(COOKIE, reponse.cookies)
+        self.assertEqual(router.db_for_read(Article), 'default')  # hors requête
+
+    def test_lire_ses_ecritures(self):
+        reponse, bases = self.passer(RequestFactory().get('/api/articles/'), ecrire=True)
+        self.assertEqual(bases, ['replique_1', 'default'])
+        self.assertIn(COOKIE, reponse.cookies)
+
+        requete = RequestFactory().get('/api/articles/')
+        requete.COOKIES[COOKIE] = '1'
+        self.assertEqual(self.passer(requete)[1], ['default'])
+
+        reponse, bases = self.passer(RequestFactory().post('/api/commentaires/'), ecrire=True)
+        self.assertEqual(bases, ['default', 'default'])
+        self.assertIn(COOKIE, reponse.cookies)
+
+
+class ImagesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = self.settings(MEDIA_ROOT=dossier.name, BLOG_IMAGES_LARGEURS=(320, 640, 1024))
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def png(self, largeur=800, hauteur=400):
+        sortie = io.BytesIO()
+        Image.new('RGB', (largeur, hauteur), (200, 80, 40)).save(sortie, 'PNG')
+        return ContentFile(sortie.getvalue())
+
+    def test_originaux_dedoublonnes_et_srcset(self):
+        a = Article.objects.create(titre='A', contenu='...', statut='published')
+        b = Article.objects.create(titre='B', contenu='...', statut='published')
+        a.image.save('photo.png', self.png())
+        b.image.save('autre-nom.png', self.png())
+        self.assertEqual(a.image.name, b.image.name)
+        self.assertEqual(len(os.listdir(os.path.join(settings.MEDIA_ROOT, 'articles'))), 1)
+
+        self.assertEqual(set(images.a_traiter()), {a, b})
+        for article in (a, b):
+            images.traiter(article)
+        self.assertFalse(images.a_traiter().exists())
+        a.refresh_from_db()
+        self.assertEqual(sorted(a.rendus['webp'], key=int), ['320', '640', '800'])  # pas d'agrandissement
+
+        reponse = self.client.get('/api/articles/')
+        srcset = reponse.json()['results'][0]['srcset']
+        self.assertRegex(srcset['webp'], r'^http://testserver/media/articles/rendus/\w+-320\.webp 320w, ')
+        attendu = ArticleListSerializer(
+            Article.objects.filter(statut='published'), many=True, context={'request': reponse.wsgi_request},
+        ).data
+        self.assertEqual(self.rendre_json(reponse.json()['results']), self.rendre_json(attendu))
+
+    def rendre_json(self, data):
+        return JSONRenderer().render(data)
+
+
+class VuesAsyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.generer_donnees(articles=12, commentaires=2, reponses=1, utilisateurs=2, skills=2)
+        Article.objects.create(titre='Brouillon', contenu='...', statut='draft')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_memes_reponses_que_les_viewsets(self):
+        paires = await sync_to_async(benchmark.paires_async)()
+        for nom, url_sync, url_async in paires:
+            with self.subTest(nom):
+                attendu = await sync_to_async(self.client.get)(url_sync)
+                reponse = await self.async_client.get(url_async)
+                self.assertEqual(reponse.status_code, 200)
+                # seuls les liens de pagination diffèrent (préfixe api/async/)
+                self.assertEqual(reponse.content.replace(b'/api/async/', b'/api/'), attendu.content)
+        self.assertEqual((await self.async_client.get('/api/async/articles/?page=9')).status_code, 404)
+
+    async def test_charge(self):
+        paires = (await sync_to_async(benchmark.paires_async)())[:2]
+        resultats = await benchmark.charge_asgi(paires, concurrence=4, requetes=8)
+        for variantes in resultats.values():
+            self.assertEqual([m['statuts'] for m in variantes.values()], [[200], [200]])
+
+
+class FluxPublicTests(TestCase):
+    """La liste publique lue dans ArticlePublie reste identique à celle lue dans Article."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.auteur = User.objects.create_user('plume')
+        cls.categorie = Categorie.objects.create(nom='Leadership')
+        cls.articles = [
+            Article.objects.create(titre=f'Article {i}', contenu='Déléguer, ' * (10 + 30 * i), statut='published',
+                                   categorie=cls.categorie if i % 2 else None, auteur=cls.auteur)
+            for i in range(4)
+        ]
+        Article.objects.create(titre='Brouillon', contenu='...', statut='draft')
+
+    def setUp(self):
+        cache.clear()
+
+    def comparer(self, params=None):
+        reponse = self.client.get('/api/articles/', params or {})
+        queryset = Article.objects.filter(statut='published').select_related('categorie', 'auteur')
+        if params and params.get('categorie__slug'):
+            queryset = queryset.filter(categorie__slug=params['categorie__slug'])
+        attendu = ArticleListSerializer(
+            queryset.order_by('-date_creation', '-id'), many=True, context={'request': reponse.wsgi_request},
+        ).data
+        self.assertEqual(JSONRenderer().render(reponse.json()['results']), JSONRenderer().render(attendu))
+        cache.clear()
+
+    def test_liste_sans_jointure(self):
+        with CaptureQueriesContext(connection) as requetes:
+            self.client.get('/api/articles/', {'categorie__slug': self.categorie.slug})
+        self.assertTrue(all('blog_articlepublie' in q['sql'] and 'JOIN' not in q['sql']
+                            for q in requetes.captured_queries))
+        self.comparer()
+        self.comparer({'categorie__slug': self.categorie.slug})
+
+    def test_mise_a_jour_incrementale(self):
+        premier, second = self.articles[:2]
+        premier.statut = 'draft'
+        premier.save()
+        second.titre = 'Renommé'
+        second.save()
+        self.categorie.nom = 'Management'
+        self.categorie.save()
+        self.auteur.username = 'plume2'
+        self.auteur.save()
+        commentaire = Commentaire.objects.create(article=second, auteur='Léa', contenu='Merci beaucoup')
+        compteurs.valider_commentaires(Commentaire.objects.filter(pk=commentaire.pk))
+        self.comparer()
+        self.assertEqual(flux.verifier(), [])
+
+        self.categorie.delete()
+        self.comparer()
+        self.assertEqual(flux.verifier(), [])
+
+
+@override_settings(BLOG_URL_PUBLIQUE='http://testserver')
+class PublicationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        popularite.tampon.prendre()
+
+    def test_publication_par_lot_prechauffee(self):
+        categorie = Categorie.objects.create(nom='Négociation')
+        maintenant = timezone.now()
+        echu = Article.objects.create(titre='Échu', contenu='...', statut='scheduled', categorie=categorie,
+                                      date_publication=maintenant - timedelta(minutes=1))
+        futur = Article.objects.create(titre='Futur', contenu='...', statut='scheduled',
+                                       date_publication=maintenant + timedelta(hours=1))
+        self.assertEqual(self.client.get('/api/articles/').json()['count'], 0)
+
+        with mock.patch.object(publication, 'prechauffer', wraps=publication.prechauffer) as prechauffer, \
+                mock.patch.object(publication, 'invalider', wraps=publication.invalider) as invalider, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(publication.publier_lot(), (1, 0, 0))  # préchauffage après la validation
+            prechauffer.assert_not_called()
+        prechauffer.assert_called_once_with([echu.pk])
+        self.assertEqual(popularite.tampon.lots, {})  # lectures internes : aucune vue comptée
+        self.assertIn('tags', invalider.call_args.args)
+        self.assertEqual(publication.prochaine_echeance(), futur.date_publication)
+        with self.assertNumQueries(0):
+            liste = self.client.get('/api/articles/')
+            self.client.get(f'/api/articles/?categorie__slug={categorie.slug}')
+            detail = self.client.get(f'/api/articles/{echu.pk}/')
+            self.client.get(f'/api/articles/{echu.slug}/by-slug/')
+        self.assertEqual([a['titre'] for a in liste.json()['results']], ['Échu'])
+        self.assertEqual(detail.json()['statut'], 'published')
+        self.assertEqual(publication.publier_lot(), (0, 0, 0))
+
+    def test_prechauffage_compte_hors_transaction(self):
+        Article.objects.create(titre='Échu', contenu='...', statut='scheduled',
+                               date_publication=timezone.now() - timedelta(minutes=1))
+        # sans transaction englobante (commande), on_commit s'exécute avant le retour
+        with mock.patch.object(transaction, 'on_commit', lambda rappel, using=None: rappel()):
+            self.assertEqual(publication.publier_lot(), (1, 3, 0))  # liste, détail, by-slug
+
+    def test_date_obligatoire_si_programme(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('editrice', is_staff=True))
+        reponse = client.post('/api/articles/', {'titre': 'Plus tard', 'contenu': '...', 'statut': 'scheduled'})
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn('date_publication', reponse.json())
+
+
+class DiffusionTests(TestCase):
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = self.settings(BLOG_DIFFUSION_RACINE=dossier.name, BLOG_SITEMAP_TAILLE=2,
+                                 BLOG_URL_PUBLIQUE='https://exemple.org')
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_generation_incrementale_et_get_conditionnel(self):
+        categorie = Categorie.objects.create(nom='Empathie')
+        articles = [
+            Article.objects.create(titre=f'Article {i}', contenu='...', statut='published', categorie=categorie)
+            for i in range(5)
+        ]
+        self.assertEqual(diffusion.generer(), {'ecrits': 3 + 1 + 4, 'supprimes': 0})  # tranches, index, flux
+        self.assertEqual(diffusion.generer(), {'ecrits': 0, 'supprimes': 0})
+
+        articles[0].titre = 'Modifié'
+        articles[0].save()
+        # une tranche, l'index, les flux de la catégorie et global
+        self.assertEqual(diffusion.generer(), {'ecrits': 1 + 1 + 4, 'supprimes': 0})
+
+        reponse = self.client.get('/sitemap.xml')
+        self.assertEqual(reponse.status_code, 200)
+        index = b''.join(reponse.streaming_content).decode()
+        self.assertIn('https://exemple.org/sitemaps/articles-0.xml', index)
+        self.assertEqual(self.client.get('/sitemap.xml', HTTP_IF_NONE_MATCH=reponse['ETag']).status_code, 304)
+        rss = self.client.get(f'/flux/{categorie.slug}.rss')
+        self.assertEqual(rss['Content-Type'], 'application/rss+xml; charset=utf-8')
+        self.assertIn('Modifié', b''.join(rss.streaming_content).decode())
+        self.assertEqual(self.client.get('/flux/inconnue.atom').status_code, 404)
+
+    def test_flux_global_distinct_d_une_categorie_articles(self):
+        categorie = Categorie.objects.create(nom='Articles')
+        Article.objects.create(titre='Rangé', contenu='...', statut='published', categorie=categorie)
+        Article.objects.create(titre='Sans catégorie', contenu='...', statut='published')
+        diffusion.generer()
+
+        propre = b''.join(self.client.get(f'/flux/{categorie.slug}.rss').streaming_content).decode()
+        tous = b''.join(self.client.get(f'/flux/{diffusion.FLUX_GLOBAL}.rss').streaming_content).decode()
+        self.assertNotIn('Sans catégorie', propre)
+        self.assertIn('Sans catégorie', tous)
+        self.assertIn('https://exemple.org/api/articles/range/by-slug/', tous)
+        self.assertEqual(self.client.get('/api/articles/range/by-slug/').status_code, 200)
+
+
+class SimilariteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_voisins_incrementaux_et_action_related(self):
+        ecoute = Article.objects.create(titre='Écoute active', statut='published', mots_cles='Écoute, empathie',
+                                        contenu="Reformuler, écouter sans interrompre, montrer de l'empathie.")
+        empathie = Article.objects.create(titre="L'empathie au travail", statut='published', mots_cles='empathie',
+                                          contenu="Écouter ses collègues avec empathie et reformuler.")
+        budget = Article.objects.create(titre='Budget annuel', statut='published', mots_cles='finance',
+                                        contenu="Tableaux, prévisions et trésorerie.")
+        self.assertEqual([v['id'] for v in similarite.similaires(ecoute.pk)], [empathie.pk])
+
+        budget.contenu = "Trésorerie, mais surtout écouter et reformuler avec empathie."
+        budget.save()
+        self.assertEqual({v['id'] for v in similarite.similaires(ecoute.pk)}, {empathie.pk, budget.pk})
+        empathie.statut = 'draft'
+        empathie.save()
+        with self.assertNumQueries(1):
+            reponse = self.client.get(f'/api/articles/{ecoute.pk}/related/')
+        self.assertEqual([v['slug'] for v in reponse.json()], [budget.slug])
+        self.assertEqual(self.client.get('/api/articles/999/related/').status_code, 404)
+
+        self.assertEqual(similarite.recalculer(), 2)
+        self.assertEqual([v['id'] for v in similarite.similaires(budget.pk)], [ecoute.pk])
+
+    def test_signal_borne(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(60):
+                Article.objects.create(titre=f'Conseil {i}', statut='published', contenu=f'Écouter et reformuler, étape{i}.')
+        self.assertEqual(similarite.nb_documents(), 60)
+        self.assertEqual(similarite.lourds({'ecouter': 0.5, 'etape3': 0.2}, {'ecouter': 60, 'etape3': 1}, 60), ['etape3'])
+
+        with self.settings(BLOG_SIMILAIRES_DF_MAX=1, BLOG_SIMILAIRES_POSTES=3), \
+                self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as requetes:
+            nouveau = Article.objects.create(titre='Conseil final', statut='published', contenu='Écouter et reformuler.')
+        self.assertFalse([q for q in requetes.captured_queries if 'COUNT(DISTINCT' in q['sql']])
+        with self.settings(BLOG_SIMILAIRES_POSTES=3):
+            self.assertEqual(len(similarite.scores(nouveau.pk, {'ecouter': 1.0}, ['ecouter'])), 3)  # pas 60
+        self.assertEqual(similarite.nb_documents(), 61)
+        nouveau.statut = 'draft'
+        with self.captureOnCommitCallbacks(execute=True):
+            nouveau.save()
+        self.assertEqual(similarite.nb_documents(), 60)
+
+
+class PopulariteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        popularite.tampon.prendre()
+
+    def test_vues_tamponnees_et_tris(self):
+        categorie = Categorie.objects.create(nom='Créativité')
+        lu = Article.objects.create(titre='Lu', contenu='...', statut='published', categorie=categorie)
+        aime = Article.objects.create(titre='Aimé', contenu='...', statut='published')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('lectrice'))
+
+        with self.assertNumQueries(0):
+            popularite.compter(lu.pk)
+        for _ in range(2):  # la seconde lecture vient du cache de réponses
+            self.assertEqual(self.client.get(f'/api/articles/{lu.pk}/').status_code, 200)
+        self.client.get(f'/api/articles/{lu.slug}/by-slug/')
+        self.assertEqual(client.post(f'/api/articles/{aime.pk}/like/').status_code, 202)
+        self.assertEqual(Article.objects.get(pk=lu.pk).vues, 0)
+
+        par_vues = self.client.get('/api/articles/', {'ordering': '-vues'}).json()['results']
+        self.assertEqual([a['id'] for a in par_vues], [aime.pk, lu.pk])  # départagés par id
+        with self.assertNumQueries(6):  # SELECT + UPDATE articles et catégories, dans un point de sauvegarde
+            self.assertEqual(popularite.vider(), 2)
+        lu.refresh_from_db()
+        self.assertEqual((lu.vues, lu.likes), (4, 0))
+        par_vues = self.client.get('/api/articles/', {'ordering': '-vues'}).json()['results']
+        self.assertEqual([a['id'] for a in par_vues], [lu.pk, aime.pk])
+        tendance = self.client.get('/api/articles/', {'ordering': 'trending'}).json()['results']
+        self.assertEqual([a['id'] for a in tendance], [aime.pk, lu.pk])  # un like pèse plus que 3 vues
+        self.assertGreater(Categorie.objects.get(pk=categorie.pk).score_tendance, 0)
+
+
+    def test_vidage_rate_remis_et_lots_lies_a_leur_base(self):
+        article = Article.objects.create(titre='Lu', contenu='...', statut='published')
+        popularite.compter(article.pk)
+        with mock.patch.object(popularite, 'ecrire', side_effect=ValueError('panne')), \
+                self.assertRaises(ValueError):
+            popularite.vider()
+        self.assertEqual(popularite.vider(), 1)  # incréments remis au tampon
+        self.assertEqual(Article.objects.get(pk=article.pk).vues, 1)
+
+        # compté sur une autre base installée sous le même alias (commande de benchmark)
+        popularite.tampon.ajouter(article.pk, 'vues', base=('default', 'jetable.sqlite3'))
+        self.assertEqual(popularite.vider(), 0)
+        self.assertEqual(Article.objects.get(pk=article.pk).vues, 1)
+
+        with self.settings(BLOG_POPULARITE_INTERVALLE=10), popularite.base_jetable():
+            popularite.compter(article.pk)
+            self.assertIsNone(popularite.tampon.fil)  # ni fil ni atexit
+        self.assertEqual(popularite.tampon.lots, {})
+
+    def test_boucle_journalise_les_erreurs(self):
+        with mock.patch.object(popularite, 'vider', side_effect=ValueError('panne')), \
+                mock.patch.object(popularite.time, 'sleep', side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('blog.popularite', 'ERROR') as journal, self.assertRaises(KeyboardInterrupt):
+            popularite.tampon.boucle(10)
+        self.assertIn('panne', journal.output[0])
+
+    def test_likes_dedoublonnes_et_limites_par_utilisateur(self):
+        articles = [Article.objects.create(titre=f'Aimé {i}', contenu='...', statut='published') for i in range(25)]
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('fan'))
+        for _ in range(3):
+            self.assertEqual(client.post(f'/api/articles/{articles[0].pk}/like/').status_code, 202)
+        autre = APIClient()
+        autre.force_authenticate(User.objects.create_user('autre'))
+        self.assertEqual(autre.post(f'/api/articles/{articles[0].pk}/like/').status_code, 202)
+        # 22 likes sur un même article : aucun seau par article
+        for i in range(20):
+            votant = APIClient()
+            votant.force_authenticate(User.objects.create_user(f'votant{i}'))
+            self.assertEqual(votant.post(f'/api/articles/{articles[0].pk}/like/').status_code, 202)
+        popularite.vider()
+        self.assertEqual(Article.objects.get(pk=articles[0].pk).likes, 22)
+
+        taux = {'DEFAULT_THROTTLE_RATES': {'likes_utilisateur': '3/min'}}
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, **taux}):
+            codes = [client.post(f'/api/articles/{a.pk}/like/').status_code for a in articles[1:5]]
+        self.assertEqual(codes, [202, 202, 429, 429])  # 5 requêtes de « fan » sur 3 jetons
+
+
+class TagsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reprise_des_mots_cles(self):
+        article = Article.objects.create(titre='Écoute', contenu='...', mots_cles='Écoute active, écoute  ACTIVE,Empathie')
+        Article.objects.create(titre='Vide', contenu='...')
+        importlib.import_module('blog.migrations.0011_tags').tags_depuis_mots_cles(apps, None)
+        self.assertEqual(list(Tag.objects.values_list('nom', 'slug')), [('empathie', 'empathie'), ('écoute active', 'ecoute-active')])
+        self.assertEqual(article.tags.count(), 2)
+
+    def test_filtres_et_facettes(self):
+        soft = Categorie.objects.create(nom='Soft skills')
+        ecoute, empathie, conflits = (Tag.objects.create(nom=nom) for nom in ('écoute', 'empathie', 'conflits'))
+        a = Article.objects.create(titre='A', contenu='...', statut='published', categorie=soft)
+        b = Article.objects.create(titre='B', contenu='...', statut='published')
+        c = Article.objects.create(titre='C', contenu='...', statut='published', categorie=soft)
+        Article.objects.create(titre='Brouillon', contenu='...', categorie=soft).tags.add(ecoute)
+        a.tags.add(ecoute, empathie)
+        b.tags.add(empathie)
+        c.tags.add(conflits)
+
+        def titres(**params):
+            return [r['titre'] for r in self.client.get('/api/articles/', params).json()['results']]
+
+        self.assertEqual(titres(tags='ecoute,empathie'), ['A'])
+        self.assertEqual(titres(tags__in='ecoute,conflits'), ['C', 'A'])
+        self.assertEqual(titres(tags='inconnu'), [])
+        self.assertEqual(titres(tags__in='empathie', categorie__slug=soft.slug), ['A'])
+
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get('/api/articles/', {'tags__in': 'empathie,conflits', 'facettes': '1'})
+        self.assertEqual(reponse.json()['facettes'], {
+            'tags': [{'slug': 'empathie', 'nom': 'empathie', 'nb': 2},
+                     {'slug': 'conflits', 'nom': 'conflits', 'nb': 1},
+                     {'slug': 'ecoute', 'nom': 'écoute', 'nb': 1}],
+            'categories': [{'slug': soft.slug, 'nom': 'Soft skills', 'nb': 2}],
+        })
+        self.assertEqual(sum('UNION ALL' in q['sql'] for q in requetes), 1)
+        self.assertEqual(len(requetes), 4)  # validateurs, count, page, facettes
+
+        detail = self.client.get(f'/api/articles/{a.pk}/').json()
+        self.assertEqual([t['slug'] for t in detail['tags']], ['empathie', 'ecoute'])  # ordre des noms
+        ecoute.nom = 'écoute active'
+        ecoute.save()
+        detail = self.client.get(f'/api/articles/{a.pk}/').json()
+        self.assertIn({'id': ecoute.pk, 'nom': 'écoute active', 'slug': 'ecoute'}, detail['tags'])
+
+    def test_ecriture_des_tags(self):
+        tag = Tag.objects.create(nom='feedback')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('autrice'))
+        reponse = client.post('/api/articles/', {'titre': 'Donner du feedback', 'contenu': '...', 'tags': ['feedback']},
+                              format='json')
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(list(Article.objects.get(titre='Donner du feedback').tags.all()), [tag])
+        reponse = client.post('/api/articles/', {'titre': 'X', 'contenu': '...', 'tags': ['absent']}, format='json')
+        self.assertEqual(reponse.status_code, 400)
+
+
+class NewsletterTests(TestCase):
+
+    def test_email_unique_a_la_casse(self):
+        abonne = AbonnementNewsletter.objects.create(email=' Alice@Exemple.org ')
+        self.assertEqual(abonne.email, 'alice@exemple.org')
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            AbonnementNewsletter.objects.bulk_create([AbonnementNewsletter(email='ALICE@exemple.org')])
+
+    def test_envoi_par_lots_avec_reprise(self):
+        Article.objects.create(titre='Écoute active', contenu='...', statut='published', meta_description='Reformuler')
+        abonnes = [
+            AbonnementNewsletter.objects.create(email=f'lecteur{i}@exemple.org', nom=nom)
+            for i, nom in enumerate(['Alice', '', '<b>Bob</b>', 'Chloé', 'Dan'])
+        ]
+        AbonnementNewsletter.objects.filter(pk=abonnes[3].pk).update(actif=False)
+        envoi = EnvoiNewsletter.objects.create(sujet='Numéro 1', introduction='Au sommaire :')
+
+        with mock.patch('blog.newsletter.get_connection', wraps=newsletter.get_connection) as connexion:
+            self.assertEqual(newsletter.envoyer(envoi, taille=1, limite=2), (2, 0))
+        connexion.assert_called_once()  # une connexion pour tous les lots
+        self.assertEqual(envoi.dernier_abonne, abonnes[1].pk)
+        premier = mail.outbox[0]
+        self.assertIn('Bonjour Alice,', premier.body)
+        self.assertIn('Écoute active', premier.body)
+        self.assertIn(abonnes[0].jeton, premier.extra_headers['List-Unsubscribe'])
+        self.assertTrue(mail.outbox[1].body.startswith('Bonjour,\n'))
+
+        # coupure au second message du lot : reprise après le dernier abonné servi
+        send_messages = locmem.EmailBackend.send_messages
+        def coupure(backend, messages):
+            if messages[0].to == ['lecteur4@exemple.org']:
+                raise smtplib.SMTPServerDisconnected()
+            return send_messages(backend, messages)
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', coupure), \
+                self.assertRaises(smtplib.SMTPServerDisconnected):
+            newsletter.envoyer(envoi)
+        self.assertIn('&lt;b&gt;Bob&lt;/b&gt;', mail.outbox[2].alternatives[0][0])
+        envoi.refresh_from_db()
+        self.assertEqual((envoi.dernier_abonne, envoi.nb_envoyes, envoi.date_fin), (abonnes[2].pk, 3, None))
+
+        def refus(backend, messages):
+            raise smtplib.SMTPRecipientsRefused({messages[0].to[0]: (550, b'Inconnu')})
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', refus):
+            call_command('envoyer_newsletter', stdout=io.StringIO())
+        envoi.refresh_from_db()
+        self.assertEqual((envoi.nb_envoyes, envoi.nb_echecs), (3, 1))
+        self.assertIsNotNone(envoi.date_fin)
+        self.assertEqual([m.to[0] for m in mail.outbox], [f'lecteur{i}@exemple.org' for i in range(3)])
+
+
+class TransfertTests(TestCase):
+
+    def jsonl(self, *lignes):
+        return [json.loads(json.dumps(ligne, cls=DjangoJSONEncoder)) for ligne in lignes]
+
+    def test_commentaires_ids_source_et_reimport(self):
+        article = Article.objects.create(titre='Écoute', contenu='...', statut='published')
+        autre = Article.objects.create(titre='Autre', contenu='...', statut='published')
+        # occupe les ids du fichier : ils ne doivent être ni écrasés ni réutilisés
+        existant = Commentaire.objects.create(article=autre, auteur='Local', contenu='Déjà là, ne pas toucher')
+        date_existant = Commentaire.objects.get(pk=existant.pk).date_creation
+        quand = (timezone.now() - timedelta(days=3)).replace(microsecond=0)
+        fichier = self.jsonl(
+            {'type': 'commentaire', 'id': existant.pk, 'article': article.slug, 'auteur': 'Ana',
+             'contenu': 'Très clair', 'valide': True, 'date_creation': quand},
+            {'type': 'commentaire', 'id': existant.pk + 1, 'parent': existant.pk, 'article': article.slug,
+             'auteur': 'Bo', 'contenu': 'Merci Ana', 'valide': True, 'date_creation': quand},
+            {'type': 'commentaire', 'id': 999, 'parent': 998, 'article': article.slug, 'auteur': 'X',
+             'contenu': 'Orphelin', 'date_creation': quand},
+            {'type': 'commentaire', 'id': 5, 'article': 'inconnu', 'auteur': 'Y', 'contenu': '...'},
+        )
+        stats = importer(fichier, taille_lot=1)  # parent et réponse dans des lots différents
+        self.assertEqual((stats['commentaire']['crees'], stats['commentaire']['ignores']), (2, 2))
+        self.assertEqual(len(stats['commentaire']['erreurs']), 2)
+
+        racine = Commentaire.objects.get(article=article, auteur='Ana')
+        reponse = Commentaire.objects.get(article=article, auteur='Bo')
+        self.assertNotEqual(racine.pk, existant.pk)
+        self.assertEqual((reponse.parent_id, racine.date_creation), (racine.pk, quand))
+        self.assertEqual(Commentaire.objects.get(pk=existant.pk).date_creation, date_existant)
+        self.assertEqual(Article.objects.get(pk=article.pk).nb_commentaires_valides, 2)
+        self.assertEqual(Commentaire.objects.get(pk=racine.pk).nb_reponses, 1)
+
+        stats = importer(fichier)  # réimport : rien de nouveau
+        self.assertEqual(stats['commentaire']['crees'], 0)
+        self.assertEqual(Commentaire.objects.filter(article=article).count(), 2)
+
+    def test_articles_statut_slugs_tags_et_similarite(self):
+        Article.objects.create(titre='Écoute', contenu='...', slug='ecoute-1')
+        stats = importer([
+            {'type': 'article', 'titre': 'Écoute', 'slug': 'ecoute', 'contenu': 'reformuler écouter',
+             'statut': 'published', 'mots_cles': 'Écoute, Empathie'},
+            {'type': 'article', 'titre': 'Écoute', 'contenu': 'reformuler écouter', 'statut': 'published',
+             'mots_cles': 'écoute'},
+            {'type': 'article', 'titre': 'Doublon', 'slug': 'ecoute', 'contenu': '...'},
+            {'type': 'article', 'titre': 'Inconnu', 'contenu': '...', 'statut': 'archive'},
+            {'type': 'article', 'titre': 'Sans statut', 'contenu': '...'},
+        ])
+        self.assertEqual((stats['article']['crees'], stats['article']['ignores']), (3, 2))
+        self.assertEqual(len(stats['article']['erreurs']), 2)
+
+        importes = Article.objects.filter(titre='Écoute').exclude(slug='ecoute-1')
+        self.assertEqual(sorted(importes.values_list('slug', flat=True)), ['ecoute', 'ecoute-2'])
+        self.assertFalse(importes.filter(date_publication__isnull=True).exists())
+        self.assertEqual(Article.objects.get(titre='Sans statut').statut, 'draft')
+        self.assertEqual(sorted(Tag.objects.values_list('slug', flat=True)), ['ecoute', 'empathie'])
+        ecoute = importes.get(slug='ecoute')
+        self.assertEqual(sorted(ecoute.tags.values_list('slug', flat=True)), ['ecoute', 'empathie'])
+        self.assertEqual([v['id'] for v in similarite.similaires(ecoute.pk)], [importes.get(slug='ecoute-2').pk])
+
+
+class CompteursTests(TestCase):
+
+    def setUp(self):
+        self.article = Article.objects.create(titre='Écoute', contenu='...', statut='published')
+
+    def compteurs(self):
+        article = Article.objects.get(pk=self.article.pk)
+        return article.nb_commentaires_valides, ArticlePublie.objects.get(pk=article.pk).nb_commentaires_valides
+
+    def test_creation_moderation_et_suppression(self):
+        racine = Commentaire.objects.create(article=self.article, auteur='Ana', contenu='Très clair', valide=True)
+        reponses = [
+            Commentaire.objects.create(article=self.article, auteur='Bo', contenu='Merci', parent=racine)
+            for _ in range(3)
+        ]
+        self.assertEqual(self.compteurs(), (1, 1))
+
+        self.assertEqual(compteurs.valider_commentaires(Commentaire.objects.filter(parent=racine)), 3)
+        self.assertEqual(compteurs.valider_commentaires(Commentaire.objects.filter(parent=racine)), 0)
+        self.assertEqual(self.compteurs(), (4, 4))
+        self.assertEqual(Commentaire.objects.get(pk=racine.pk).nb_reponses, 3)
+
+        compteurs.rejeter_commentaires(Commentaire.objects.filter(pk=reponses[0].pk))
+        Commentaire.objects.get(pk=reponses[1].pk).delete()
+        self.assertEqual(self.compteurs(), (2, 2))
+        self.assertEqual(Commentaire.objects.get(pk=racine.pk).nb_reponses, 1)
+        self.assertEqual(compteurs.verifier(), ([], []))
+
+    def test_verifier_et_recalculer(self):
+        commentaire = Commentaire.objects.create(article=self.article, auteur='Ana', contenu='Très clair', valide=True)
+        Article.objects.filter(pk=self.article.pk).update(nb_commentaires_valides=7)
+        Commentaire.objects.filter(pk=commentaire.pk).update(nb_reponses=2)
+        self.assertEqual(compteurs.verifier(), ([(self.article.pk, 7, 1)], [(commentaire.pk, 2, 0)]))
+        compteurs.recalculer()
+        self.assertEqual(compteurs.verifier(), ([], []))
+        self.assertEqual(self.compteurs(), (1, 1))
+
+    def test_import_par_lots_sans_recomptage(self):
+        lignes = [
+            {'type': 'commentaire', 'id': i, 'article': self.article.slug, 'auteur': f'Lecteur {i}',
+             'contenu': f'Merci {i}', 'valide': i % 2 == 0, 'parent': 1 if i > 1 else None}
+            for i in range(1, 9)
+        ]
+        with mock.patch.object(compteurs, 'recalculer') as recalculer:
+            importer(lignes, taille_lot=3)
+        recalculer.assert_not_called()
+        self.assertEqual(self.compteurs(), (4, 4))
+        self.assertEqual(compteurs.verifier(), ([], []))
 
-# Create your tests here.
@@ -0,0 +1,221 @@
+"""
+Limitation des écritures par seau à jetons (par IP, par utilisateur, par article).
+
+Les taux viennent de ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` sous la
+forme DRF ``'5/min'`` : un seau de 5 jetons, rechargé de 5 jetons par minute.
+La clé est ``<throttle_scope de la vue>_<ip|utilisateur|article>`` ; un taux
+absent désactive la limite correspondante. Les lectures ne sont jamais
+limitées, et le refus (429) intervient dans ``initial()`` de DRF, avant
+serializer et base de données.
+
+Chaque seau est tenu en GCRA (équivalent exact du seau à jetons) : on ne
+stocke que l'instant théorique où le seau sera plein (``tat``, en ms).
+``BLOG_THROTTLE_MODE`` choisit le stockage :
+
+* ``'cache'`` (défaut) : cache Django partagé entre processus, uniquement par
+  ``add`` / ``incr`` / ``decr`` atomiques (Redis, Memcached, mémoire locale).
+  Le cache fichier et le cache en base lisent puis réécrivent : avec eux, les
+  seaux restent locaux au processus (``'local'``), pour que le refus ne
+  touche jamais la base ;
+* ``'base'`` (sur demande seulement) : une ligne ``SeauLimitation`` par seau,
+  avancée par un seul ``UPDATE ... SET tat = MAX(tat, maintenant) +
+  intervalle WHERE tat <= ...``, atomique quel que soit le nombre de
+  processus, mais au prix d'une à trois requêtes par écriture, refusée ou
+  non ;
+* ``'local'`` : dictionnaire propre au processus, sans verrou — une course
+  entre threads peut au pire laisser passer une requête de plus. Pour un
+  déploiement à un seul processus.
+
+Les seaux d'une vue sont pris dans l'ordre (IP, utilisateur, article) par un
+seul throttle composite (``enchainer``) qui s'arrête au premier refus : une
+requête refusée ne retire aucun jeton aux seaux suivants, et une IP qui
+insiste ne vide pas le seau d'un article partagé par tous.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import IntegrityError, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .models import SeauLimitation
+
+DUREES = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# incr / decr faits de get + set : pas atomiques entre processus
+CACHES_NON_ATOMIQUES = (FileBasedCache, DatabaseCache)
+METHODES_ECRITURE = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def maintenant_ms():
+    return int(time.time() * 1000)
+
+
+def lire_taux(taux):
+    """``'5/min'`` -> (5 jetons, 60 secondes)."""
+    nombre, periode = taux.split('/')
+    return int(nombre), DUREES[periode[0]]
+
+
+class SeauCache:
+    CACHE_PREFIX = 'blog:seau'
+
+    def consommer(self, cle, capacite, periode):
+        """Retire un jeton ; None si accepté, sinon l'attente en secondes."""
+        cle = f"{self.CACHE_PREFIX}:{cle}"
+        maintenant = maintenant_ms()
+        intervalle = max(1, math.ceil(periode * 1000 / capacite))
+        duree = periode * 1000
+        ttl = periode + 1  # au-delà, le seau est forcément plein : la clé peut expirer
+
+        if cache.add(cle, maintenant + intervalle, ttl):
+            return None
+        try:
+            tat = cache.incr(cle, intervalle)
+        except ValueError:  # expirée entre add et incr
+            cache.add(cle, maintenant + intervalle, ttl)
+            return None
+        if tat - intervalle < maintenant:
+            # seau resté au repos : on repart de maintenant (course sans gravité)
+            cache.set(cle, maintenant + intervalle, ttl)
+            return None
+        if tat > maintenant + duree:
+            cache.decr(cle, intervalle)
+            return (tat - maintenant - duree) / 1000
+        cache.touch(cle, ttl)
+        return None
+
+
+class SeauBase:
+
+    def consommer(self, cle, capacite, periode):
+        maintenant = maintenant_ms()
+        intervalle = max(1, math.ceil(periode * 1000 / capacite))
+        duree = periode * 1000
+        alias = router.db_for_write(SeauLimitation)
+        seaux = SeauLimitation.objects.using(alias)
+
+        # accepté si le seau, avancé d'un intervalle, ne déborde pas : test et écriture en un UPDATE
+        if seaux.filter(cle=cle, tat__lte=maintenant + duree - intervalle).update(
+            tat=Greatest(F('tat'), Value(maintenant)) + intervalle,
+        ):
+            return None
+        tat = seaux.filter(cle=cle).values_list('tat', flat=True).first()
+        if tat is not None:
+            return (tat + intervalle - maintenant - duree) / 1000
+        # premier jeton : les seaux pleins (tat dépassé, sans information) sont purgés au passage
+        seaux.filter(tat__lt=maintenant).delete()
+        try:
+            with transaction.atomic(using=alias):
+                seaux.create(cle=cle, tat=maintenant + intervalle)
+        except IntegrityError:  # créé entre-temps par une requête concurrente
+            return self.consommer(cle, capacite, periode)
+        return None
+
+
+class SeauLocal:
+    MAX_CLES = 100_000
+
+    def __init__(self):
+        self.tat = {}
+
+    def consommer(self, cle, capacite, periode):
+        maintenant = time.monotonic() * 1000
+        intervalle = periode * 1000 / capacite
+        tat = max(self.tat.get(cle, maintenant), maintenant) + intervalle
+        if tat > maintenant + periode * 1000:
+            return (tat - maintenant - periode * 1000) / 1000
+        if len(self.tat) >= self.MAX_CLES:
+            self.purger(maintenant)
+        self.tat[cle] = tat
+        return None
+
+    def purger(self, maintenant):
+        # seaux pleins : inutile de les garder
+        for cle, tat in list(self.tat.items()):
+            if tat <= maintenant:
+                self.tat.pop(cle, None)
+
+
+SEAUX = {'cache': SeauCache(), 'local': SeauLocal(), 'base': SeauBase()}
+
+
+def seau():
+    mode = getattr(settings, 'BLOG_THROTTLE_MODE', 'cache')
+    if mode == 'cache' and isinstance(caches[DEFAULT_CACHE_ALIAS], CACHES_NON_ATOMIQUES):
+        mode = 'local'
+    return SEAUX[mode]
+
+
+class SeauThrottle(BaseThrottle):
+    """Base : ``cle`` donne l'identifiant limité (ou None pour ne pas limiter)."""
+    portee = None
+    attente = None
+
+    def cle(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if request.method not in METHODES_ECRITURE or not scope:
+            return True
+        taux = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}_{self.portee}')
+        cle = self.cle(request, view) if taux else None
+        if cle is None:
+            return True
+        self.attente = seau().consommer(f'{scope}:{self.portee}:{cle}', *lire_taux(taux))
+        return self.attente is None
+
+    def wait(self):
+        return self.attente
+
+
+class IPThrottle(SeauThrottle):
+    portee = 'ip'
+
+    def cle(self, request, view):
+        return self.get_ident(request)
+
+
+class UtilisateurThrottle(SeauThrottle):
+    portee = 'utilisateur'
+
+    def cle(self, request, view):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+
+class ArticleThrottle(SeauThrottle):
+    """L'article visé est donné par ``view.article_a_limiter(request)``."""
+    portee = 'article'
+
+    def cle(self, request, view):
+        return view.article_a_limiter(request)
+
+
+class SeauxThrottle(BaseThrottle):
+    """Seaux ``seaux`` pris dans l'ordre ; le premier refus arrête (DRF, lui, consulte tous ses throttles)."""
+    seaux = ()
+    attente = None
+
+    def allow_request(self, request, view):
+        for classe in self.seaux:
+            throttle = classe()
+            if not throttle.allow_request(request, view):
+                self.attente = throttle.wait()
+                return False
+        return True
+
+    def wait(self):
+        return self.attente
+
+
+def enchainer(*seaux):
+    return type('SeauxThrottle', (SeauxThrottle,), {'seaux': seaux})
+
+
+THROTTLES_ECRITURE = [enchainer(IPThrottle, UtilisateurThrottle, ArticleThrottle)]
@@ -0,0 +1,378 @@
+"""
+Import / export en masse des catégories, articles et commentaires.
+
+Format JSONL : un objet par ligne avec une clé ``type`` (``categorie``,
+``article`` ou ``commentaire``). Les relations sont exprimées par clés
+naturelles (slug de catégorie / d'article, username de l'auteur) pour passer
+d'un environnement à l'autre. Le CSV est accepté avec un seul type par fichier.
+
+L'import lit le flux par lots : résolutions groupées (``__in``), slugs alloués
+pour tout le lot, puis ``bulk_create`` / ``bulk_update`` dans une transaction
+par lot.
+
+Commentaires : l'``id`` du fichier n'est jamais réutilisé en base. Il sert
+seulement à rattacher les réponses (``parent``) via une correspondance
+id source -> id créé, gardée en mémoire le temps de l'import (une centaine
+d'octets par commentaire, soit ~100 Mo pour un million) : au-delà, découper
+le fichier par article, les réponses restant avec leur parent. Un commentaire déjà présent (même
+article, auteur, date de création et empreinte du contenu) n'est pas recréé :
+réimporter un fichier ne crée pas de doublons. Une ligne invalide (article ou
+parent inconnu) est ignorée et signalée dans ``erreurs``. Les compteurs
+dénormalisés reçoivent les deltas de chaque lot (``blog.compteurs``).
+
+Articles : statut vérifié contre ``STATUT_CHOICES``, date de publication
+posée comme dans ``Article.save()``, slug répété dans un lot signalé dans
+``erreurs``. Les tags sont tirés des mots-clés (comme la migration 0011) et
+l'index de similarité est recalculé une fois en fin d'import.
+"""
+import codecs
+import csv
+import io
+import itertools
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from skills import catalogue
+
+from . import flux, similarite
+from .arbre_commentaires import invalider_arbre
+from .cache_reponses import oublier_slugs
+from .compteurs import appliquer_contributions
+from .models import Article, ArticleTag, Categorie, Commentaire, Tag
+from .moderation import empreinte
+from .slugs import allouer_slugs
+from .versions import invalider
+
+User = get_user_model()
+
+TYPES = ('categorie', 'article', 'commentaire')
+TAILLE_LOT = 1000
+MAX_ERREURS = 100  # messages gardés par type ; les suivantes sont seulement comptées
+
+CHAMPS_ARTICLE = ('titre', 'contenu', 'statut', 'meta_description', 'mots_cles')
+
+
+class ErreurImport(ValueError):
+    pass
+
+
+def par_lots(iterable, taille):
+    iterateur = iter(iterable)
+    while lot := list(itertools.islice(iterateur, taille)):
+        yield lot
+
+
+def lire_jsonl(flux):
+    for numero, ligne in enumerate(flux, start=1):
+        if isinstance(ligne, bytes):
+            ligne = ligne.decode('utf-8')
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        try:
+            yield json.loads(ligne)
+        except ValueError as exc:
+            raise ErreurImport(f"Ligne {numero} : JSON invalide ({exc}).")
+
+
+def lire_csv(flux, type_defaut=None):
+    if not isinstance(flux, io.TextIOBase):
+        flux = codecs.iterdecode(flux, 'utf-8')
+    for ligne in csv.DictReader(flux):
+        if type_defaut and not ligne.get('type'):
+            ligne['type'] = type_defaut
+        yield ligne
+
+
+def booleen(valeur):
+    if isinstance(valeur, str):
+        return valeur.strip().lower() in ('1', 'true', 'vrai', 'oui', 'yes')
+    return bool(valeur)
+
+
+def date(valeur):
+    if not valeur:
+        return None
+    if isinstance(valeur, str):
+        valeur = parse_datetime(valeur)
+    if valeur is not None and timezone.is_naive(valeur):
+        valeur = timezone.make_aware(valeur)
+    return valeur
+
+
+def corriger_dates(model, objets, dates):
+    # auto_now_add écrase date_creation dans bulk_create : on remet la date source
+    a_corriger = []
+    for objet, valeur in zip(objets, dates):
+        if valeur is not None:
+            objet.date_creation = valeur
+            a_corriger.append(objet)
+    if a_corriger:
+        model.objects.bulk_update(a_corriger, ['date_creation'])
+
+
+def erreur(stats, type_, message):
+    stats[type_]['ignores'] += 1
+    if len(stats[type_]['erreurs']) < MAX_ERREURS:
+        stats[type_]['erreurs'].append(message)
+
+
+def importer_categories(lignes, stats, contexte):
+    noms = {ligne['nom'] for ligne in lignes}
+    existantes = set(Categorie.objects.filter(nom__in=noms).values_list('nom', flat=True))
+    nouvelles, vues = [], set()
+    for ligne in lignes:
+        if ligne['nom'] in existantes or ligne['nom'] in vues:
+            continue
+        vues.add(ligne['nom'])
+        nouvelles.append(Categorie(nom=ligne['nom'], slug=ligne.get('slug') or ''))
+
+    sans_slug = [c for c in nouvelles if not c.slug]
+    for categorie, slug in zip(sans_slug, allouer_slugs(Categorie, [c.nom for c in sans_slug], 110)):
+        categorie.slug = slug
+    Categorie.objects.bulk_create(nouvelles)
+    stats['categorie']['crees'] += len(nouvelles)
+
+
+def lier_tags(articles):
+    """Tags tirés des mots-clés, comme la reprise de la migration 0011 (liens existants gardés)."""
+    liens = set()
+    noms = {}
+    for article in articles:
+        for mot in (article.mots_cles or '').split(','):
+            nom = ' '.join(mot.split()).lower()[:50]
+            slug = slugify(nom)[:50]
+            if slug:
+                noms.setdefault(slug, nom)
+                liens.add((article.pk, slug))
+    if not liens:
+        return
+    Tag.objects.bulk_create([Tag(nom=nom, slug=slug) for slug, nom in noms.items()], ignore_conflicts=True)
+    ids = dict(Tag.objects.filter(slug__in=noms).values_list('slug', 'id'))
+    ArticleTag.objects.bulk_create(
+        [ArticleTag(article_id=pk, tag_id=ids[slug]) for pk, slug in sorted(liens) if slug in ids],
+        ignore_conflicts=True,
+    )
+    invalider('tags')
+
+
+def importer_articles(lignes, stats, contexte):
+    categories = dict(Categorie.objects.filter(
+        slug__in={l['categorie'] for l in lignes if l.get('categorie')}
+    ).values_list('slug', 'id'))
+    auteurs = dict(User.objects.filter(
+        username__in={l['auteur'] for l in lignes if l.get('auteur')}
+    ).values_list('username', 'id'))
+    existants = {
+        a.slug: a for a in Article.objects.filter(slug__in={l['slug'] for l in lignes if l.get('slug')})
+    }
+
+    statuts = dict(Article.STATUT_CHOICES)
+    a_creer, dates, a_modifier, vus = [], [], [], set()
+    for ligne in lignes:
+        slug = ligne.get('slug') or ''
+        if ligne.get('statut') and ligne['statut'] not in statuts:
+            erreur(stats, 'article', f"{slug or ligne.get('titre')!r} : statut inconnu {ligne['statut']!r}.")
+            continue
+        if slug and slug in vus:
+            erreur(stats, 'article', f"{slug!r} : slug en double dans le lot.")
+            continue
+        if slug:
+            vus.add(slug)
+        article = existants.get(slug) or Article(slug=slug)
+        for champ in CHAMPS_ARTICLE:
+            if champ in ligne:
+                setattr(article, champ, ligne[champ] or '')
+        if not article.statut:
+            article.statut = 'draft'
+        if 'date_publication' in ligne:
+            article.date_publication = date(ligne['date_publication'])
+        if article.statut == 'published' and article.date_publication is None:
+            article.date_publication = timezone.now()  # comme Article.save()
+        article.categorie_id = categories.get(ligne.get('categorie'))
+        article.auteur_id = auteurs.get(ligne.get('auteur'))
+        if article.pk:
+            article.date_modification = timezone.now()
+            a_modifier.append(article)
+        else:
+            a_creer.append(article)
+            dates.append(date(ligne.get('date_creation')))
+
+    sans_slug = [a for a in a_creer if not a.slug]
+    slugs = allouer_slugs(Article, [a.titre for a in sans_slug], 280, reserves=vus)
+    for article, slug in zip(sans_slug, slugs):
+        article.slug = slug
+    Article.objects.bulk_create(a_creer)
+    corriger_dates(Article, a_creer, dates)
+    if a_modifier:
+        Article.objects.bulk_update(
+            a_modifier, CHAMPS_ARTICLE + ('date_publication', 'categorie', 'auteur', 'date_modification'),
+        )
+    # bulk_* ne passe pas par les signaux : flux public et réponses en cache à refaire
+    flux.rafraichir(*[a.pk for a in a_creer + a_modifier])
+    invalider('articles', *[f'article:{a.pk}' for a in a_creer + a_modifier])
+    oublier_slugs(*[a.slug for a in a_creer])
+    if a_modifier:
+        catalogue.invalider()  # titres / statuts des articles liés aux compétences
+    lier_tags(a_creer + a_modifier)
+    contexte['similarite'] = True
+    stats['article']['crees'] += len(a_creer)
+    stats['article']['modifies'] += len(a_modifier)
+
+
+def cle_commentaire(commentaire):
+    return (commentaire.article_id, commentaire.auteur, commentaire.date_creation, commentaire.empreinte)
+
+
+def existants(commentaires):
+    """{clé naturelle: id} des commentaires déjà en base parmi ceux du lot."""
+    dates = [c.date_creation for c in commentaires if c.date_creation]
+    if not dates:
+        return {}
+    lignes = Commentaire.objects.filter(
+        empreinte__in={c.empreinte for c in commentaires}, date_creation__in=dates,
+        article_id__in={c.article_id for c in commentaires},
+    ).values_list('id', 'article_id', 'auteur', 'date_creation', 'empreinte')
+    return {(article_id, auteur, date_, emp): id_ for id_, article_id, auteur, date_, emp in lignes}
+
+
+def importer_commentaires(lignes, stats, contexte):
+    articles = dict(Article.objects.filter(
+        slug__in={l['article'] for l in lignes}
+    ).values_list('slug', 'id'))
+    utilisateurs = dict(User.objects.filter(
+        username__in={l['auteur_user'] for l in lignes if l.get('auteur_user')}
+    ).values_list('username', 'id'))
+    # id source -> (id en base, article), partagé par tous les lots de l'import
+    ids = contexte.setdefault('commentaires', {})
+
+    en_attente = []
+    for ligne in lignes:
+        article_id = articles.get(ligne['article'])
+        if article_id is None:
+            erreur(stats, 'commentaire',
+                   f"Commentaire {ligne.get('id') or '?'} : article {ligne['article']!r} inconnu.")
+            continue
+        valide = booleen(ligne.get('valide', False))
+        commentaire = Commentaire(
+            article_id=article_id,
+            auteur=ligne.get('auteur', ''),
+            auteur_user_id=utilisateurs.get(ligne.get('auteur_user')),
+            contenu=ligne.get('contenu', ''),
+            valide=valide,
+            # les non validés passent par la file de modération
+            statut_moderation='valide' if valide else 'attente',
+        )
+        commentaire.empreinte = empreinte(commentaire.contenu)
+        commentaire.date_creation = date(ligne.get('date_creation'))
+        en_attente.append((commentaire, str(ligne.get('id') or ''), str(ligne.get('parent') or '')))
+
+    crees = []
+    # par vagues : une réponse est créée une fois son parent créé (ou trouvé) dans ce lot ou un précédent
+    while en_attente:
+        prets = [element for element in en_attente if not element[2] or element[2] in ids]
+        if not prets:
+            for commentaire, source, parent in en_attente:
+                erreur(stats, 'commentaire', f"Commentaire {source or '?'} : parent {parent} inconnu.")
+            break
+        en_attente = [element for element in en_attente if element[2] and element[2] not in ids]
+
+        deja = existants([commentaire for commentaire, _, _ in prets])
+        nouveaux, premiers, alias = [], {}, []
+        for commentaire, source, parent in prets:
+            if parent:
+                parent_id, parent_article = ids[parent]
+                if parent_article != commentaire.article_id:
+                    erreur(stats, 'commentaire',
+                           f"Commentaire {source or '?'} : parent {parent} d'un autre article.")
+                    continue
+                commentaire.parent_id = parent_id
+            cle = cle_commentaire(commentaire) if commentaire.date_creation else None
+            if cle in deja or cle in premiers:
+                stats['commentaire']['ignores'] += 1  # déjà importé, ou en double dans le lot
+                if source:
+                    alias.append((source, cle))
+                continue
+            nouveaux.append((commentaire, source))
+            if cle:
+                premiers[cle] = commentaire
+
+        dates = [commentaire.date_creation for commentaire, _ in nouveaux]
+        objets = Commentaire.objects.bulk_create([commentaire for commentaire, _ in nouveaux])
+        corriger_dates(Commentaire, objets, dates)
+        for commentaire, source in nouveaux:
+            if source:
+                ids[source] = (commentaire.pk, commentaire.article_id)
+        for source, cle in alias:
+            ids[source] = (deja[cle], cle[0]) if cle in deja else (premiers[cle].pk, cle[0])
+        crees += objets
+
+    # bulk_create ne passe pas par les signaux : deltas du lot seul (un UPDATE CASE par table), pas de
+    # recomptage des articles déjà touchés par les lots précédents
+    appliquer_contributions([], [(c.article_id, c.parent_id) for c in crees if c.valide])
+    invalider_arbre(*{c.article_id for c in crees})
+    stats['commentaire']['crees'] += len(crees)
+
+
+IMPORTEURS = {
+    'categorie': importer_categories,
+    'article': importer_articles,
+    'commentaire': importer_commentaires,
+}
+
+
+def importer(enregistrements, taille_lot=TAILLE_LOT):
+    """Importe un flux d'enregistrements (dicts) ; retourne les compteurs par type."""
+    stats = {type_: {'crees': 0, 'modifies': 0, 'ignores': 0, 'erreurs': []} for type_ in TYPES}
+    contexte = {}
+    for lot in par_lots(enregistrements, taille_lot):
+        par_type = {type_: [] for type_ in TYPES}
+        for ligne in lot:
+            type_ = ligne.get('type')
+            if type_ not in par_type:
+                raise ErreurImport(f"Type d'enregistrement inconnu : {type_!r}.")
+            par_type[type_].append(ligne)
+        with transaction.atomic():
+            # ordre des dépendances : catégories, puis articles, puis commentaires
+            for type_ in TYPES:
+                if par_type[type_]:
+                    try:
+                        IMPORTEURS[type_](par_type[type_], stats, contexte)
+                    except KeyError as exc:
+                        raise ErreurImport(f"{type_} : champ obligatoire manquant {exc}.")
+    if contexte.get('similarite'):
+        # bulk_* ne passe pas par mettre_a_jour() : un seul recalcul pour tout l'import
+        similarite.recalculer()
+    return stats
+
+
+def exporter(types=TYPES, chunk_size=2000):
+    """Générateur de lignes JSONL, lues en flux avec ``.iterator()``."""
+    requetes = {
+        'categorie': Categorie.objects.order_by('id').values('nom', 'slug'),
+        'article': Article.objects.order_by('id').values(
+            'titre', 'slug', *CHAMPS_ARTICLE[1:], 'date_creation', 'date_publication',
+            categorie_slug=F('categorie__slug'), auteur_username=F('auteur__username'),
+        ),
+        'commentaire': Commentaire.objects.order_by('id').values(
+            'id', 'auteur', 'contenu', 'valide', 'parent', 'date_creation',
+            article_slug=F('article__slug'), auteur_user_username=F('auteur_user__username'),
+        ),
+    }
+    renommages = {
+        'categorie_slug': 'categorie', 'auteur_username': 'auteur',
+        'article_slug': 'article', 'auteur_user_username': 'auteur_user',
+    }
+    for type_ in TYPES:
+        if type_ not in types:
+            continue
+        for ligne in requetes[type_].iterator(chunk_size=chunk_size):
+            ligne = {renommages.get(cle, cle): valeur for cle, valeur in ligne.items()}
+            yield json.dumps({'type': type_, **ligne}, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
@@ -1,6 +1,7 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from .views import CategorieViewSet, ArticleViewSet, CommentaireViewSet
+from . import views, views_async
+from .views import CategorieViewSet, ArticleViewSet, CommentaireViewSet, ImportView, ExportView
 
 router = DefaultRouter()
 router.register(r'categories', CategorieViewSet, basename='categorie')
@@ -9,4 +10,15 @@ router.register(r'commentaires', CommentaireViewSet, basename='commentaire')
 
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('api/import/', ImportView.as_view(), name='import'),
+    path('api/export/', ExportView.as_view(), name='export'),
+    # lectures asynchrones (ASGI), mêmes réponses que les viewsets
+    path('api/async/articles/', views_async.article_list, name='async-article-list'),
+    path('api/async/articles/<int:pk>/', views_async.article_detail, name='async-article-detail'),
+    path('api/async/articles/<slug:slug>/by-slug/', views_async.article_by_slug, name='async-article-by-slug'),
+    path('api/async/categories/', views_async.categorie_list, name='async-categorie-list'),
+    # sitemaps et flux pré-rendus par la commande generer_diffusion
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    re_path(r'^sitemaps/(?P<nom>articles-\d+\.xml)$', views.sitemap_tranche, name='sitemap-tranche'),
+    re_path(r'^flux/(?P<nom>[-\w]+)\.(?P<format>rss|atom)$', views.flux_syndication, name='flux-syndication'),
 ]
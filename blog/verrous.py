@@ -0,0 +1,41 @@
+"""
+Écritures SQLite : réessai sur « database is locked ».
+
+SQLite n'a qu'un écrivain à la fois. Le profil de ``backend/settings.py``
+(WAL, ``busy_timeout``, transactions ``IMMEDIATE``) évite l'essentiel des
+erreurs de verrou ; ``reessayer_si_verrouille`` rattrape celles qui restent
+(attente plus longue que ``busy_timeout``) en rejouant l'écriture avec un
+recul exponentiel. Seulement hors transaction englobante : au milieu d'un
+``atomic()`` extérieur, rejouer une seule écriture n'aurait pas de sens.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connections, router
+
+
+def est_verrou(exc):
+    return 'locked' in str(exc) or 'busy' in str(exc)
+
+
+def reessayer_si_verrouille(save):
+    """Décorateur de ``Model.save`` : rejoue l'écriture si la base SQLite est verrouillée."""
+    @wraps(save)
+    def wrapper(self, *args, **kwargs):
+        connection = connections[kwargs.get('using') or router.db_for_write(type(self), instance=self)]
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return save(self, *args, **kwargs)
+
+        tentatives = getattr(settings, 'BLOG_SQLITE_TENTATIVES', 5)
+        attente = getattr(settings, 'BLOG_SQLITE_ATTENTE', 0.05)
+        for tentative in range(tentatives):
+            try:
+                return save(self, *args, **kwargs)
+            except OperationalError as exc:
+                if not est_verrou(exc) or tentative == tentatives - 1:
+                    raise
+                # recul exponentiel avec gigue, pour désynchroniser les écrivains
+                time.sleep(attente * 2 ** tentative * random.uniform(0.5, 1.5))
+    return wrapper
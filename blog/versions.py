@@ -0,0 +1,39 @@
+"""
+Versions d'invalidation stockées dans le cache, par étiquette.
+
+Une version est l'horodatage (``time.time()``) du dernier changement de
+l'étiquette : elle sert à la fois de jeton d'invalidation et de date de
+dernière modification pour les requêtes conditionnelles. Étiquettes utilisées :
+``articles`` (tout article), ``article:<id>``, ``categories``, ``tags`` (un
+tag ou les tags d'un article), ``commentaires`` (tout commentaire visible),
+``commentaires:<article_id>`` et ``popularite``.
+"""
+import time
+
+from django.core.cache import cache
+
+CACHE_PREFIX = 'blog:version'
+TIMEOUT = None  # jamais expirées : une version perdue repart simplement de « maintenant »
+
+
+def cle_version(etiquette):
+    return f"{CACHE_PREFIX}:{etiquette}"
+
+
+def versions(*etiquettes):
+    """Retourne {étiquette: version} ; une étiquette inconnue prend l'heure courante."""
+    trouvees = cache.get_many([cle_version(e) for e in etiquettes])
+    maintenant = time.time()
+    resultat = {}
+    for etiquette in etiquettes:
+        cle = cle_version(etiquette)
+        if cle not in trouvees:
+            # add() : ne pas écraser une version posée entre-temps par une écriture
+            cache.add(cle, maintenant, TIMEOUT)
+        resultat[etiquette] = trouvees.get(cle, maintenant)
+    return resultat
+
+
+def invalider(*etiquettes):
+    maintenant = time.time()
+    cache.set_many({cle_version(e): maintenant for e in set(etiquettes)}, TIMEOUT)
@@ -1,18 +1,53 @@
 from rest_framework import viewsets, generics, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.views import APIView
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from backend.instrumentation import segment
 from .models import Categorie, Article, Commentaire
+from . import diffusion, flux, popularite, similarite, tags
+from .cache_reponses import (
+    cle_slug, retenir_slug, etiquettes_article, etiquettes_liste, etiquettes_slug, reponse_en_cache,
+)
+from .conditionnel import validateurs_article, validateurs_liste
+from .pagination import BlogPagination
+from .recherche import RechercheTexteFilter
+from .throttling import THROTTLES_ECRITURE, IPThrottle, UtilisateurThrottle, enchainer
+from .transfert import TYPES, ErreurImport, exporter, importer, lire_csv, lire_jsonl
 from .serializers import (
     CategorieSerializer, ArticleListSerializer, ArticleDetailSerializer,
-    ArticleCreateUpdateSerializer, CommentaireSerializer
+    ArticleCreateUpdateSerializer, CommentaireSerializer,
+    ArticleListFastSerializer, ArticleFluxSerializer, CommentaireFastSerializer,
 )
 
+class FastListMixin:
+    """list() servi par un serializer rapide (.values() + dicts), cf. serializers.py"""
+    fast_serializer_class = None
+
+    def fast_list(self, request, queryset=None, serializer_class=None):
+        serializer_class = serializer_class or self.fast_serializer_class
+        if queryset is None:
+            queryset = self.filter_queryset(self.get_queryset())
+        queryset = serializer_class.preparer(queryset)
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(queryset)
+        with segment('serialisation'):
+            data = serializer_class(page if page is not None else queryset, context).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
 class CategorieViewSet(viewsets.ModelViewSet):
     queryset = Categorie.objects.all()
     serializer_class = CategorieSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, popularite.TriFilter]
+    ordering_fields = ['id', 'nom', 'slug', 'score_tendance']  # ?ordering=trending : catégories en vogue
     permission_classes = [IsAdminUser]  # création/modif/suppression admin seulement
 
     def get_permissions(self):
@@ -24,13 +59,20 @@ class CategorieViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class ArticleViewSet(viewsets.ModelViewSet):
-    queryset = Article.objects.all().select_related('categorie', 'auteur')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+class ArticleViewSet(FastListMixin, viewsets.ModelViewSet):
+    queryset = Article.objects.all().select_related('categorie', 'auteur').prefetch_related('tags')
+    # ?tags=a,b (tous) / ?tags__in=a,b (au moins un), cf. blog.tags
+    filter_backends = [DjangoFilterBackend, tags.TagFilter, RechercheTexteFilter, popularite.TriFilter]
     filterset_fields = ['categorie__slug', 'statut']
     search_fields = ['titre', 'contenu', 'meta_description', 'mots_cles']
-    ordering_fields = ['date_creation', 'date_modification']
+    # ?ordering=-vues, -likes ou trending : compteurs tamponnés (blog.popularite)
+    ordering_fields = ['date_creation', 'date_modification', 'vues', 'likes', 'score_tendance']
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = BlogPagination
+    fast_serializer_class = ArticleListFastSerializer
+    # écritures limitées par IP, utilisateur et article (429 avant serializer et base)
+    throttle_classes = THROTTLES_ECRITURE
+    throttle_scope = 'articles'
 
     def get_serializer_class(self):
         if self.action in ['list']:
@@ -47,25 +89,88 @@ class ArticleViewSet(viewsets.ModelViewSet):
             qs = qs.filter(statut='published')
         return qs
 
+    def article_a_limiter(self, request):
+        return self.kwargs.get('pk')
+
     def perform_create(self, serializer):
         serializer.save(auteur=self.request.user)
 
+    # ETag / Last-Modified : 304 calculé avant toute sérialisation ;
+    # réponses mises en cache par visibilité et invalidées par étiquettes
+    @reponse_en_cache(etiquettes_liste)
+    def list(self, request, *args, **kwargs):
+        # visiteurs : liste lue dans le flux public dénormalisé (blog.flux), sans jointure
+        publique = None if request.user.is_staff else flux.liste_publique(request.query_params)
+        queryset = publique if publique is not None else self.filter_queryset(self.get_queryset())
+        validateurs = validateurs_liste(request, queryset)
+        if reponse := validateurs.reponse_304(request):
+            return reponse
+        if publique is not None:
+            return validateurs.annoter(self.fast_list(request, publique, ArticleFluxSerializer))
+        response = self.fast_list(request, queryset)
+        if tags.demandees(request):
+            # ?facettes=1 : comptes par tag et par catégorie du résultat filtré
+            response.data['facettes'] = tags.facettes(queryset)
+        return validateurs.annoter(response)
+
+    @popularite.compter_vues(lambda request, pk=None, **kwargs: pk)
+    @reponse_en_cache(etiquettes_article)
+    def retrieve(self, request, *args, **kwargs):
+        validateurs = validateurs_article(request, self.get_queryset(), pk=kwargs['pk'])
+        if validateurs is None:
+            return super().retrieve(request, *args, **kwargs)
+        return validateurs.reponse_304(request) or validateurs.annoter(super().retrieve(request, *args, **kwargs))
+
     @action(detail=True, methods=['get'], url_path='by-slug', url_name='by-slug')
+    @popularite.compter_vues(lambda request, pk=None, **kwargs: cache.get(cle_slug(pk)))
+    @reponse_en_cache(etiquettes_slug)
     def by_slug(self, request, pk=None):
         # optional helper if you want /articles/<slug>/by-slug/
-        article = get_object_or_404(Article, slug=pk)
-        serializer = ArticleDetailSerializer(article, context={'request': request})
-        return Response(serializer.data)
+        validateurs = validateurs_article(request, Article.objects.all(), slug=pk)
+        if validateurs is not None and (reponse := validateurs.reponse_304(request)):
+            return reponse
+        article = get_object_or_404(Article.objects.select_related('categorie', 'auteur').prefetch_related('tags'), slug=pk)
+        retenir_slug(pk, article.pk)
+        with segment('serialisation'):
+            data = ArticleDetailSerializer(article, context={'request': request}).data
+        response = Response(data)
+        return validateurs.annoter(response) if validateurs else response
 
+    # seaux propres aux likes, par IP et par utilisateur (pas par article : un
+    # article populaire ne doit pas bloquer les likes de tout le monde)
+    @action(detail=True, methods=['post'], throttle_classes=[enchainer(IPThrottle, UtilisateurThrottle)],
+            throttle_scope='likes')
+    def like(self, request, pk=None):
+        # compté dans le tampon du processus, écrit au prochain vidage ; un like par votant et par fenêtre
+        if not str(pk).isdigit() or not self.get_queryset().filter(pk=pk).exists():
+            raise Http404
+        votant = f'u{request.user.pk}' if request.user.is_authenticated else IPThrottle().get_ident(request)
+        popularite.aimer(pk, votant)
+        return Response(status=status.HTTP_202_ACCEPTED)
 
-class CommentaireViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        # voisins précalculés (blog.similarite) : une lecture indexée sur (article, rang)
+        if not str(pk).isdigit():
+            raise Http404
+        lignes = similarite.similaires(pk, publics=not request.user.is_staff)
+        if not lignes and not self.get_queryset().filter(pk=pk).exists():
+            raise Http404
+        return Response(lignes)
+
+
+class CommentaireViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Commentaire.objects.select_related('article', 'auteur_user').all()
     serializer_class = CommentaireSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RechercheTexteFilter, filters.OrderingFilter]
     filterset_fields = ['article', 'valide']
     search_fields = ['auteur', 'contenu']
     ordering_fields = ['date_creation']
+    pagination_class = BlogPagination
+    fast_serializer_class = CommentaireFastSerializer
+    throttle_classes = THROTTLES_ECRITURE
+    throttle_scope = 'commentaires'
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -75,5 +180,58 @@ class CommentaireViewSet(viewsets.ModelViewSet):
             qs = qs.filter(valide=True)
         return qs
 
+    def list(self, request, *args, **kwargs):
+        return self.fast_list(request)
+
+    def article_a_limiter(self, request):
+        return request.data.get('article') if self.action == 'create' else None
+
     def perform_create(self, serializer):
         serializer.save()
+
+
+class ImportView(APIView):
+    """Import en masse (admin) : fichier JSONL ou CSV (``?type=`` pour le CSV) dans le champ ``fichier``."""
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response({'detail': "Champ 'fichier' manquant."}, status=status.HTTP_400_BAD_REQUEST)
+        # ?format= est réservé par DRF (négociation du rendu) : on se fie à l'extension
+        if fichier.name.lower().endswith('.csv'):
+            enregistrements = lire_csv(fichier, request.query_params.get('type'))
+        else:
+            enregistrements = lire_jsonl(fichier)
+        try:
+            stats = importer(enregistrements)
+        except ErreurImport as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats, status=status.HTTP_201_CREATED)
+
+
+class ExportView(APIView):
+    """Export en flux (admin) au format JSONL ; ``?types=article,commentaire`` pour filtrer."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        types = request.query_params.get('types')
+        types = [t for t in types.split(',') if t in TYPES] if types else TYPES
+        response = StreamingHttpResponse(exporter(types), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="blog.jsonl"'
+        return response
+
+
+# --- sitemaps et flux RSS / Atom (fichiers pré-rendus, cf. blog.diffusion) ---
+
+def sitemap_index(request):
+    return diffusion.servir(request, 'sitemap.xml')
+
+
+def sitemap_tranche(request, nom):
+    return diffusion.servir(request, f'sitemaps/{nom}')
+
+
+def flux_syndication(request, nom, format):
+    return diffusion.servir(request, f'flux/{nom}.{format}', diffusion.FORMATS_FLUX[format][1])
@@ -0,0 +1,106 @@
+"""
+Vues de lecture asynchrones (ASGI), montées à côté des viewsets sous ``api/async/``.
+
+Mêmes réponses JSON que ``ArticleViewSet`` / ``CategorieViewSet`` pour les
+lectures courantes (liste paginée par ``?page=``, filtres ``categorie__slug``
+et ``statut``, détail, by-slug), mais servies par l'ORM asynchrone
+(``aiterator``, ``acount``, ``afirst``) sans bloquer un thread par requête.
+Pas de recherche, de tri ni de curseur : ces cas restent sur les viewsets.
+L'authentification est celle de la session Django (``request.auser()``).
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import flux
+from .arbre_commentaires import aget_arbre
+from .models import Article, Categorie
+from .serializers import (
+    ArticleDetailSerializer, ArticleFluxSerializer, ArticleListFastSerializer, CategorieSerializer,
+)
+
+FILTRES_ARTICLES = ('categorie__slug', 'statut')
+
+
+def reponse_json(data, status=200):
+    # rendu de DRF : mêmes octets que les viewsets
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+async def est_staff(request):
+    user = await request.auser()
+    return user.is_staff
+
+
+async def paginer(request, queryset, serialiser):
+    """Équivalent asynchrone de ``PageNumberPagination`` : (count, next, previous, results)."""
+    taille = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    pages = max(1, -(-count // taille))
+    if not 1 <= page <= pages:
+        return reponse_json({'detail': str(PageNumberPagination.invalid_page_message)}, status=404)
+
+    debut = (page - 1) * taille
+    lignes = [ligne async for ligne in queryset[debut:debut + taille].aiterator()]
+    url = request.build_absolute_uri()
+    precedente = None
+    if page > 1:
+        precedente = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return reponse_json({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < pages else None,
+        'previous': precedente,
+        'results': serialiser(lignes),
+    })
+
+
+async def articles_visibles(request):
+    queryset = Article.objects.all()
+    if not await est_staff(request):
+        queryset = queryset.filter(statut='published')
+    return queryset
+
+
+async def article_list(request):
+    staff = await est_staff(request)
+    publique = None if staff else flux.liste_publique(request.GET)
+    if publique is not None:
+        # visiteurs : flux public dénormalisé, comme ArticleViewSet.list
+        serializer, lignes = ArticleFluxSerializer, publique
+    else:
+        filtres = {champ: request.GET[champ] for champ in FILTRES_ARTICLES if request.GET.get(champ)}
+        queryset = Article.objects.all() if staff else Article.objects.filter(statut='published')
+        serializer, lignes = ArticleListFastSerializer, queryset.filter(**filtres)
+    return await paginer(
+        request, serializer.preparer(lignes), lambda page: serializer(page, {'request': request}).data,
+    )
+
+
+async def detail(request, article):
+    if article is None:
+        return reponse_json({'detail': 'No Article matches the given query.'}, status=404)
+    arbre = await aget_arbre(article.pk)
+    return reponse_json(ArticleDetailSerializer(article, context={'request': request, 'arbre': arbre}).data)
+
+
+async def article_detail(request, pk):
+    queryset = (await articles_visibles(request)).select_related('categorie', 'auteur').prefetch_related('tags')
+    return await detail(request, await queryset.filter(pk=pk).afirst())
+
+
+async def article_by_slug(request, slug):
+    # comme ArticleViewSet.by_slug : pas de filtre de statut
+    queryset = Article.objects.select_related('categorie', 'auteur').prefetch_related('tags')
+    return await detail(request, await queryset.filter(slug=slug).afirst())
+
+
+async def categorie_list(request):
+    return await paginer(
+        request, Categorie.objects.all(), lambda page: CategorieSerializer(page, many=True).data,
+    )
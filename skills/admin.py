@@ -4,3 +4,5 @@ from .models import Skill
 @admin.register(Skill)
 class SkillAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'description')
+    search_fields = ('name', 'description')
+    filter_horizontal = ('articles',)
@@ -0,0 +1,62 @@
+"""
+Catalogue des soft skills, servi entier depuis le cache.
+
+Le catalogue change rarement : sa représentation complète (compétences et
+articles publiés qui les enseignent, cf. ``SkillSerializer``) est rangée sous
+une seule clé, sans version ni étiquette, et ``GET /api/skills/`` sans
+paramètre (ou avec seulement ``?page=``) se sert en une lecture de cache,
+dans la même enveloppe paginée que les listes lues en base. Il est reconstruit en deux
+requêtes (compétences, puis leurs articles préchargés) au premier accès.
+
+Toute écriture qui le change (compétence, liens avec les articles, article
+lié modifié ou supprimé, cf. ``skills.signals`` ; écritures groupées sans
+signal : ``blog.publication``, ``blog.transfert``) efface la clé et, une fois
+la transaction validée, réécrit le catalogue lu sur la base principale : une
+lecture concurrente qui aurait recalculé l'ancien état ne peut pas le remettre
+en place (``cache.add``). ``SKILLS_CATALOGUE_DUREE`` borne ce qu'un cas
+restant (deux écritures simultanées) pourrait laisser de périmé.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Prefetch
+
+from .models import Skill
+
+CLE = 'skills:catalogue'
+
+
+def duree():
+    return getattr(settings, 'SKILLS_CATALOGUE_DUREE', 3600)
+
+
+def queryset(using=None):
+    from blog.models import Article
+
+    skills = Skill.objects.prefetch_related(Prefetch(
+        'articles', queryset=Article.objects.filter(statut='published').only('id', 'titre', 'slug').order_by('id'),
+    ))
+    return skills.using(using) if using else skills
+
+
+def construire(using=None):
+    from .serializers import SkillSerializer
+
+    return [dict(skill) for skill in SkillSerializer(queryset(using), many=True).data]
+
+
+def catalogue():
+    donnees = cache.get(CLE)
+    if donnees is None:
+        donnees = construire()
+        cache.add(CLE, donnees, duree())
+    return donnees
+
+
+def reconstruire():
+    cache.set(CLE, construire(router.db_for_write(Skill)), duree())
+
+
+def invalider():
+    cache.delete(CLE)
+    transaction.on_commit(reconstruire, using=router.db_for_write(Skill))
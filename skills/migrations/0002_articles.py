@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_newsletter'),
+        ('skills', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='skill',
+            options={'ordering': ['name', 'id']},
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='articles',
+            field=models.ManyToManyField(blank=True, related_name='skills', to='blog.article'),
+        ),
+    ]
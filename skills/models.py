@@ -3,6 +3,11 @@ from django.db import models
 class Skill(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    # articles qui enseignent la compétence (catalogue : skills.catalogue)
+    articles = models.ManyToManyField('blog.Article', related_name='skills', blank=True)
+
+    class Meta:
+        ordering = ['name', 'id']
 
     def __str__(self):
         return self.name
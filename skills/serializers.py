@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from blog.models import Article
+from .models import Skill
+
+
+class ArticleLienSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Article
+        fields = ('id', 'titre', 'slug')
+
+
+class SkillSerializer(serializers.ModelSerializer):
+    # articles publiés seulement, préchargés par skills.catalogue.queryset
+    articles = ArticleLienSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Skill
+        fields = ('id', 'name', 'description', 'articles')
@@ -0,0 +1,25 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import catalogue
+from .models import Skill
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def skill_modifie(sender, instance, **kwargs):
+    catalogue.invalider()
+
+
+@receiver(m2m_changed, sender=Skill.articles.through)
+def articles_modifies(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        catalogue.invalider()
+
+
+@receiver(post_save, sender='blog.Article')
+@receiver(pre_delete, sender='blog.Article')
+def article_modifie(sender, instance, raw=False, **kwargs):
+    # titre, slug ou statut recopiés dans le catalogue ; avant suppression, les liens existent encore
+    if not raw and Skill.articles.through.objects.filter(article_id=instance.pk).exists():
+        catalogue.invalider()
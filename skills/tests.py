@@ -1,3 +1,85 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from blog import publication
+from blog.models import Article
+from blog.transfert import importer
+
+from . import catalogue
+from .models import Skill
+
+
+class CatalogueSkillsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalogue_en_cache_et_invalidation(self):
+        publie = Article.objects.create(titre='Écoute active', contenu='...', statut='published')
+        brouillon = Article.objects.create(titre='Brouillon', contenu='...')
+        ecoute = Skill.objects.create(name='Écoute', description='Reformuler')
+        ecoute.articles.add(publie, brouillon)
+        Skill.objects.create(name='Assertivité')
+
+        reponse = self.client.get('/api/skills/').json()
+        self.assertEqual((reponse['count'], reponse['next'], reponse['previous']), (2, None, None))
+        self.assertEqual([s['name'] for s in reponse['results']], ['Assertivité', 'Écoute'])
+        self.assertEqual(reponse['results'][1]['articles'],
+                         [{'id': publie.pk, 'titre': 'Écoute active', 'slug': publie.slug}])
+        with self.assertNumQueries(0), mock.patch.object(cache, 'get', wraps=cache.get) as lectures:
+            self.client.get('/api/skills/')
+        self.assertEqual([appel.args[0] for appel in lectures.call_args_list], [catalogue.CLE])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publie.titre = 'Écouter vraiment'
+            publie.save()
+        with self.assertNumQueries(0):
+            resultats = self.client.get('/api/skills/').json()['results']
+        self.assertEqual(resultats[1]['articles'][0]['titre'], 'Écouter vraiment')
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Créativité')
+        self.assertEqual(self.client.get('/api/skills/').json()['count'], 3)
+
+    def test_pages_du_catalogue_identiques_a_la_base(self):
+        Skill.objects.bulk_create([Skill(name=f'Compétence {i:02}') for i in range(12)])
+        for params in ({}, {'page': 2}, {'page': 2, 'count': 'false'}):
+            with self.subTest(params=params):
+                depuis_cache = self.client.get('/api/skills/', params).json()
+                depuis_base = self.client.get('/api/skills/', {**params, 'search': ''}).json()  # ?search= : lu en base
+                self.assertEqual(depuis_cache.keys(), depuis_base.keys())
+                self.assertEqual(depuis_cache.get('count'), depuis_base.get('count'))
+                self.assertEqual(depuis_cache['results'], depuis_base['results'])
+        self.assertEqual(len(self.client.get('/api/skills/').json()['results']), 10)
+        self.assertEqual(self.client.get('/api/skills/', {'page': 3}).status_code, 404)
+
+    def test_ecritures_groupees_invalident(self):
+        article = Article.objects.create(titre='Écoute', contenu='...', statut='scheduled',
+                                         date_publication=timezone.now() - timedelta(minutes=1))
+        Skill.objects.create(name='Écoute').articles.add(article)
+        self.assertEqual(self.client.get('/api/skills/').json()['results'][0]['articles'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publication.publier_lot(prechauffage=False)
+        self.assertEqual(len(self.client.get('/api/skills/').json()['results'][0]['articles']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            importer([{'type': 'article', 'titre': 'Écoute (2e éd.)', 'slug': article.slug, 'contenu': '...',
+                       'statut': 'published'}])
+        self.assertEqual(self.client.get('/api/skills/').json()['results'][0]['articles'][0]['titre'],
+                         'Écoute (2e éd.)')
 
-# Create your tests here.
+    def test_recherche_et_curseur(self):
+        Skill.objects.bulk_create([Skill(name=f'Compétence {i:02}') for i in range(12)])
+        Skill.objects.create(name='Empathie', description="Se mettre à la place de l'autre")
+        self.assertEqual([s['name'] for s in self.client.get('/api/skills/', {'search': 'autre'}).json()['results']],
+                         ['Empathie'])
+        page = self.client.get('/api/skills/', {'cursor': ''}).json()
+        self.assertEqual(len(page['results']), 10)
+        suite = self.client.get(page['next']).json()
+        self.assertEqual([s['name'] for s in suite['results']], ['Compétence 10', 'Compétence 11', 'Empathie'])
+        self.assertIsNone(suite['next'])
+        self.assertEqual(self.client.post('/api/skills/', {'name': 'X'}).status_code, 403)
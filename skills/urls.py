@@ -1,6 +1,13 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
 from . import views
 
+# SimpleRouter : la racine /api/ reste celle du routeur blog
+router = SimpleRouter()
+router.register(r'skills', views.SkillViewSet, basename='skill')
+
 urlpatterns = [
-    path('', views.skills_list, name='skills_list'),
+    path('skills/', views.skills_list, name='skills_list'),
+    path('skills/async/', views.skills_list_async, name='skills_list_async'),
+    path('api/', include(router.urls)),
 ]
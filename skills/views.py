@@ -1,6 +1,54 @@
 from django.shortcuts import render
+from rest_framework import filters, viewsets
+from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+
+from blog.pagination import BlogPagination, KeysetPagination
+from . import catalogue
 from .models import Skill
+from .serializers import SkillSerializer
 
 def skills_list(request):
     skills = Skill.objects.all()
     return render(request, 'skills/skills_list.html', {'skills': skills})
+
+
+async def skills_list_async(request):
+    # version ASGI : liste chargée par l'ORM asynchrone, rendu sans accès à la base
+    skills = [skill async for skill in Skill.objects.all()]
+    return render(request, 'skills/skills_list.html', {'skills': skills})
+
+
+class KeysetNom(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class SkillPagination(BlogPagination):
+    keyset_class = KeysetNom
+
+
+class SkillViewSet(viewsets.ModelViewSet):
+    serializer_class = SkillSerializer
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['name', 'description']
+    pagination_class = SkillPagination
+    # paramètres qui sortent du catalogue complet mis en cache
+    PARAMETRES_LISTE = ('search', 'cursor')
+
+    def get_queryset(self):
+        return catalogue.queryset()
+
+    def get_permissions(self):
+        # lecture publique, écriture admin (comme les catégories)
+        if self.action in ['list', 'retrieve']:
+            self.permission_classes = [IsAuthenticatedOrReadOnly]
+        else:
+            self.permission_classes = [IsAdminUser]
+        return super().get_permissions()
+
+    def list(self, request, *args, **kwargs):
+        # pages (?page=, ?count=) découpées dans le catalogue complet : une seule
+        # lecture de cache (skills.catalogue), même enveloppe que depuis la base
+        if not any(param in request.query_params for param in self.PARAMETRES_LISTE):
+            page = self.paginate_queryset(catalogue.catalogue())
+            return self.get_paginated_response(page)
+        return super().list(request, *args, **kwargs)